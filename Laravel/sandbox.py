@@ -0,0 +1,215 @@
+"""
+Sandboxed Command Runner
+Runs student code under CPU-time, memory, process-count and output-size limits
+"""
+
+import os
+import signal
+import subprocess
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows - only the wall-clock and output limits apply
+    resource = None
+
+
+# Default limits for one test run
+DEFAULT_LIMITS = {
+    'wall_seconds': 120,      # Total elapsed time
+    'cpu_seconds': 90,        # CPU time (RLIMIT_CPU)
+    'memory_mb': 1024,        # Address space per process (RLIMIT_AS)
+    'max_processes': None,    # RLIMIT_NPROC (off: see below)
+    'max_file_mb': 256,       # Largest file the run may write (RLIMIT_FSIZE)
+    'max_output_kb': 2048,    # Combined stdout + stderr kept before killing
+}
+
+# Limits for "composer install": downloads take longer than a test run and
+# the dependency solver needs more memory
+INSTALL_LIMITS = {
+    'wall_seconds': 300,
+    'cpu_seconds': 240,
+    'memory_mb': 2048,
+    'max_file_mb': 512,
+    'max_output_kb': 4096,
+}
+
+# RLIMIT_NPROC counts every process the user owns, not only this run's, so a
+# value low enough to stop a fork bomb also breaks legitimate forks on a busy
+# desktop. It is only applied when a caller sets max_processes explicitly
+# (e.g. when grading under a dedicated user account).
+
+# Outcomes
+OUTCOME_OK = 'ok'
+OUTCOME_TIMEOUT = 'timeout'
+OUTCOME_CPU_LIMIT = 'cpu_limit'
+OUTCOME_MEMORY_LIMIT = 'memory_limit'
+OUTCOME_OUTPUT_LIMIT = 'output_limit'
+
+# Outcomes that mean the submission was stopped for misbehaving
+RUNAWAY_OUTCOMES = {
+    OUTCOME_TIMEOUT: 'exceeded the wall-clock time limit',
+    OUTCOME_CPU_LIMIT: 'exceeded the CPU time limit',
+    OUTCOME_MEMORY_LIMIT: 'exceeded the memory limit',
+    OUTCOME_OUTPUT_LIMIT: 'produced too much output',
+}
+
+MEMORY_ERROR_MARKERS = ('Allowed memory size of', 'Out of memory', 'Cannot allocate memory')
+
+
+class SandboxResult:
+    """Result of a sandboxed run"""
+
+    def __init__(self, returncode, stdout, stderr, outcome):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.outcome = outcome
+
+    @property
+    def killed(self):
+        """True if the run was stopped by one of the limits"""
+        return self.outcome in RUNAWAY_OUTCOMES
+
+
+def _make_preexec(limits):
+    """Build the function that applies rlimits in the child before exec"""
+    if resource is None:
+        return None
+
+    def apply_limits():
+        cpu = limits['cpu_seconds']
+        # Soft limit sends SIGXCPU, hard limit a few seconds later sends SIGKILL
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 5))
+
+        memory = limits['memory_mb'] * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+        file_size = limits['max_file_mb'] * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_FSIZE, (file_size, file_size))
+
+        if limits.get('max_processes') and hasattr(resource, 'RLIMIT_NPROC'):
+            nproc = limits['max_processes']
+            resource.setrlimit(resource.RLIMIT_NPROC, (nproc, nproc))
+
+    return apply_limits
+
+
+def _kill_group(process):
+    """Kill the process and everything it spawned"""
+    try:
+        if os.name == 'posix':
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+
+def _wait(process, timeout):
+    """
+    Wait for the process, killing its group after timeout seconds.
+
+    Returns:
+        (timed_out, CPU seconds used by the child or None when unknown)
+    """
+    if os.name != 'posix':
+        try:
+            process.wait(timeout=timeout)
+            return False, None
+        except subprocess.TimeoutExpired:
+            _kill_group(process)
+            process.wait()
+            return True, None
+
+    # wait4 reports the child's own resource usage, unlike Popen.wait
+    deadline = time.monotonic() + timeout
+    timed_out = False
+    while True:
+        pid, status, usage = os.wait4(process.pid, 0 if timed_out else os.WNOHANG)
+        if pid:
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return timed_out, usage.ru_utime + usage.ru_stime
+        if time.monotonic() >= deadline:
+            timed_out = True
+            _kill_group(process)
+            continue
+        time.sleep(0.05)
+
+
+def run_sandboxed(cmd, cwd=None, limits=None, env=None):
+    """
+    Run a command with resource limits.
+
+    Args:
+        cmd: Command list
+        cwd: Working directory
+        limits: Dictionary overriding values from DEFAULT_LIMITS
+        env: Environment for the child (defaults to the current one)
+
+    Returns:
+        SandboxResult (raises FileNotFoundError if the command does not exist)
+    """
+    limits = {**DEFAULT_LIMITS, **(limits or {})}
+    max_output = limits['max_output_kb'] * 1024
+
+    process = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        preexec_fn=_make_preexec(limits),
+        start_new_session=(os.name == 'posix'),
+    )
+
+    chunks = {'stdout': [], 'stderr': []}
+    state = {'size': 0, 'output_exceeded': False}
+    lock = threading.Lock()
+
+    def pump(stream, name):
+        for chunk in iter(lambda: stream.read1(65536), b''):
+            with lock:
+                if state['output_exceeded']:
+                    continue
+                state['size'] += len(chunk)
+                if state['size'] > max_output:
+                    state['output_exceeded'] = True
+                    _kill_group(process)
+                    continue
+                chunks[name].append(chunk)
+        stream.close()
+
+    readers = [
+        threading.Thread(target=pump, args=(process.stdout, 'stdout'), daemon=True),
+        threading.Thread(target=pump, args=(process.stderr, 'stderr'), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out, cpu_used = _wait(process, limits['wall_seconds'])
+
+    for reader in readers:
+        reader.join(timeout=5)
+
+    stdout = b''.join(chunks['stdout']).decode('utf-8', errors='replace')
+    stderr = b''.join(chunks['stderr']).decode('utf-8', errors='replace')
+
+    # Work out why the process stopped
+    returncode = process.returncode
+    if state['output_exceeded']:
+        outcome = OUTCOME_OUTPUT_LIMIT
+    elif timed_out:
+        outcome = OUTCOME_TIMEOUT
+    elif (os.name == 'posix' and returncode in (-signal.SIGXCPU, -signal.SIGKILL)
+          and cpu_used is not None and cpu_used >= limits['cpu_seconds'] - 0.5):
+        # Only a kill after the CPU budget was really spent; other SIGKILLs
+        # (e.g. the OOM killer) fall through to the checks below
+        outcome = OUTCOME_CPU_LIMIT
+    elif returncode != 0 and any(m in stdout or m in stderr for m in MEMORY_ERROR_MARKERS):
+        outcome = OUTCOME_MEMORY_LIMIT
+    else:
+        outcome = OUTCOME_OK
+
+    return SandboxResult(returncode, stdout, stderr, outcome)
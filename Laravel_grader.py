@@ -8,12 +8,16 @@ from git import Repo
 from github import Github
 from datetime import datetime
 from openai import OpenAI
-import requests
+from teams_report import render_laravel_report, write_teams_report
+import notification_outbox
+import progress_events as progress
+import results_index
 
 # Import test runner
 try:
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'Laravel'))
     from copy_and_run_tests import LaravelTestRunner
+    from sandbox import RUNAWAY_OUTCOMES
     TEST_RUNNER_AVAILABLE = False  # ⭐ TEMPORARILY DISABLED - PHP/Composer not available
     print("[INFO] Functionality tests disabled. Using static analysis only.")
 except ImportError:
@@ -562,6 +566,37 @@ def generate_html_report(repo_name, results, total_score, local_path, tests_ran=
     report_path = os.path.join(local_path, 'result.html')
     with open(report_path, 'w', encoding='utf-8') as f:
         f.write('\n'.join(output))
+
+    # Compact rendering for Teams, built from the same results
+    try:
+        student_username = repo_name.replace(ASSIGNMENT_REPO_PREFIX, "")
+        teams_html = render_laravel_report(student_username, results, total_score, grade, current_rubric)
+        write_teams_report(local_path, teams_html)
+        # Queue the full-report notification; unchanged reports are not sent again
+        notification_outbox.enqueue('laravel', repo_name, teams_html)
+    except Exception as e:
+        print(f"[WARN] Could not write Teams report: {e}")
+
+    # Register the report so summaries never have to search the repositories
+    try:
+        results_index.record_result(
+            'laravel', repo_name, total_score, grade, report_path,
+            github_username=repo_name.replace(ASSIGNMENT_REPO_PREFIX, ""),
+            details={
+                'json_path': os.path.join(local_path, 'grading_result.json'),
+                'tests_ran': tests_ran,
+                'categories': {
+                    category: {
+                        'score': details.get('score', 0),
+                        'max_score': details.get('max_score', current_rubric.get(category, 0)),
+                    }
+                    for category, details in results.items()
+                    if category != "AI Review" and isinstance(details, dict)
+                },
+            }
+        )
+    except Exception as e:
+        print(f"[WARN] Could not update results index: {e}")
     
     return report_path
 
@@ -589,16 +624,26 @@ def ai_feedback(base):
 
 # --- TEAMS NOTIFICATION ---
 
-def send_teams_notification(repo_name, score, html_report_path):
+def report_remote_path(repo_name, html_report_path):
+    """OneDrive path a student's HTML report is uploaded to"""
+    student_username = repo_name.replace(ASSIGNMENT_REPO_PREFIX, "")
+    return f"GradingReports/{student_username}_{os.path.basename(html_report_path)}"
+
+
+def send_teams_notification(repo_name, score, html_report_path, uploaded_file=None, upload_report=True):
     """
     Send notification to Microsoft Teams via Graph API using MSAL authentication.
     Uses configuration from config.py (not environment variables).
+    
+    Pass upload_report=False with the driveItem from upload_files() when the
+    report was already uploaded (see send_teams_notifications).
     """
     try:
         # Import required modules
         try:
-            from msal import PublicClientApplication
-            import requests
+            from graph_auth import acquire_token
+            from onedrive_upload import upload_file, create_sharing_link
+            from graph_chats import get_chat_id, send_chat_message
         except ImportError:
             print("[SKIP] MSAL library not installed (pip install msal requests)")
             return False
@@ -610,9 +655,6 @@ def send_teams_notification(repo_name, score, html_report_path):
             print("[SKIP] Teams not configured (set TENANT_ID and CLIENT_ID in config.py)")
             return False
         
-        # Extract student username from repo name
-        student_username = repo_name.replace(ASSIGNMENT_REPO_PREFIX, "")
-        
         # Get student email from config
         student_email = STUDENT_EMAILS.get(repo_name)
         if not student_email:
@@ -661,21 +703,12 @@ def send_teams_notification(repo_name, score, html_report_path):
             print(f"[WARNING] Could not read HTML report: {e}")
             html_content = f"<p>Grade: {score}/100</p>"
         
-        # Create MSAL application for authentication
-        app = PublicClientApplication(
-            CLIENT_ID,
-            authority=f"https://login.microsoftonline.com/{TENANT_ID}"
-        )
+        # Scopes needed for sending messages and uploading files
+        scopes = ["Chat.ReadWrite", "Files.ReadWrite"]
         
-        # Define the scopes needed for sending messages and uploading files
-        scopes = [
-            "https://graph.microsoft.com/Chat.ReadWrite",
-            "https://graph.microsoft.com/Files.ReadWrite"
-        ]
-        
-        # Acquire token interactively (will open browser for first-time auth)
+        # Silent from the shared token cache; opens the browser only on first use
         print(f"[TEAMS] Authenticating to Microsoft Graph API...")
-        result = app.acquire_token_interactive(scopes=scopes)
+        result = acquire_token(scopes)
         
         if "access_token" not in result:
             print(f"[TEAMS] ✗ Authentication failed: {result.get('error_description', 'Unknown error')}")
@@ -687,141 +720,27 @@ def send_teams_notification(repo_name, score, html_report_path):
             "Content-Type": "application/json"
         }
         
-        # Step 1: Create or get existing chat with student
-        print(f"[TEAMS] Creating chat with {student_email}...")
-        chat_payload = {
-            "chatType": "oneOnOne",
-            "members": [
-                {
-                    "@odata.type": "#microsoft.graph.aadUserConversationMember",
-                    "roles": ["owner"],
-                    "user@odata.bind": f"https://graph.microsoft.com/v1.0/users('{INSTRUCTOR_EMAIL}')"
-                },
-                {
-                    "@odata.type": "#microsoft.graph.aadUserConversationMember",
-                    "roles": ["owner"],
-                    "user@odata.bind": f"https://graph.microsoft.com/v1.0/users('{student_email}')"
-                }
-            ]
-        }
-        
-        chat_response = requests.post(
-            "https://graph.microsoft.com/v1.0/chats",
-            headers=headers,
-            json=chat_payload,
-            timeout=30
-        )
-        
-        if chat_response.status_code not in [200, 201]:
-            print(f"[TEAMS] ✗ Failed to create chat: {chat_response.status_code}")
-            print(f"         Response: {chat_response.text}")
+        # Step 1: Get the chat with the student (cached on disk after the first run)
+        print(f"[TEAMS] Opening chat with {student_email}...")
+        chat_id = get_chat_id(INSTRUCTOR_EMAIL, student_email, headers)
+        if not chat_id:
             return False
         
-        chat_id = chat_response.json()["id"]
-        
-        # Step 2: Upload the HTML file as an attachment
-        print(f"[TEAMS] Uploading HTML report as attachment...")
-        
-        # Read the HTML file content
-        try:
-            with open(html_report_path, 'rb') as f:
-                file_content = f.read()
-        except Exception as e:
-            print(f"[TEAMS] ✗ Failed to read HTML report: {e}")
-            return False
-        
-        # Get file name from path
-        import os
-        file_name = os.path.basename(html_report_path)
-        file_size = len(file_content)
-        
-        # Upload file to OneDrive (required for attachments)
-        # First, create an upload session
-        upload_headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-        
-        upload_session_payload = {
-            "item": {
-                "@microsoft.graph.conflictBehavior": "rename",
-                "name": f"{student_username}_{file_name}"
-            }
-        }
-        
-        # Create upload session in user's OneDrive
-        upload_session_response = requests.post(
-            f"https://graph.microsoft.com/v1.0/me/drive/root:/GradingReports/{student_username}_{file_name}:/createUploadSession",
-            headers=upload_headers,
-            json=upload_session_payload,
-            timeout=30
-        )
-        
-        if upload_session_response.status_code not in [200, 201]:
-            print(f"[TEAMS] ✗ Failed to create upload session: {upload_session_response.status_code}")
-            print(f"         Trying direct upload method...")
-            
-            # Fallback: Try direct small file upload
-            upload_direct_headers = {
-                "Authorization": f"Bearer {access_token}",
-                "Content-Type": "text/html"
-            }
-            
-            upload_response = requests.put(
-                f"https://graph.microsoft.com/v1.0/me/drive/root:/GradingReports/{student_username}_{file_name}:/content",
-                headers=upload_direct_headers,
-                data=file_content,
-                timeout=60
-            )
-            
-            if upload_response.status_code not in [200, 201]:
-                print(f"[TEAMS] ✗ Failed to upload file: {upload_response.status_code}")
-                print(f"         Sending message without attachment...")
-                uploaded_file = None
-            else:
-                uploaded_file = upload_response.json()
-                print(f"[TEAMS] ✓ File uploaded successfully")
+        # Step 2: Upload the HTML report to OneDrive (chunked, resumable)
+        if upload_report:
+            print(f"[TEAMS] Uploading HTML report as attachment...")
+            uploaded_file = upload_file(html_report_path, report_remote_path(repo_name, html_report_path), access_token)
+        if uploaded_file:
+            print(f"[TEAMS] ✓ File uploaded successfully")
         else:
-            # Upload file in chunks using the upload session
-            upload_url = upload_session_response.json()["uploadUrl"]
-            
-            upload_chunk_headers = {
-                "Content-Length": str(file_size),
-                "Content-Range": f"bytes 0-{file_size-1}/{file_size}"
-            }
-            
-            chunk_response = requests.put(
-                upload_url,
-                headers=upload_chunk_headers,
-                data=file_content,
-                timeout=60
-            )
-            
-            if chunk_response.status_code not in [200, 201]:
-                print(f"[TEAMS] ✗ Failed to upload file chunks: {chunk_response.status_code}")
-                uploaded_file = None
-            else:
-                uploaded_file = chunk_response.json()
-                print(f"[TEAMS] ✓ File uploaded successfully")
+            print(f"[TEAMS] ✗ Report upload failed, sending message without attachment...")
         
         # Step 3: Create sharing link for the uploaded file
         sharing_link = None
         if uploaded_file and 'id' in uploaded_file:
             try:
-                sharing_payload = {
-                    "type": "view",
-                    "scope": "organization"
-                }
-                
-                sharing_response = requests.post(
-                    f"https://graph.microsoft.com/v1.0/me/drive/items/{uploaded_file['id']}/createLink",
-                    headers=upload_headers,
-                    json=sharing_payload,
-                    timeout=30
-                )
-                
-                if sharing_response.status_code in [200, 201]:
-                    sharing_link = sharing_response.json().get('link', {}).get('webUrl')
+                sharing_link = create_sharing_link(uploaded_file['id'], access_token)
+                if sharing_link:
                     print(f"[TEAMS] ✓ Sharing link created")
             except Exception as e:
                 print(f"[TEAMS] Warning: Could not create sharing link: {e}")
@@ -848,22 +767,14 @@ def send_teams_notification(repo_name, score, html_report_path):
                 <p>📄 <strong>Report Status:</strong> Report generated but upload failed. Please contact your instructor.</p>
             """
         
-        message_payload = {
-            "body": {
-                "contentType": "html",
-                "content": message_content
-            }
-        }
-        
-        message_response = requests.post(
-            f"https://graph.microsoft.com/v1.0/chats/{chat_id}/messages",
-            headers=headers,
-            json=message_payload,
-            timeout=30
-        )
+        message_response = send_chat_message(INSTRUCTOR_EMAIL, student_email, message_content, headers)
+        if message_response is None:
+            return False
         
         if message_response.status_code in [200, 201]:
             print(f"[TEAMS] ✓ Message sent to {student_email}")
+            # The student has been notified about this report; keep the outbox from sending it again
+            notification_outbox.mark_student_delivered('laravel', repo_name)
             if sharing_link:
                 print(f"[TEAMS] ✓ Report accessible at: {sharing_link}")
             return True
@@ -876,91 +787,172 @@ def send_teams_notification(repo_name, score, html_report_path):
         print(f"[TEAMS] Error sending notification: {e}")
         return False
 
+def send_teams_notifications(notifications):
+    """
+    Notify several students, uploading all their reports to OneDrive in parallel first.
+    
+    Args:
+        notifications: List of (repo_name, score, html_report_path) tuples
+    """
+    if not notifications:
+        return
+    
+    try:
+        from graph_auth import get_access_token
+        from onedrive_upload import upload_files
+    except ImportError:
+        print("[SKIP] MSAL library not installed (pip install msal requests)")
+        return
+    
+    print(f"\n[TEAMS] Uploading {len(notifications)} report(s) to OneDrive in parallel...")
+    try:
+        access_token = get_access_token(["Files.ReadWrite"])
+        uploads = upload_files(
+            [(html_path, report_remote_path(repo_name, html_path)) for repo_name, _, html_path in notifications],
+            access_token
+        )
+    except Exception as e:
+        print(f"[TEAMS] Parallel upload failed, reports will be uploaded one by one: {e}")
+        uploads = None
+    
+    for i, (repo_name, score, html_path) in enumerate(notifications):
+        print(f'\n[NOTIFICATION] Sending notifications for {repo_name.replace(ASSIGNMENT_REPO_PREFIX, "")}...')
+        if uploads is None:
+            send_teams_notification(repo_name, score, html_path)
+        else:
+            send_teams_notification(repo_name, score, html_path, uploaded_file=uploads[i], upload_report=False)
+
 # --- MOODLE INTEGRATION ---
 
-def upload_grade_to_moodle(student_username, score, repo_name):
+def upload_grades_to_moodle(uploads, dry_run=False):
     """
-    Upload grade to Moodle gradebook using MoodleIntegration module.
-    Uses configuration from config.py.
+    Upload several grades to the Moodle gradebook with multi-student requests.
+    Only grades that differ from the current gradebook are written.
+    
+    Args:
+        uploads: List of (student_username, score, repo_name) tuples
+        dry_run: Print the planned changes without writing them
+    
+    Returns:
+        Dictionary repo_name -> True if the grade was written
     """
+    outcome = {repo_name: False for _, _, repo_name in uploads}
+    if not uploads:
+        return outcome
+    
     try:
         # Check if Moodle is configured
         if not MOODLE_URL or not MOODLE_TOKEN:
             print("[SKIP] Moodle not configured (set MOODLE_URL and MOODLE_TOKEN in config.py)")
-            return False
+            return outcome
         
         # Import MoodleIntegration module (not class)
         try:
             import MoodleIntegration
+            import moodle_directory
         except ImportError:
             print("[SKIP] MoodleIntegration.py module not available")
-            return False
+            return outcome
         
-        # Step 1: Test Moodle connection
+        import grade_ledger
+        from config import STUDENT_EMAILS
+        
+        grade_item = str(LARAVEL_MOODLE_GRADE_ITEM_ID)
+        run_id = grade_ledger.new_run_id()
+        confirmed = grade_ledger.confirmed_scores(grade_item)
+        
+        # Skip grades the ledger shows Moodle already confirmed (reruns only resend what is missing)
+        to_send = []
+        for student_username, score, repo_name in uploads:
+            student_email = STUDENT_EMAILS.get(repo_name)
+            if student_email and grade_ledger.is_confirmed(student_email.split('@')[0], grade_item, score, confirmed):
+                print(f"[MOODLE] = {student_username}: {score}/100 already confirmed, skipping")
+                outcome[repo_name] = True
+            else:
+                to_send.append((student_username, score, repo_name))
+        
+        if not to_send:
+            return outcome
+        
+        # Step 1: Test Moodle connection (once per session)
         print(f"[MOODLE] Testing connection...")
-        site_info = MoodleIntegration.call_moodle_api('core_webservice_get_site_info')
+        site_info = moodle_directory.get_site_info()
         if not site_info:
             print("[MOODLE] ✗ Connection failed")
-            return False
+            return outcome
         
-        # Step 2: Get student email from config
-        from config import STUDENT_EMAILS
-        student_email = STUDENT_EMAILS.get(repo_name)
-        
-        if not student_email:
-            print(f"[MOODLE] ✗ No email mapping found for {repo_name} in config.py")
-            return False
-        
-        # Extract Moodle username from email (e.g., "202300203" from "202300203@my.apiu.edu")
-        moodle_username = student_email.split('@')[0]
+        # Step 2: Resolve every student to a Moodle user (one bulk request at most)
+        resolved = []
+        for student_username, score, repo_name in to_send:
+            student_email = STUDENT_EMAILS.get(repo_name)
+            if not student_email:
+                print(f"[MOODLE] ✗ No email mapping found for {repo_name} in config.py")
+                continue
+            
+            # Extract Moodle username from email (e.g., "202300203" from "202300203@my.apiu.edu")
+            moodle_username = student_email.split('@')[0]
+            
+            # Resolved from the cached course enrolment index
+            user = moodle_directory.find_user(LARAVEL_MOODLE_COURSE_ID, moodle_username, student_email)
+            if not user:
+                print(f"[MOODLE] ✗ Student not found in Moodle: {moodle_username}")
+                continue
+            
+            print(f"[MOODLE] ✓ Found student: {user['fullname']} (ID: {user['id']})")
+            resolved.append((repo_name, score, user['id'], user['fullname'], moodle_username))
         
-        # Step 3: Look up student by username
-        print(f"[MOODLE] Looking up student: {moodle_username} ({student_email})")
-        users = MoodleIntegration.call_moodle_api('core_user_get_users', {
-            'criteria[0][key]': 'username',
-            'criteria[0][value]': moodle_username
-        })
+        if not resolved:
+            return outcome
         
-        if not users or 'users' not in users or len(users['users']) == 0:
-            print(f"[MOODLE] ✗ Student not found in Moodle: {moodle_username}")
-            return False
+        # Step 3: Upload grades, many students per request
+        if not dry_run:
+            grade_ledger.record_many(
+                [(moodle_username, grade_item, score, grade_ledger.STATUS_PENDING, None)
+                 for _, score, _, _, moodle_username in resolved],
+                run_id
+            )
+        print(f"[MOODLE] Uploading {len(resolved)} grade(s) to grade item {LARAVEL_MOODLE_GRADE_ITEM_ID}...")
+        status = MoodleIntegration.sync_grades(
+            [(student_id, score) for _, score, student_id, _, _ in resolved],
+            {
+                'source': 'laravel_grader',
+                'courseid': LARAVEL_MOODLE_COURSE_ID,
+                'component': 'mod_assign',
+                'activityid': LARAVEL_MOODLE_ACTIVITY_ID,
+                'itemnumber': 0,
+                'itemdetails[itemname]': 'LaravelEventManagement',
+                'itemdetails[idnumber]': str(LARAVEL_MOODLE_GRADE_ITEM_ID)
+            },
+            grade_item_id=LARAVEL_MOODLE_GRADE_ITEM_ID,
+            dry_run=dry_run,
+            labels={student_id: fullname for _, _, student_id, fullname, _ in resolved}
+        )
+        if dry_run:
+            return outcome
         
-        student_id = users['users'][0]['id']
-        student_fullname = users['users'][0]['fullname']
-        print(f"[MOODLE] ✓ Found student: {student_fullname} (ID: {student_id})")
+        ledger_rows = []
+        for repo_name, score, student_id, student_fullname, moodle_username in resolved:
+            if status.get(student_id) == MoodleIntegration.GRADE_OVERRIDDEN:
+                print(f"[MOODLE] - Grade for {student_fullname} is overridden in Moodle, left alone")
+                ledger_rows.append((moodle_username, grade_item, score, grade_ledger.STATUS_OVERRIDDEN, None))
+            elif status.get(student_id):
+                print(f"[MOODLE] ✓ Grade {score}/100 uploaded successfully for {student_fullname}")
+                outcome[repo_name] = True
+                ledger_rows.append((moodle_username, grade_item, score, grade_ledger.STATUS_CONFIRMED, None))
+            else:
+                print(f"[MOODLE] ✗ Failed to upload grade for {student_fullname} (check Moodle API response)")
+                ledger_rows.append((moodle_username, grade_item, score, grade_ledger.STATUS_FAILED, None))
         
-        # Step 4: Upload grade
-        print(f"[MOODLE] Uploading grade {score}/100 to grade item {LARAVEL_MOODLE_GRADE_ITEM_ID}...")
-        result = MoodleIntegration.call_moodle_api('core_grades_update_grades', {
-            'source': 'laravel_grader',
-            'courseid': LARAVEL_MOODLE_COURSE_ID,
-            'component': 'mod_assign',
-            'activityid': LARAVEL_MOODLE_ACTIVITY_ID,
-            'itemnumber': 0,
-            'grades[0][studentid]': student_id,
-            'grades[0][grade]': score,
-            'itemdetails[itemname]': 'LaravelEventManagement',
-            'itemdetails[idnumber]': str(LARAVEL_MOODLE_GRADE_ITEM_ID)
-        })
+        # Record the outcome in the upload ledger
+        grade_ledger.record_many(ledger_rows, run_id)
         
-        if result is not None:
-            print(f"[MOODLE] ✓ Grade uploaded successfully for {student_fullname}")
-            
-            # Log the upload
-            log_entry = f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | {moodle_username} | {student_fullname} | {repo_name} | {score}/100\n"
-            with open('moodle_laravel_grade_log.txt', 'a', encoding='utf-8') as f:
-                f.write(log_entry)
-            
-            return True
-        else:
-            print(f"[MOODLE] ✗ Failed to upload grade (check Moodle API response)")
-            return False
+        return outcome
             
     except Exception as e:
-        print(f"[MOODLE] Error uploading grade: {e}")
+        print(f"[MOODLE] Error uploading grades: {e}")
         import traceback
         traceback.print_exc()
-        return False
+        return outcome
 
 # --- FUNCTIONALITY TESTING ---
 
@@ -992,6 +984,24 @@ def run_functionality_tests(laravel_path):
         runner = LaravelTestRunner(test_suite_path, Path(laravel_path))
         report = runner.run_full_test_suite()
         
+        outcome = report['summary'].get('outcome') if report else None
+        if outcome in RUNAWAY_OUTCOMES:
+            # Runaway submission (infinite loop, memory blow-up, output flood)
+            print(f"[KILLED] Functionality tests stopped: {RUNAWAY_OUTCOMES[outcome]}")
+            return {
+                'score': 0,
+                'max_score': 100,
+                'passed': 0,
+                'total': 0,
+                'failed': 0,
+                'outcome': outcome,
+                'remarks': [
+                    f"⛔ Test run stopped: the project {RUNAWAY_OUTCOMES[outcome]}",
+                    "Check for infinite loops, unbounded queries or recursive calls"
+                ],
+                'details': []
+            }
+        
         if report and report['summary']['total_tests'] > 0:
             score = report['summary']['score']
             passed = report['summary']['passed']
@@ -1004,11 +1014,13 @@ def run_functionality_tests(laravel_path):
                 'passed': passed,
                 'total': total,
                 'failed': failed,
+                'outcome': outcome,
                 'remarks': [
                     f"✓ {passed} tests passed",
                     f"✗ {failed} tests failed" if failed > 0 else "All tests passed!",
                     f"Pass rate: {score}%"
-                ],
+                ] + ([f"⚠ {report['summary']['flaky']} failed test(s) passed on a rerun (flaky, not credited)"]
+                     if report['summary'].get('flaky') else []),
                 'details': report.get('test_details', [])
             }
         else:
@@ -1069,6 +1081,7 @@ def grade_project(repo, path):
             "test_total": test_results['total'],
             "test_failed": test_results['failed'],
             "pass_rate": f"{test_results['score']}%",
+            "outcome": test_results.get('outcome'),
             "remarks": test_results['remarks']
         }
         total += test_score
@@ -1085,7 +1098,7 @@ def grade_project(repo, path):
 
 # --- EXECUTION ---
 
-def main(update_repos=False, student_filter=None, skip_teams=False, skip_moodle=False):
+def main(update_repos=False, student_filter=None, skip_teams=False, skip_moodle=False, dry_run=False):
     """
     Main grading function.
     
@@ -1095,6 +1108,7 @@ def main(update_repos=False, student_filter=None, skip_teams=False, skip_moodle=
         student_filter: List of GitHub usernames to grade. If None, grade all students.
         skip_teams: If True, skip sending Teams notifications.
         skip_moodle: If True, skip uploading grades to Moodle.
+        dry_run: If True, only print the Moodle grade changes that would be made.
     """
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     repos = [r for r in org.get_repos() if r.name.startswith(ASSIGNMENT_REPO_PREFIX)]
@@ -1113,24 +1127,35 @@ def main(update_repos=False, student_filter=None, skip_teams=False, skip_moodle=
             print(f"[INFO] Looking for repos starting with: {ASSIGNMENT_REPO_PREFIX}")
             return
     
-    for repo in repos:
+    pending_notifications = []
+    pending_grades = []
+    graded = 0
+    
+    progress.emit('run_started', total=len(repos))
+    
+    for repo_index, repo in enumerate(repos, start=1):
         print(f'\n{"="*70}')
         print(f'Grading {repo.name}...')
         print("="*70)
+        progress.emit('repo_started', repo=repo.name, index=repo_index, total=len(repos))
         
         local_path = os.path.join(OUTPUT_DIR, repo.name)
         
         # Clone or pull repo
         if not os.path.exists(local_path):
             print(f"[CLONING] {repo.clone_url}")
+            progress.emit('stage', repo=repo.name, stage='cloning')
             try:
                 Repo.clone_from(repo.clone_url.replace('https://', f'https://{GITHUB_TOKEN}@'), local_path)
             except Exception as e:
                 print(f"[ERROR] Failed to clone: {e}")
+                progress.emit('error', repo=repo.name, message=f"Failed to clone: {e}")
+                progress.emit('repo_finished', repo=repo.name, score=None, grade=None)
                 continue
         else:
             if update_repos:
                 print(f"[EXISTS] Repository already cloned, pulling latest changes...")
+                progress.emit('stage', repo=repo.name, stage='pulling')
                 try:
                     r = Repo(local_path)
                     r.remotes.origin.pull()
@@ -1145,10 +1170,13 @@ def main(update_repos=False, student_filter=None, skip_teams=False, skip_moodle=
         
         if not laravel_path:
             print(f"[SKIP] No Laravel project found in {repo.name}")
+            progress.emit('error', repo=repo.name, message="No Laravel project found")
+            progress.emit('repo_finished', repo=repo.name, score=None, grade=None)
             continue
         
         # Grade the project
         try:
+            progress.emit('stage', repo=repo.name, stage='grading')
             r = Repo(local_path)
             score, results, tests_ran = grade_project(r, laravel_path)
             
@@ -1167,25 +1195,40 @@ def main(update_repos=False, student_filter=None, skip_teams=False, skip_moodle=
             # Extract student username from repo name
             student_username = repo.name.replace(ASSIGNMENT_REPO_PREFIX, "")
             
-            # Send Teams notification (unless skipped)
+            # Queue Teams notification (unless skipped); sent after grading so uploads run in parallel
             if not skip_teams:
-                print(f'\n[NOTIFICATION] Sending notifications for {student_username}...')
-                send_teams_notification(repo.name, score, html_report)
+                pending_notifications.append((repo.name, score, html_report))
             else:
                 print(f'\n[SKIP] Teams notification skipped for {student_username}')
             
-            # Upload grade to Moodle (unless skipped)
+            # Queue grade for Moodle (unless skipped); uploaded in bulk after grading
             if not skip_moodle:
-                upload_grade_to_moodle(student_username, score, repo.name)
+                pending_grades.append((student_username, score, repo.name))
             else:
                 print(f'[SKIP] Moodle upload skipped for {student_username}')
             
+            graded += 1
+            progress.emit('repo_finished', repo=repo.name, score=score)
+            
         except Exception as e:
             print(f"[ERROR] Failed to grade project: {e}")
             import traceback
             traceback.print_exc()
+            progress.emit('error', repo=repo.name, message=f"Failed to grade project: {e}")
+            progress.emit('repo_finished', repo=repo.name, score=None, grade=None)
             continue
     
+    if pending_notifications:
+        progress.emit('stage', repo=None, stage='sending Teams notifications')
+    send_teams_notifications(pending_notifications)
+    
+    if pending_grades:
+        print(f'\n[MOODLE] Uploading {len(pending_grades)} grade(s)...')
+        progress.emit('stage', repo=None, stage='uploading grades to Moodle')
+        upload_grades_to_moodle(pending_grades, dry_run=dry_run)
+    
+    progress.emit('run_finished', graded=graded)
+    
     print(f'\n{"="*70}')
     print("Grading complete!")
     print("="*70)
@@ -1208,6 +1251,7 @@ Examples:
   python Laravel_grader.py --skip-teams              # Grade but don't send Teams messages
   python Laravel_grader.py --skip-moodle             # Grade but don't upload to Moodle
   python Laravel_grader.py --skip-teams --skip-moodle  # Only generate reports
+  python Laravel_grader.py --skip-teams --dry-run      # Preview Moodle grade changes
   
   # Combine filters (re-grade one student and send only Teams notification)
   python Laravel_grader.py -s p-e-koko --skip-moodle --update
@@ -1239,10 +1283,18 @@ Examples:
         help='Skip uploading grades to Moodle'
     )
     
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        dest='dry_run',
+        help='Show which Moodle grades would change without writing them'
+    )
+    
     args = parser.parse_args()
     main(
         update_repos=args.update_repos,
         student_filter=args.student_filter,
         skip_teams=args.skip_teams,
-        skip_moodle=args.skip_moodle
+        skip_moodle=args.skip_moodle,
+        dry_run=args.dry_run
     )
@@ -7,6 +7,12 @@ from datetime import datetime
 import sys
 import io
 
+import notification_outbox
+import progress_events as progress
+import results_index
+from atm_rubric import CATEGORIES, MILESTONES, letter_grade
+from teams_report import render_midterm_report, write_teams_report
+
 # Fix encoding for Windows console
 if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
@@ -37,298 +43,40 @@ except ImportError:
 # Initialize OpenAI client
 client = OpenAI(api_key=OPENAI_API_KEY)
 
-# ------------------------------
-# MILESTONE GUIDE WITH WEIGHTED SCORES (Total = 100 points)
-# ------------------------------
-MILESTONES = {
-    # Basic Setup & Core Features (25 points)
-    1: {
-        "desc": "Initial project setup with file structure",
-        "files": ["all folders created"],
-        "weight": 2,
-        "criteria": [
-            "Proper folder structure (includes/, assets/, sql/, admin/)",
-            "Basic files created",
-            "Clear organization"
-        ]
-    },
-    2: {
-        "desc": "Added registration form",
-        "files": ["register.php"],
-        "weight": 3,
-        "criteria": [
-            "HTML form with required fields (name, email, PIN)",
-            "Form structure is valid",
-            "Basic styling or layout"
-        ]
-    },
-    3: {
-        "desc": "Created database schema and users table",
-        "files": ["sql/schema.sql"],
-        "weight": 4,
-        "criteria": [
-            "Users table with proper columns (id, name, email, pin, balance)",
-            "Appropriate data types",
-            "Primary key defined",
-            "Default balance set"
-        ]
-    },
-    4: {
-        "desc": "User registration saved into DB",
-        "files": ["register.php", "includes/db.php"],
-        "weight": 4,
-        "criteria": [
-            "Database connection established",
-            "INSERT query to save user",
-            "PIN is hashed (password_hash or similar)",
-            "Basic error handling"
-        ]
-    },
-    5: {
-        "desc": "Login with session and failed login handling",
-        "files": ["login.php", "includes/auth.php"],
-        "weight": 6,
-        "criteria": [
-            "Login form with email and PIN",
-            "PIN verification (password_verify or similar)",
-            "Session started and user ID stored",
-            "Failed login message displayed",
-            "Redirect to dashboard on success"
-        ]
-    },
-    6: {
-        "desc": "Created dashboard page with balance",
-        "files": ["dashboard.php"],
-        "weight": 4,
-        "criteria": [
-            "Session check to protect page",
-            "User data fetched from database",
-            "Balance displayed",
-            "Basic navigation or menu"
-        ]
-    },
-    7: {
-        "desc": "Added logout functionality",
-        "files": ["logout.php"],
-        "weight": 2,
-        "criteria": [
-            "Session destroyed (session_destroy)",
-            "User redirected to login page",
-            "Works correctly"
-        ]
-    },
-
-    # Security & Validation (20 points)
-    8: {
-        "desc": "Added validation and PIN security",
-        "files": ["helpers.php", "register.php", "login.php"],
-        "weight": 8,
-        "criteria": [
-            "Input validation functions created",
-            "Email format validation",
-            "PIN length/format requirements enforced",
-            "Sanitization of inputs (htmlspecialchars, etc.)",
-            "Validation applied in register and login"
-        ]
-    },
-    21: {
-        "desc": "Add CSRF token helper functions",
-        "files": ["includes/helpers.php", "includes/auth.php"],
-        "weight": 5,
-        "criteria": [
-            "generate_csrf_token() function creates unique token",
-            "Token stored in $_SESSION",
-            "validate_csrf_token($token) function verifies token",
-            "csrf_token_field() returns hidden input HTML",
-            "Proper implementation using random_bytes() or similar",
-            "Token generated on login/session start"
-        ]
-    },
-    22: {
-        "desc": "Integrate CSRF protection across all forms",
-        "files": ["register.php", "login.php", "transaction.php", "transfer.php", "pin_change.php", "admin/*.php"],
-        "weight": 7,
-        "criteria": [
-            "CSRF tokens added to ALL state-changing forms",
-            "Hidden input fields with CSRF token in each form",
-            "Token validation performed before processing each form",
-            "Registration, Login, Transactions, Transfers protected",
-            "Admin forms and PIN change protected",
-            "Proper error messages for invalid/missing tokens",
-            "Prevents Cross-Site Request Forgery attacks"
-        ]
-    },
-
-    # Transaction Features (25 points)
-    9: {
-        "desc": "Dashboard enhancements with recent activities",
-        "files": ["dashboard.php"],
-        "weight": 3,
-        "criteria": [
-            "Recent transactions displayed (5 most recent)",
-            "Query to fetch recent activities from transactions table",
-            "Formatted display (table or list)",
-            "Shows transaction type, amount, and timestamp",
-            "Activities properly logged for display"
-        ]
-    },
-    10: {
-        "desc": "Added combined transaction page (deposit & withdraw)",
-        "files": ["transaction.php", "helpers.php", "auth.php"],
-        "weight": 8,
-        "criteria": [
-            "Form with deposit and withdraw options",
-            "Amount validation (positive, numeric)",
-            "Balance updated in database (UPDATE query)",
-            "Insufficient funds check for withdrawal",
-            "Transaction recorded in transactions table",
-            "Success/error messages shown"
-        ]
-    },
-    11: {
-        "desc": "Atomic Transactions & Enhanced Logging",
-        "files": ["transaction.php", "sql/schema.sql"],
-        "weight": 8,
-        "criteria": [
-            "Transactions table created in schema",
-            "BEGIN TRANSACTION used",
-            "COMMIT on success, ROLLBACK on failure",
-            "Transaction log includes user_id, type, amount, timestamp",
-            "Proper error handling"
-        ]
-    },
-    12: {
-        "desc": "Implement User-to-User Transfers",
-        "files": ["transfer.php", "transaction.php", "helpers.php"],
-        "weight": 6,
-        "criteria": [
-            "Transfer form with recipient selection/input",
-            "Sender balance decreased",
-            "Recipient balance increased",
-            "Both updates in single transaction (atomic)",
-            "Validation: sufficient funds, valid recipient",
-            "Both transactions logged"
-        ]
-    },
-
-    # Advanced Features (15 points)
-    13: {
-        "desc": "Advanced Transaction History with Filtering & Pagination",
-        "files": ["history.php", "helpers.php"],
-        "weight": 7,
-        "criteria": [
-            "Transaction history page created",
-            "Filter by type (deposit/withdraw/transfer)",
-            "Filter by date range",
-            "Pagination implemented (LIMIT, OFFSET)",
-            "Navigation between pages works"
-        ]
-    },
-    14: {
-        "desc": "Refactor Transactions with AJAX",
-        "files": ["dashboard.php", "assets/js/app.js", "api/process_transaction.php"],
-        "weight": 8,
-        "criteria": [
-            "JavaScript AJAX code written",
-            "API endpoint created (process_transaction.php)",
-            "JSON response from API",
-            "Page updates without refresh",
-            "Error handling in JavaScript"
-        ]
-    },
-
-    # Admin & Logging (10 points)
-    15: {
-        "desc": "Develop Admin Dashboard with User Management",
-        "files": ["admin/index.php", "admin/users.php", "admin/auth_admin.php", "includes/auth.php"],
-        "weight": 5,
-        "criteria": [
-            "Admin authentication mechanism",
-            "Admin dashboard page",
-            "List all users",
-            "Admin can view user details",
-            "Basic admin role check"
-        ]
-    },
-    16: {
-        "desc": "Add activity logging schema and helper",
-        "files": ["sql/schema.sql", "includes/helpers.php"],
-        "weight": 2,
-        "criteria": [
-            "Activity_log table created with proper structure",
-            "Columns: id, user_id, activity_type, details, ip_address, created_at",
-            "Foreign key relationship to users table",
-            "Helper function log_activity() to record events",
-            "Function captures user_id, action, IP address"
-        ]
-    },
-    17: {
-        "desc": "Integrate activity logging for core actions",
-        "files": ["login.php", "logout.php"],
-        "weight": 3,
-        "criteria": [
-            "Login action logged",
-            "Logout action logged",
-            "IP address captured",
-            "Timestamp recorded"
-        ]
-    },
-
-    # Additional Security Features (5 points)
-    18: {
-        "desc": "Implement PIN change functionality",
-        "files": ["pin_change.php", "dashboard.php", "includes/helpers.php"],
-        "weight": 2,
-        "criteria": [
-            "PIN change form created",
-            "Old PIN verified",
-            "New PIN hashed",
-            "Database updated",
-            "Link from dashboard"
-        ]
-    },
-    19: {
-        "desc": "Enforce daily withdrawal limits",
-        "files": ["transaction.php", "includes/helpers.php"],
-        "weight": 2,
-        "criteria": [
-            "Function to check daily withdrawal total (last 24 hours)",
-            "Realistic daily limit enforced (e.g., $5,000/day)",
-            "Query sums all withdrawals within last 24 hours",
-            "Rejection if current withdrawal + 24hr sum > limit",
-            "Clear error message when limit exceeded"
-        ]
-    },
-    20: {
-        "desc": "Implement rate limiting on transfers",
-        "files": ["transfer.php", "api/process_transaction.php"],
-        "weight": 1,
-        "criteria": [
-            "Track transfer attempts in activity_log or transactions table",
-            "Limit enforced (e.g., max 10 transfers per hour)",
-            "Count recent transfers before processing",
-            "Error message displayed when rate limit exceeded",
-            "Prevents spam/abuse of transfer feature"
-        ]
-    },
-
-    # Code Quality (evaluated holistically, not separately scored)
-    23: {
-        "desc": "Code Quality & Documentation",
-        "files": ["includes/helpers.php", "includes/auth.php", "all PHP files"],
-        "weight": 0,
-        "criteria": [
-            "Comprehensive PHPDoc comments for all functions",
-            "Parameters, return values, and purpose documented",
-            "Inline comments explain complex logic",
-            "Functions have clear, descriptive names",
-            "Proper indentation and code formatting",
-            "Optimized database queries (prepared statements)",
-            "Duplicate code refactored into reusable functions",
-            "No major security vulnerabilities",
-            "Business rules and assumptions documented"
-        ]
-    }
+# Indicator, feedback and next steps for each letter grade in atm_rubric.GRADE_BANDS
+GRADE_FEEDBACK = {
+    "A (Excellent)": (
+        "[EXCELLENT]",
+        "Outstanding work! You have demonstrated excellent understanding and implementation of the project requirements.",
+        "Continue maintaining this high level of quality in your future projects."),
+    "B+ (Very Good)": (
+        "[VERY GOOD]",
+        "Very good work! You have a strong grasp of the concepts with minor areas for improvement.",
+        "Review the areas marked for improvement to achieve excellence."),
+    "B (Good)": (
+        "[GOOD]",
+        "Good work! You have demonstrated solid understanding of the core concepts.",
+        "Focus on implementing more advanced features and improving code quality."),
+    "C+ (Fairly Good)": (
+        "[FAIRLY GOOD]",
+        "Fairly good effort! You have grasped the basic concepts but need to strengthen your implementation.",
+        "Review the feedback on each milestone and work on completing missing requirements."),
+    "C (Fair)": (
+        "[FAIR]",
+        "Fair work. You have shown basic understanding but significant improvements are needed.",
+        "Review course materials, complete missing milestones, and seek help if needed."),
+    "D+ (Poor)": (
+        "[POOR]",
+        "Your work needs significant improvement. Many requirements are incomplete or missing.",
+        "Schedule time with Mr. Rindra to review the project requirements and get guidance."),
+    "D (Very Poor)": (
+        "[VERY POOR]",
+        "Your submission is incomplete and does not meet the minimum requirements.",
+        "Meet with Mr. Rindra immediately to discuss how to improve your work."),
+    "F (Fail)": (
+        "[FAIL]",
+        "Your submission does not meet the basic requirements of this project.",
+        "You must redo this project. Please consult with Mr. Rindra for guidance."),
 }
 
 
@@ -729,14 +477,18 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # Prepare to collect student information
 student_summary = []
 
-for repo in repos:
+progress.emit('run_started', total=len(repos))
+
+for repo_index, repo in enumerate(repos, start=1):
     print(f"\n[PROCESSING] {repo.full_name} ...")
+    progress.emit('repo_started', repo=repo.name, index=repo_index, total=len(repos))
     local_path = os.path.join(OUTPUT_DIR, repo.name)
     result_file = os.path.join(local_path, "result.html")
 
     try:
         if not os.path.exists(local_path):
             print("Cloning repository...")
+            progress.emit('stage', repo=repo.name, stage='cloning')
             Repo.clone_from(
                 repo.clone_url.replace("https://", f"https://{GITHUB_TOKEN}@"),
                 local_path
@@ -747,6 +499,7 @@ for repo in repos:
                 print("   Scores will remain consistent across multiple runs")
             else:
                 print("Repo already exists. Pulling latest changes...")
+                progress.emit('stage', repo=repo.name, stage='pulling')
                 r = Repo(local_path)
                 r.remotes.origin.pull()
 
@@ -775,6 +528,8 @@ for repo in repos:
         student_scores = []
         total_weighted_score = 0.0
         total_possible_weight = 0
+        milestone_total = len([i for i in range(1, len(commit_list) + 1) if i in MILESTONES])
+        progress.emit('stage', repo=repo.name, stage='grading')
 
         # Prepare output log for file - HTML format for Teams
         output_log = []
@@ -977,11 +732,14 @@ for repo in repos:
 
                 student_scores.append({
                     'milestone_num': i,
+                    'desc': milestone['desc'],
                     'quality_score': 0,
                     'weight': milestone_weight,
                     'earned_points': 0,
                     'remark': 'No significant code changes detected'
                 })
+                progress.emit('milestone_scored', repo=repo.name, milestone=len(student_scores),
+                              total=milestone_total, quality=0, earned=0, weight=milestone_weight)
                 continue
 
             # Test-based grading - checks actual files and code features
@@ -1000,6 +758,7 @@ for repo in repos:
 
             student_scores.append({
                 'milestone_num': i,
+                'desc': milestone['desc'],
                 'quality_score': quality_score,
                 'weight': milestone_weight,
                 'earned_points': earned_points,
@@ -1008,6 +767,9 @@ for repo in repos:
 
             total_weighted_score += earned_points
             total_possible_weight += milestone_weight
+            progress.emit('milestone_scored', repo=repo.name, milestone=len(student_scores),
+                          total=milestone_total, quality=quality_score, earned=earned_points,
+                          weight=milestone_weight)
 
             # Print to console
             print(f"\n{'=' * 70}")
@@ -1044,6 +806,7 @@ for repo in repos:
 
             # Get files found/missing info
             found_files, missing_files = check_files_exist(local_path, milestone.get('files', []))
+            student_scores[-1]['missing_files'] = missing_files
 
             # Files status section
             output_log.append(f'        <h3>Files Status:</h3>')
@@ -1145,17 +908,11 @@ for repo in repos:
                 f'        <p>This section summarizes your performance across all milestone categories. Review your strengths and areas for improvement below.</p>')
 
             # Group by category for display
-            categories = {
-                "Basic Setup & Core Features": [1, 2, 3, 4, 5, 6, 7],
-                "Security & Validation": [8, 21, 22],
-                "Transaction Features": [9, 10, 11, 12],
-                "Advanced Features": [13, 14],
-                "Admin & Logging": [15, 16, 17],
-                "Additional Security": [18, 19, 20]
-            }
+            categories = CATEGORIES
 
             output_log.append(f'        <h3>Category Breakdown</h3>')
             output_log.append(f'        <ul>')
+            category_rows = []
 
             for category_name, milestone_nums in categories.items():
                 category_earned = sum(
@@ -1184,6 +941,7 @@ for repo in repos:
                     output_log.append(
                         f'            <li><strong>{category_name}:</strong> {category_earned:.2f}/{category_total} pts ({percentage:.1f}%) <span class="{indicator_class}">{indicator}</span></li>')
                     print(f"{category_name:35} {category_earned:5.2f}/{category_total:2} pts ({percentage:5.1f}%)")
+                    category_rows.append((category_name, category_earned, category_total, percentage))
 
             output_log.append(f'        </ul>')
             output_log.append(f'    </div>')
@@ -1204,11 +962,15 @@ for repo in repos:
                         f"[INFO] Instruction Following: Average quality {avg_quality:.1f}% < {INSTRUCTION_THRESHOLD}% (no bonus)")
 
             # Check late submission penalty
+            submitted_late = None
+            last_commit_time = None
             try:
                 deadline = datetime.strptime(SUBMISSION_DEADLINE, "%Y-%m-%d %H:%M:%S")
                 if commit_list:
                     last_commit = commit_list[-1]
+                    last_commit_time = last_commit.committed_date
                     last_commit_date = datetime.fromtimestamp(last_commit.committed_date)
+                    submitted_late = last_commit_date > deadline
 
                     if last_commit_date > deadline:
                         bonus_total -= LATE_SUBMISSION_PENALTY
@@ -1267,46 +1029,8 @@ for repo in repos:
             print(f"{'-' * 70}")
 
             # Letter grade with detailed feedback
-            if total_weighted_score >= 80:
-                grade = "A (Excellent)"
-                grade_indicator = "[EXCELLENT]"
-                grade_feedback = "Outstanding work! You have demonstrated excellent understanding and implementation of the project requirements."
-                next_steps = "Continue maintaining this high level of quality in your future projects."
-            elif total_weighted_score >= 75:
-                grade = "B+ (Very Good)"
-                grade_indicator = "[VERY GOOD]"
-                grade_feedback = "Very good work! You have a strong grasp of the concepts with minor areas for improvement."
-                next_steps = "Review the areas marked for improvement to achieve excellence."
-            elif total_weighted_score >= 70:
-                grade = "B (Good)"
-                grade_indicator = "[GOOD]"
-                grade_feedback = "Good work! You have demonstrated solid understanding of the core concepts."
-                next_steps = "Focus on implementing more advanced features and improving code quality."
-            elif total_weighted_score >= 65:
-                grade = "C+ (Fairly Good)"
-                grade_indicator = "[FAIRLY GOOD]"
-                grade_feedback = "Fairly good effort! You have grasped the basic concepts but need to strengthen your implementation."
-                next_steps = "Review the feedback on each milestone and work on completing missing requirements."
-            elif total_weighted_score >= 60:
-                grade = "C (Fair)"
-                grade_indicator = "[FAIR]"
-                grade_feedback = "Fair work. You have shown basic understanding but significant improvements are needed."
-                next_steps = "Review course materials, complete missing milestones, and seek help if needed."
-            elif total_weighted_score >= 55:
-                grade = "D+ (Poor)"
-                grade_indicator = "[POOR]"
-                grade_feedback = "Your work needs significant improvement. Many requirements are incomplete or missing."
-                next_steps = "Schedule time with Mr. Rindra to review the project requirements and get guidance."
-            elif total_weighted_score >= 50:
-                grade = "D (Very Poor)"
-                grade_indicator = "[VERY POOR]"
-                grade_feedback = "Your submission is incomplete and does not meet the minimum requirements."
-                next_steps = "Meet with Mr. Rindra immediately to discuss how to improve your work."
-            else:
-                grade = "F (Fail)"
-                grade_indicator = "[FAIL]"
-                grade_feedback = "Your submission does not meet the basic requirements of this project."
-                next_steps = "You must redo this project. Please consult with Mr. Rindra for guidance."
+            grade = letter_grade(total_weighted_score)
+            grade_indicator, grade_feedback, next_steps = GRADE_FEEDBACK[grade]
 
             # Print to console
             print(f"\nFINAL GRADE: {grade}")
@@ -1406,6 +1130,36 @@ for repo in repos:
             except Exception as e:
                 print(f"Failed to write result file: {e}")
 
+            # Compact rendering for Teams, built from the same data
+            try:
+                teams_html = render_midterm_report(student_github_username, {
+                    'final_score': total_weighted_score,
+                    'grade': grade,
+                    'grade_feedback': grade_feedback,
+                    'next_steps': next_steps,
+                    'milestones': student_scores,
+                    'categories': category_rows,
+                    'adjustments': bonuses_penalties,
+                })
+                write_teams_report(local_path, teams_html)
+                print(f"Teams report saved ({len(teams_html.encode('utf-8'))} bytes)")
+
+                # Queue the notification; unchanged reports are not sent again
+                status = notification_outbox.enqueue('midterm', repo.name, teams_html)
+                print(f"Teams notification: {status}")
+            except Exception as e:
+                print(f"Failed to write Teams report: {e}")
+
+            # Raw inputs kept so score_matrix.py can re-score the cohort without regrading
+            results_index.record_result('midterm', repo.name, total_weighted_score, grade, result_file,
+                                        github_username=student_github_username,
+                                        details={
+                                            'quality': {s['milestone_num']: s['quality_score'] for s in student_scores},
+                                            'late': submitted_late,
+                                            'last_commit': last_commit_time,
+                                            'categories': {name: [earned, total] for name, earned, total, _ in category_rows},
+                                        })
+
             # Collect student summary information
             student_summary.append({
                 'repo_name': repo.name,
@@ -1413,6 +1167,7 @@ for repo in repos:
                 'final_score': total_weighted_score,
                 'grade': grade
             })
+            progress.emit('repo_finished', repo=repo.name, score=total_weighted_score, grade=grade)
 
         else:
             print("WARNING: No milestones graded for this repo.")
@@ -1430,6 +1185,10 @@ for repo in repos:
             except Exception as e:
                 print(f"Failed to write result file: {e}")
 
+            results_index.record_result('midterm', repo.name, 0.0, "No submissions", result_file,
+                                        github_username=student_github_username,
+                                        details={'quality': {}, 'late': None, 'last_commit': None, 'categories': {}})
+
             # Collect student summary even if no milestones graded
             student_summary.append({
                 'repo_name': repo.name,
@@ -1437,11 +1196,18 @@ for repo in repos:
                 'final_score': 0.0,
                 'grade': "No submissions"
             })
+            progress.emit('repo_finished', repo=repo.name, score=0.0, grade="No submissions")
 
     except GitCommandError as e:
         print(f"Git error for {repo.name}: {e}")
+        progress.emit('error', repo=repo.name, message=f"Git error: {e}")
+        progress.emit('repo_finished', repo=repo.name, score=None, grade=None)
     except Exception as e:
         print(f"Unexpected error for {repo.name}: {e}")
+        progress.emit('error', repo=repo.name, message=str(e))
+        progress.emit('repo_finished', repo=repo.name, score=None, grade=None)
+
+progress.emit('run_finished', graded=len(student_summary))
 
 # ------------------------------
 # WRITE STUDENT SUMMARY FILE
@@ -14,6 +14,9 @@ import sys
 import os
 import re
 
+import grade_ledger
+from http_client import moodle_session
+
 # ------------------------------
 # CONFIGURATION
 # ------------------------------
@@ -52,6 +55,18 @@ except ImportError:
     print("=" * 70)
     sys.exit(1)
 
+# Students per core_grades_update_grades call (optional override in config.py)
+try:
+    from config import MOODLE_GRADE_BATCH_SIZE
+except ImportError:
+    MOODLE_GRADE_BATCH_SIZE = 25
+
+# core_grades_update_grades returns 0 (GRADE_UPDATE_OK) on success
+GRADE_UPDATE_OK = 0
+
+# sync_grades() status for students whose grade was manually overridden in Moodle
+GRADE_OVERRIDDEN = 'overridden'
+
 
 # ------------------------------
 # HELPER FUNCTIONS
@@ -236,7 +251,7 @@ def call_moodle_api(function_name, parameters=None):
     params.update(parameters)
 
     try:
-        response = requests.post(url, data=params, timeout=30)
+        response = moodle_session().post(url, data=params, timeout=30)
         response.raise_for_status()
         result = response.json()
 
@@ -258,13 +273,166 @@ def call_moodle_api(function_name, parameters=None):
         return None
 
 
+def grade_update_succeeded(result):
+    """True if a core_grades_update_grades response means the grades were written"""
+    if result is None:
+        return False
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result == GRADE_UPDATE_OK
+    return True
+
+
+def update_grades_bulk(grades, base_params, batch_size=None):
+    """
+    Write many students' grades with multi-student core_grades_update_grades calls.
+
+    Moodle applies a call as a whole, so when a batch fails it is split in
+    half and retried until the students responsible are isolated.
+
+    Args:
+        grades: List of (moodle_user_id, grade) tuples
+        base_params: source/courseid/component/activityid/itemnumber (and any itemdetails)
+        batch_size: Students per request (defaults to MOODLE_GRADE_BATCH_SIZE)
+
+    Returns:
+        Dictionary moodle_user_id -> True/False
+    """
+    batch_size = batch_size or MOODLE_GRADE_BATCH_SIZE
+    status = {}
+    requests_made = 0
+
+    def send(chunk):
+        nonlocal requests_made
+        params = dict(base_params)
+        for i, (user_id, grade) in enumerate(chunk):
+            params[f'grades[{i}][studentid]'] = user_id
+            params[f'grades[{i}][grade]'] = grade
+        requests_made += 1
+        if grade_update_succeeded(call_moodle_api('core_grades_update_grades', params)):
+            for user_id, _ in chunk:
+                status[user_id] = True
+        elif len(chunk) == 1:
+            status[chunk[0][0]] = False
+        else:
+            middle = len(chunk) // 2
+            send(chunk[:middle])
+            send(chunk[middle:])
+
+    for start in range(0, len(grades), batch_size):
+        send(grades[start:start + batch_size])
+
+    print(f"   Sent {len(grades)} grade(s) in {requests_made} request(s)")
+    return status
+
+
+def get_current_grades(course_id, grade_item_id=None, activity_id=None):
+    """
+    Fetch the gradebook's current value of one grade item for every student in one request.
+
+    The item is matched by grade item ID, idnumber or course module (activity) ID.
+
+    Returns:
+        Dictionary moodle_user_id -> {'grade': float or None, 'overridden': bool},
+        or None if the gradebook could not be read
+    """
+    result = call_moodle_api('gradereport_user_get_grade_items', {'courseid': course_id})
+    if not result or 'usergrades' not in result:
+        return None
+
+    current = {}
+    for usergrade in result['usergrades']:
+        for item in usergrade.get('gradeitems', []):
+            matches = (
+                (grade_item_id is not None and (item.get('id') == grade_item_id or
+                                                str(item.get('idnumber') or '') == str(grade_item_id))) or
+                (activity_id is not None and item.get('cmid') == activity_id)
+            )
+            if matches:
+                raw = item.get('graderaw')
+                current[usergrade['userid']] = {
+                    'grade': float(raw) if raw is not None else None,
+                    'overridden': bool(item.get('gradeoverridden')),
+                }
+                break
+    return current
+
+
+def plan_grade_sync(grades, current):
+    """
+    Diff new scores against the gradebook.
+
+    Args:
+        grades: List of (moodle_user_id, grade) tuples
+        current: Output of get_current_grades()
+
+    Returns:
+        Dictionary with 'changed' [(user_id, old, new)], 'unchanged' [user_id]
+        and 'overridden' [(user_id, old, new)] - manual overrides are never pushed
+    """
+    plan = {'changed': [], 'unchanged': [], 'overridden': []}
+    for user_id, grade in grades:
+        existing = current.get(user_id, {})
+        old = existing.get('grade')
+        if old is not None and round(old, 2) == round(float(grade), 2):
+            plan['unchanged'].append(user_id)
+        elif existing.get('overridden'):
+            plan['overridden'].append((user_id, old, grade))
+        else:
+            plan['changed'].append((user_id, old, grade))
+    return plan
+
+
+def sync_grades(grades, base_params, grade_item_id=None, dry_run=False, labels=None):
+    """
+    Push only the grades that differ from what Moodle already has.
+
+    Args:
+        grades: List of (moodle_user_id, grade) tuples
+        base_params: Parameters for core_grades_update_grades (must include courseid)
+        grade_item_id: Grade item ID or idnumber used to find current values
+        dry_run: Print the planned changes without writing anything
+        labels: Optional dictionary moodle_user_id -> display name
+
+    Returns:
+        Dictionary moodle_user_id -> True (written or already correct),
+        False (failed) or GRADE_OVERRIDDEN (left alone), empty when dry_run is set
+    """
+    labels = labels or {}
+    current = get_current_grades(base_params['courseid'], grade_item_id, base_params.get('activityid'))
+    if current is None:
+        print("   [WARN] Could not read current gradebook, pushing every grade")
+        plan = {'changed': [(user_id, None, grade) for user_id, grade in grades], 'unchanged': [], 'overridden': []}
+    else:
+        plan = plan_grade_sync(grades, current)
+
+    print(f"   Sync plan: {len(plan['changed'])} to update, {len(plan['unchanged'])} unchanged, "
+          f"{len(plan['overridden'])} manually overridden (left alone)")
+    for user_id, old, new in plan['changed']:
+        old_text = '-' if old is None else f"{old:g}"
+        print(f"     ~ {labels.get(user_id, user_id)}: {old_text} -> {new}")
+    for user_id, old, new in plan['overridden']:
+        print(f"     ! {labels.get(user_id, user_id)}: overridden at {old} (new score {new} not pushed)")
+
+    if dry_run:
+        print("   [DRY RUN] No grades were written")
+        return {}
+
+    status = {user_id: True for user_id in plan['unchanged']}
+    for user_id, _, _ in plan['overridden']:
+        status[user_id] = GRADE_OVERRIDDEN
+    if plan['changed']:
+        status.update(update_grades_bulk([(user_id, new) for user_id, _, new in plan['changed']], base_params))
+    return status
+
+
 def test_connection():
     """Test basic connection to Moodle"""
     print("\n" + "=" * 70)
     print("TEST 1: Testing Moodle Connection")
     print("=" * 70)
 
-    result = call_moodle_api('core_webservice_get_site_info')
+    import moodle_directory
+    result = moodle_directory.get_site_info()
 
     if result:
         print("[OK] Connection successful!")
@@ -301,32 +469,35 @@ def test_get_course_info():
 
 
 def test_get_enrolled_users(student_usernames=None):
-    """Test retrieving enrolled users in the course using core_user_get_users"""
+    """Test retrieving enrolled users in the course using core_enrol_get_enrolled_users"""
     print("\n" + "=" * 70)
     print("TEST 3: Retrieving Course Users")
     print("=" * 70)
 
+    import moodle_directory
+
     # If no usernames provided, get from config
+    students_config = get_student_usernames_from_config()
+    email_for = {s['moodle_username']: s['email'] for s in students_config}
     if student_usernames is None:
-        students_config = get_student_usernames_from_config()
         student_usernames = [s['moodle_username'] for s in students_config]
 
-    # Moodle doesn't support multiple criteria with the same key
-    # So we need to make individual API calls for each user
-    print(f"Searching for {len(student_usernames)} students individually...")
+    # One core_enrol_get_enrolled_users call (cached on disk) instead of one lookup per student
+    print(f"Resolving {len(student_usernames)} students from the course enrolment list...")
+
+    found = moodle_directory.find_users(
+        MOODLE_COURSE_ID,
+        [(username, email_for.get(username)) for username in student_usernames]
+    )
 
     all_users = []
     found_count = 0
 
     for username in student_usernames:
-        result = call_moodle_api('core_user_get_users', {
-            'criteria[0][key]': 'username',
-            'criteria[0][value]': username
-        })
-
-        if result and 'users' in result and len(result['users']) > 0:
-            user = result['users'][0]
-            all_users.append(user)
+        user = found.get(username)
+        if user:
+            # Enrolment lists may omit usernames when matched by email
+            all_users.append({**user, 'username': user.get('username') or username})
             found_count += 1
             print(f"   [+] Found: {username} (ID: {user.get('id')})")
         else:
@@ -338,7 +509,7 @@ def test_get_enrolled_users(student_usernames=None):
         print("\n   Sample users (first 5):")
         for user in all_users[:5]:
             print(f"   - ID: {user.get('id')} | Username: {user.get('username', 'N/A')} | "
-                  f"Name: {user.get('firstname', '')} {user.get('lastname', '')} | "
+                  f"Name: {user.get('fullname', '')} | "
                   f"Email: {user.get('email', 'N/A')}")
         return all_users
     else:
@@ -484,13 +655,14 @@ def test_alternative_grade_update(user_id, grade_value, grade_item_id=None):
         return False
 
 
-def batch_update_grades(mapped_students, moodle_users):
+def batch_update_grades(mapped_students, moodle_users, dry_run=False):
     """
-    Update grades for all students in Moodle
+    Update grades for all students in Moodle (only those that changed)
 
     Args:
         mapped_students: List from map_github_to_moodle_users() with grade data
         moodle_users: List of Moodle user objects from test_get_enrolled_users()
+        dry_run: Only print the planned changes
 
     Returns:
         Dictionary with success/failure counts and details
@@ -508,11 +680,15 @@ def batch_update_grades(mapped_students, moodle_users):
         'total': len(mapped_students),
         'success': 0,
         'failed': 0,
+        'overridden': 0,
         'not_found': 0,
         'details': []
     }
 
     activity_id = MOODLE_ACTIVITY_ID
+    grade_item = str(MOODLE_GRADE_ITEM_ID)
+    run_id = grade_ledger.new_run_id()
+    to_upload = []
 
     for student in mapped_students:
         moodle_username = student['moodle_username']
@@ -531,41 +707,68 @@ def batch_update_grades(mapped_students, moodle_users):
             })
             continue
 
-        moodle_user_id = username_to_id[moodle_username]
-
-        # Update grade
-        result = call_moodle_api('core_grades_update_grades', {
+        to_upload.append(student)
+
+    # Update changed grades, many students per request
+    if not dry_run:
+        grade_ledger.record_many(
+            [(s['moodle_username'], grade_item, s['final_score'], grade_ledger.STATUS_PENDING, None)
+             for s in to_upload],
+            run_id
+        )
+    status = sync_grades(
+        [(username_to_id[s['moodle_username']], s['final_score']) for s in to_upload],
+        {
             'source': 'mod/assign',
             'courseid': MOODLE_COURSE_ID,
             'component': 'mod_assign',
             'activityid': activity_id,
-            'itemnumber': 0,
-            'grades[0][studentid]': moodle_user_id,
-            'grades[0][grade]': final_score
-        })
+            'itemnumber': 0
+        },
+        grade_item_id=MOODLE_GRADE_ITEM_ID,
+        dry_run=dry_run,
+        labels={username_to_id[s['moodle_username']]: s['moodle_username'] for s in to_upload}
+    )
+    if dry_run:
+        return results
+
+    ledger_rows = []
+    for student in to_upload:
+        moodle_username = student['moodle_username']
+        final_score = student['final_score']
 
-        if result is not None:
+        user_status = status.get(username_to_id[moodle_username])
+        if user_status == GRADE_OVERRIDDEN:
+            print(f"   [=] {moodle_username} - Overridden in Moodle, left alone")
+            results['overridden'] += 1
+            detail_status = 'overridden'
+            ledger_status = grade_ledger.STATUS_OVERRIDDEN
+        elif user_status:
             print(f"   [+] {moodle_username} - Grade updated to {final_score}/100")
             results['success'] += 1
-            results['details'].append({
-                'repo_name': repo_name,
-                'moodle_username': moodle_username,
-                'status': 'success',
-                'grade': final_score
-            })
+            detail_status = 'success'
+            ledger_status = grade_ledger.STATUS_CONFIRMED
         else:
             print(f"   [-] {moodle_username} - Failed to update grade")
             results['failed'] += 1
-            results['details'].append({
-                'repo_name': repo_name,
-                'moodle_username': moodle_username,
-                'status': 'failed',
-                'grade': final_score
-            })
+            detail_status = 'failed'
+            ledger_status = grade_ledger.STATUS_FAILED
+        ledger_rows.append((moodle_username, grade_item, final_score, ledger_status, None))
+
+        results['details'].append({
+            'repo_name': student['repo_name'],
+            'moodle_username': moodle_username,
+            'status': detail_status,
+            'grade': final_score
+        })
+
+    # Record the outcome in the upload ledger
+    grade_ledger.record_many(ledger_rows, run_id)
 
     print("\n" + "=" * 70)
     print(f"[OK] Successfully updated: {results['success']}/{results['total']}")
     print(f"[FAIL] Failed: {results['failed']}/{results['total']}")
+    print(f"[SKIP] Overridden in Moodle: {results['overridden']}/{results['total']}")
     print(f"[WARN] Not found in Moodle: {results['not_found']}/{results['total']}")
     print("=" * 70)
 
@@ -576,8 +779,14 @@ def batch_update_grades(mapped_students, moodle_users):
 # MAIN TEST EXECUTION
 # ------------------------------
 
-def main():
-    """Run all Moodle integration tests and batch update student grades"""
+def main(dry_run=False, assume_yes=False):
+    """
+    Run all Moodle integration tests and batch update student grades
+
+    Args:
+        dry_run: Print the grade changes that would be pushed without writing them
+        assume_yes: Update grades without asking for confirmation (non-interactive runs)
+    """
     print("=" * 70)
     print("MOODLE WEB SERVICES INTEGRATION TEST")
     print("=" * 70)
@@ -636,10 +845,17 @@ def main():
         print("BATCH GRADE UPDATE")
         print("=" * 70)
 
+        if dry_run:
+            batch_update_grades(mapped_students, users, dry_run=True)
+            return
+
         # Ask user if they want to update grades
         print(f"\n[WARN] WARNING: This will update grades for {len(mapped_students)} student(s) in Moodle")
         print("   Make sure you have reviewed the grades in student_summary.txt")
-        response = input("\nDo you want to proceed with batch grade updates? (yes/no): ").strip().lower()
+        if assume_yes:
+            response = 'yes'
+        else:
+            response = input("\nDo you want to proceed with batch grade updates? (yes/no): ").strip().lower()
 
         if response in ['yes', 'y']:
             results = batch_update_grades(mapped_students, users)
@@ -654,6 +870,7 @@ def main():
                     f.write(f"Total students: {results['total']}\n")
                     f.write(f"Successfully updated: {results['success']}\n")
                     f.write(f"Failed: {results['failed']}\n")
+                    f.write(f"Overridden in Moodle: {results['overridden']}\n")
                     f.write(f"Not found in Moodle: {results['not_found']}\n\n")
                     f.write("=" * 80 + "\n")
                     f.write("DETAILS\n")
@@ -692,4 +909,12 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Test Moodle web services and upload grades')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Show which grades differ from the gradebook without writing them')
+    parser.add_argument('--yes', '-y', action='store_true',
+                        help='Update grades without asking for confirmation')
+    args = parser.parse_args()
+    main(dry_run=args.dry_run, assume_yes=args.yes)
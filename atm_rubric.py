@@ -0,0 +1,328 @@
+"""
+ATM Project Rubric
+Milestone weights and criteria, category grouping and letter-grade bands
+for the Midterm (ATM Banking System) project. Shared by Main.py and the
+cohort scoring engine (score_matrix.py), so a weight changed here applies
+to both grading and what-if previews.
+"""
+
+# ------------------------------
+# MILESTONE GUIDE WITH WEIGHTED SCORES (Total = 100 points)
+# ------------------------------
+MILESTONES = {
+    # Basic Setup & Core Features (25 points)
+    1: {
+        "desc": "Initial project setup with file structure",
+        "files": ["all folders created"],
+        "weight": 2,
+        "criteria": [
+            "Proper folder structure (includes/, assets/, sql/, admin/)",
+            "Basic files created",
+            "Clear organization"
+        ]
+    },
+    2: {
+        "desc": "Added registration form",
+        "files": ["register.php"],
+        "weight": 3,
+        "criteria": [
+            "HTML form with required fields (name, email, PIN)",
+            "Form structure is valid",
+            "Basic styling or layout"
+        ]
+    },
+    3: {
+        "desc": "Created database schema and users table",
+        "files": ["sql/schema.sql"],
+        "weight": 4,
+        "criteria": [
+            "Users table with proper columns (id, name, email, pin, balance)",
+            "Appropriate data types",
+            "Primary key defined",
+            "Default balance set"
+        ]
+    },
+    4: {
+        "desc": "User registration saved into DB",
+        "files": ["register.php", "includes/db.php"],
+        "weight": 4,
+        "criteria": [
+            "Database connection established",
+            "INSERT query to save user",
+            "PIN is hashed (password_hash or similar)",
+            "Basic error handling"
+        ]
+    },
+    5: {
+        "desc": "Login with session and failed login handling",
+        "files": ["login.php", "includes/auth.php"],
+        "weight": 6,
+        "criteria": [
+            "Login form with email and PIN",
+            "PIN verification (password_verify or similar)",
+            "Session started and user ID stored",
+            "Failed login message displayed",
+            "Redirect to dashboard on success"
+        ]
+    },
+    6: {
+        "desc": "Created dashboard page with balance",
+        "files": ["dashboard.php"],
+        "weight": 4,
+        "criteria": [
+            "Session check to protect page",
+            "User data fetched from database",
+            "Balance displayed",
+            "Basic navigation or menu"
+        ]
+    },
+    7: {
+        "desc": "Added logout functionality",
+        "files": ["logout.php"],
+        "weight": 2,
+        "criteria": [
+            "Session destroyed (session_destroy)",
+            "User redirected to login page",
+            "Works correctly"
+        ]
+    },
+
+    # Security & Validation (20 points)
+    8: {
+        "desc": "Added validation and PIN security",
+        "files": ["helpers.php", "register.php", "login.php"],
+        "weight": 8,
+        "criteria": [
+            "Input validation functions created",
+            "Email format validation",
+            "PIN length/format requirements enforced",
+            "Sanitization of inputs (htmlspecialchars, etc.)",
+            "Validation applied in register and login"
+        ]
+    },
+    21: {
+        "desc": "Add CSRF token helper functions",
+        "files": ["includes/helpers.php", "includes/auth.php"],
+        "weight": 5,
+        "criteria": [
+            "generate_csrf_token() function creates unique token",
+            "Token stored in $_SESSION",
+            "validate_csrf_token($token) function verifies token",
+            "csrf_token_field() returns hidden input HTML",
+            "Proper implementation using random_bytes() or similar",
+            "Token generated on login/session start"
+        ]
+    },
+    22: {
+        "desc": "Integrate CSRF protection across all forms",
+        "files": ["register.php", "login.php", "transaction.php", "transfer.php", "pin_change.php", "admin/*.php"],
+        "weight": 7,
+        "criteria": [
+            "CSRF tokens added to ALL state-changing forms",
+            "Hidden input fields with CSRF token in each form",
+            "Token validation performed before processing each form",
+            "Registration, Login, Transactions, Transfers protected",
+            "Admin forms and PIN change protected",
+            "Proper error messages for invalid/missing tokens",
+            "Prevents Cross-Site Request Forgery attacks"
+        ]
+    },
+
+    # Transaction Features (25 points)
+    9: {
+        "desc": "Dashboard enhancements with recent activities",
+        "files": ["dashboard.php"],
+        "weight": 3,
+        "criteria": [
+            "Recent transactions displayed (5 most recent)",
+            "Query to fetch recent activities from transactions table",
+            "Formatted display (table or list)",
+            "Shows transaction type, amount, and timestamp",
+            "Activities properly logged for display"
+        ]
+    },
+    10: {
+        "desc": "Added combined transaction page (deposit & withdraw)",
+        "files": ["transaction.php", "helpers.php", "auth.php"],
+        "weight": 8,
+        "criteria": [
+            "Form with deposit and withdraw options",
+            "Amount validation (positive, numeric)",
+            "Balance updated in database (UPDATE query)",
+            "Insufficient funds check for withdrawal",
+            "Transaction recorded in transactions table",
+            "Success/error messages shown"
+        ]
+    },
+    11: {
+        "desc": "Atomic Transactions & Enhanced Logging",
+        "files": ["transaction.php", "sql/schema.sql"],
+        "weight": 8,
+        "criteria": [
+            "Transactions table created in schema",
+            "BEGIN TRANSACTION used",
+            "COMMIT on success, ROLLBACK on failure",
+            "Transaction log includes user_id, type, amount, timestamp",
+            "Proper error handling"
+        ]
+    },
+    12: {
+        "desc": "Implement User-to-User Transfers",
+        "files": ["transfer.php", "transaction.php", "helpers.php"],
+        "weight": 6,
+        "criteria": [
+            "Transfer form with recipient selection/input",
+            "Sender balance decreased",
+            "Recipient balance increased",
+            "Both updates in single transaction (atomic)",
+            "Validation: sufficient funds, valid recipient",
+            "Both transactions logged"
+        ]
+    },
+
+    # Advanced Features (15 points)
+    13: {
+        "desc": "Advanced Transaction History with Filtering & Pagination",
+        "files": ["history.php", "helpers.php"],
+        "weight": 7,
+        "criteria": [
+            "Transaction history page created",
+            "Filter by type (deposit/withdraw/transfer)",
+            "Filter by date range",
+            "Pagination implemented (LIMIT, OFFSET)",
+            "Navigation between pages works"
+        ]
+    },
+    14: {
+        "desc": "Refactor Transactions with AJAX",
+        "files": ["dashboard.php", "assets/js/app.js", "api/process_transaction.php"],
+        "weight": 8,
+        "criteria": [
+            "JavaScript AJAX code written",
+            "API endpoint created (process_transaction.php)",
+            "JSON response from API",
+            "Page updates without refresh",
+            "Error handling in JavaScript"
+        ]
+    },
+
+    # Admin & Logging (10 points)
+    15: {
+        "desc": "Develop Admin Dashboard with User Management",
+        "files": ["admin/index.php", "admin/users.php", "admin/auth_admin.php", "includes/auth.php"],
+        "weight": 5,
+        "criteria": [
+            "Admin authentication mechanism",
+            "Admin dashboard page",
+            "List all users",
+            "Admin can view user details",
+            "Basic admin role check"
+        ]
+    },
+    16: {
+        "desc": "Add activity logging schema and helper",
+        "files": ["sql/schema.sql", "includes/helpers.php"],
+        "weight": 2,
+        "criteria": [
+            "Activity_log table created with proper structure",
+            "Columns: id, user_id, activity_type, details, ip_address, created_at",
+            "Foreign key relationship to users table",
+            "Helper function log_activity() to record events",
+            "Function captures user_id, action, IP address"
+        ]
+    },
+    17: {
+        "desc": "Integrate activity logging for core actions",
+        "files": ["login.php", "logout.php"],
+        "weight": 3,
+        "criteria": [
+            "Login action logged",
+            "Logout action logged",
+            "IP address captured",
+            "Timestamp recorded"
+        ]
+    },
+
+    # Additional Security Features (5 points)
+    18: {
+        "desc": "Implement PIN change functionality",
+        "files": ["pin_change.php", "dashboard.php", "includes/helpers.php"],
+        "weight": 2,
+        "criteria": [
+            "PIN change form created",
+            "Old PIN verified",
+            "New PIN hashed",
+            "Database updated",
+            "Link from dashboard"
+        ]
+    },
+    19: {
+        "desc": "Enforce daily withdrawal limits",
+        "files": ["transaction.php", "includes/helpers.php"],
+        "weight": 2,
+        "criteria": [
+            "Function to check daily withdrawal total (last 24 hours)",
+            "Realistic daily limit enforced (e.g., $5,000/day)",
+            "Query sums all withdrawals within last 24 hours",
+            "Rejection if current withdrawal + 24hr sum > limit",
+            "Clear error message when limit exceeded"
+        ]
+    },
+    20: {
+        "desc": "Implement rate limiting on transfers",
+        "files": ["transfer.php", "api/process_transaction.php"],
+        "weight": 1,
+        "criteria": [
+            "Track transfer attempts in activity_log or transactions table",
+            "Limit enforced (e.g., max 10 transfers per hour)",
+            "Count recent transfers before processing",
+            "Error message displayed when rate limit exceeded",
+            "Prevents spam/abuse of transfer feature"
+        ]
+    },
+
+    # Code Quality (evaluated holistically, not separately scored)
+    23: {
+        "desc": "Code Quality & Documentation",
+        "files": ["includes/helpers.php", "includes/auth.php", "all PHP files"],
+        "weight": 0,
+        "criteria": [
+            "Comprehensive PHPDoc comments for all functions",
+            "Parameters, return values, and purpose documented",
+            "Inline comments explain complex logic",
+            "Functions have clear, descriptive names",
+            "Proper indentation and code formatting",
+            "Optimized database queries (prepared statements)",
+            "Duplicate code refactored into reusable functions",
+            "No major security vulnerabilities",
+            "Business rules and assumptions documented"
+        ]
+    }
+}
+
+# Milestones grouped for the category breakdown
+CATEGORIES = {
+    "Basic Setup & Core Features": [1, 2, 3, 4, 5, 6, 7],
+    "Security & Validation": [8, 21, 22],
+    "Transaction Features": [9, 10, 11, 12],
+    "Advanced Features": [13, 14],
+    "Admin & Logging": [15, 16, 17],
+    "Additional Security": [18, 19, 20]
+}
+
+# Letter grades by minimum final score, highest first
+GRADE_BANDS = [
+    (80, "A (Excellent)"),
+    (75, "B+ (Very Good)"),
+    (70, "B (Good)"),
+    (65, "C+ (Fairly Good)"),
+    (60, "C (Fair)"),
+    (55, "D+ (Poor)"),
+    (50, "D (Very Poor)"),
+    (0, "F (Fail)"),
+]
+
+
+def letter_grade(score):
+    """Letter grade of a final score from GRADE_BANDS"""
+    return next((label for minimum, label in GRADE_BANDS if score >= minimum), GRADE_BANDS[-1][1])
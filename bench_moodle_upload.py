@@ -0,0 +1,107 @@
+"""
+Moodle Upload Benchmark
+Measures grade uploads/sec for the batch path against the local Moodle stand-in
+
+Usage:
+    python bench_moodle_upload.py --students 200 --latency-ms 80
+    python bench_moodle_upload.py --batch-sizes 1 10 25 50 --error-rate 0.05
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import moodle_standin
+
+
+def run_case(label, state, func):
+    """Run func once and report time, requests and uploads/sec"""
+    calls_before = sum(state.calls.values())
+    writes_before = state.grade_writes
+    start = time.time()
+    status = func()
+    elapsed = time.time() - start
+    requests_made = sum(state.calls.values()) - calls_before
+    written = state.grade_writes - writes_before
+    ok = sum(1 for value in status.values() if value)
+    rate = len(status) / elapsed if elapsed else float('inf')
+    print(f"  {label:<32} {elapsed:7.2f}s  {requests_made:5d} requests  "
+          f"{written:5d} written  {ok:4d}/{len(status)} ok  {rate:8.1f} students/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Moodle grade uploads against a local stand-in')
+    parser.add_argument('--students', type=int, default=200, help='Students in the cohort')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 25, 50],
+                        help='Students per core_grades_update_grades call to compare')
+    parser.add_argument('--latency-ms', type=int, default=80, help='Simulated per-call latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls failing with HTTP 503')
+    parser.add_argument('--exception-rate', type=float, default=0.0, help='Fraction of calls returning a Moodle exception')
+    parser.add_argument('--changed', type=float, default=0.1, help='Fraction of grades changed before the resync case')
+    args = parser.parse_args()
+
+    server, state, base_url = moodle_standin.start_standin(
+        students=args.students,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        exception_rate=args.exception_rate,
+    )
+
+    # Point the real client code at the stand-in
+    import MoodleIntegration
+    import moodle_directory
+    MoodleIntegration.MOODLE_URL = base_url
+    MoodleIntegration.MOODLE_TOKEN = 'benchmark'
+    moodle_directory.DIRECTORY_FILE = os.path.join(tempfile.mkdtemp(), 'directory.json')
+
+    base_params = {
+        'source': 'mod/assign',
+        'courseid': state.course_id,
+        'component': 'mod_assign',
+        'activityid': state.activity_id,
+        'itemnumber': 0,
+    }
+
+    print(f"[BENCH] {args.students} students, {args.latency_ms}ms latency, "
+          f"{args.error_rate:.0%} HTTP errors, {args.exception_rate:.0%} Moodle exceptions")
+    print()
+
+    try:
+        # User resolution: bulk enrolment fetch vs one lookup per student
+        print("User resolution:")
+        usernames = [u['username'] for u in state.users]
+        run_case("core_user_get_users per student", state, lambda: {
+            name: bool(MoodleIntegration.call_moodle_api('core_user_get_users', {
+                'criteria[0][key]': 'username', 'criteria[0][value]': name
+            })) for name in usernames
+        })
+        run_case("moodle_directory bulk", state, lambda: {
+            name: name in found
+            for found in [moodle_directory.find_users(state.course_id, [(n, None) for n in usernames])]
+            for name in usernames
+        })
+        print()
+
+        user_ids = [u['id'] for u in state.users]
+        grades = [(user_id, random.randint(40, 100)) for user_id in user_ids]
+
+        print("Full upload (update_grades_bulk):")
+        for size in args.batch_sizes:
+            state.grades.clear()
+            run_case(f"batch size {size}", state,
+                     lambda: MoodleIntegration.update_grades_bulk(grades, base_params, batch_size=size))
+        print()
+
+        print("Change-only resync (sync_grades):")
+        changed = set(random.sample(user_ids, max(1, int(len(user_ids) * args.changed))))
+        regraded = [(user_id, grade + 1 if user_id in changed else grade) for user_id, grade in grades]
+        run_case(f"{len(changed)} of {len(regraded)} changed", state,
+                 lambda: MoodleIntegration.sync_grades(regraded, base_params, grade_item_id=state.grade_item_id))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
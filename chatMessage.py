@@ -1,24 +1,27 @@
 import os
-import time
 import logging
-import requests
-import msal
 import sys
 from config import (
-    TENANT_ID,
-    CLIENT_ID,
-    CLIENT_SECRET,
     INSTRUCTOR_EMAIL,
     STUDENT_EMAILS,
     OUTPUT_DIR
 )
 
-AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
+from graph_auth import acquire_token
+from graph_chats import send_chat_message
+from graph_batch import send_messages_batched
+from teams_html import TEAMS_MESSAGE_LIMIT, extract_body, minify_html, split_for_teams
+from teams_report import load_teams_report
+import notification_outbox
+
 SCOPES = ["User.Read", "Chat.ReadWrite"]
 
 STUDENT_REPOS_PATH = OUTPUT_DIR
 GRAPH_URL = "https://graph.microsoft.com/v1.0"
 
+# Outbox queue for these notifications (see notification_outbox.py)
+OUTBOX_KIND = "midterm"
+
 # =========================
 # LOGGING SETUP
 # =========================
@@ -41,14 +44,8 @@ logging.basicConfig(
 # =========================
 
 def get_access_token():
-    app = msal.PublicClientApplication(CLIENT_ID, authority=AUTHORITY)
-    accounts = app.get_accounts()
-    result = None
-    if accounts:
-        result = app.acquire_token_silent(SCOPES, account=accounts[0])
-    if not result:
-        logging.info("Logging in interactively — please complete sign-in in your browser...")
-        result = app.acquire_token_interactive(scopes=SCOPES)
+    # Shared persistent cache: only the first run ever needs a browser sign-in
+    result = acquire_token(SCOPES)
     if "access_token" in result:
         logging.info("Successfully acquired access token (delegated).")
         return result["access_token"]
@@ -59,45 +56,15 @@ def get_access_token():
 
 
 def send_message_to_user(student_email, instructor_email, message_html, headers):
-    # Create or get existing chat
-    chat_payload = {
-        "chatType": "oneOnOne",
-        "members": [
-            {
-                "@odata.type": "#microsoft.graph.aadUserConversationMember",
-                "roles": ["owner"],
-                "user@odata.bind": f"https://graph.microsoft.com/v1.0/users('{instructor_email}')"
-            },
-            {
-                "@odata.type": "#microsoft.graph.aadUserConversationMember",
-                "roles": ["owner"],
-                "user@odata.bind": f"https://graph.microsoft.com/v1.0/users('{student_email}')"
-            }
-        ]
-    }
-
-    chat_resp = requests.post(f"{GRAPH_URL}/chats", headers=headers, json=chat_payload)
-    if chat_resp.status_code not in [200, 201]:
-        logging.error(f"Failed to create chat: {chat_resp.text}")
-        return False
-
-    chat_id = chat_resp.json()["id"]
-
     # Check if message is extremely large and needs to be split
-    max_single_message = 28000
-    if len(message_html) > max_single_message:
+    if len(message_html.encode("utf-8")) > TEAMS_MESSAGE_LIMIT:
         logging.warning(f"Message too large ({len(message_html)} chars), attempting to split into multiple messages")
-        return send_split_messages(chat_id, message_html, headers, student_email)
-
-    # Send single message
-    msg_payload = {
-        "body": {
-            "contentType": "html",
-            "content": message_html
-        }
-    }
+        return send_split_messages(student_email, instructor_email, message_html, headers)
 
-    msg_resp = requests.post(f"{GRAPH_URL}/chats/{chat_id}/messages", headers=headers, json=msg_payload)
+    # Send single message (chat ID comes from the on-disk cache after the first run)
+    msg_resp = send_chat_message(instructor_email, student_email, message_html, headers)
+    if msg_resp is None:
+        return False
 
     if msg_resp.status_code in [200, 201]:
         logging.info(f"Message sent to {student_email}")
@@ -107,102 +74,64 @@ def send_message_to_user(student_email, instructor_email, message_html, headers)
         return False
 
 
-def send_split_messages(chat_id, message_html, headers, student_email):
-    """Split a large message into multiple smaller messages"""
-    import re
-
-    # Try to split at milestone boundaries
-    milestones = re.findall(r'<div class="milestone">.*?</div>', message_html, re.DOTALL)
-
-    if len(milestones) > 1:
-        # Send header message first
-        header_match = re.search(r'^(.*?)<div class="milestone">', message_html, re.DOTALL)
-        if header_match:
-            header_content = header_match.group(1)
-            if not send_single_message(chat_id, header_content, headers):
-                return False
-
-        # Send each milestone as separate message
-        for i, milestone in enumerate(milestones):
-            milestone_msg = f"""
-            <div style="font-family:'Segoe UI', Arial, sans-serif; font-size:13px; color:#2b2b2b;">
-                <div style="background:#f0f7ff; padding:15px; border-radius:8px; margin-bottom:15px; border-left:4px solid #007acc;">
-                    <h3 style="margin:0; color:#007acc;">Part {i + 1} of {len(milestones)}</h3>
-                </div>
-                {milestone}
-            </div>
-            """
-            if not send_single_message(chat_id, milestone_msg, headers):
-                logging.error(f"Failed to send milestone {i + 1}")
-                return False
-            time.sleep(1)  # Small delay between messages
-
-        # Send footer/summary if it exists
-        footer_match = re.search(r'</div>\s*(<div class="final-grade">.*?)$', message_html, re.DOTALL)
-        if footer_match:
-            footer_content = f"""
-            <div style="font-family:'Segoe UI', Arial, sans-serif; font-size:13px; color:#2b2b2b;">
-                {footer_match.group(1)}
-            </div>
-            """
-            if not send_single_message(chat_id, footer_content, headers):
-                return False
+def split_message(message_html):
+    """
+    Split a large message into as few parts as fit under the Teams size limit.
 
-        logging.info(f"Successfully sent split messages to {student_email}")
-        return True
-    else:
+    Top-level report sections are packed greedily; a section too large on
+    its own is split at its child elements (see teams_html.split_for_teams).
+
+    Returns:
+        List of HTML parts (a single part if it already fits)
+    """
+    return split_for_teams(message_html)
+
+
+def send_split_messages(student_email, instructor_email, message_html, headers):
+    """Send a large message as several parts, each under the Teams size limit"""
+    parts = split_message(message_html)
+    if len(parts) == 1:
         # Can't split meaningfully, try to send as is
         logging.warning(f"Cannot split message meaningfully, attempting to send large message anyway")
-        return send_single_message(chat_id, message_html, headers)
+        return send_single_message(student_email, instructor_email, message_html, headers)
+
+    results = send_messages_batched(instructor_email, {student_email: parts}, headers)
+    success, error = results.get(student_email, (False, "not sent"))
+    if not success:
+        logging.error(f"Failed to send split message: {error}")
+        return False
 
+    logging.info(f"Successfully sent {len(parts)} split messages to {student_email}")
+    return True
 
-def send_single_message(chat_id, content, headers):
-    """Send a single message to a chat"""
-    msg_payload = {
-        "body": {
-            "contentType": "html",
-            "content": content
-        }
-    }
 
-    msg_resp = requests.post(f"{GRAPH_URL}/chats/{chat_id}/messages", headers=headers, json=msg_payload)
-    return msg_resp.status_code in [200, 201]
+def send_single_message(student_email, instructor_email, content, headers):
+    """Send a single message to the instructor-student chat"""
+    msg_resp = send_chat_message(instructor_email, student_email, content, headers)
+    return msg_resp is not None and msg_resp.status_code in [200, 201]
 
 
 def build_html_message(student_name, grade_html_content, force_condensed=False, compress_html=True):
     # Since grade_html_content is already HTML, we need to extract the body content
     # and wrap it in a Teams-friendly format
 
-    import re
-
-    # Extract the body content from the HTML (remove <html>, <head>, etc.)
-    body_match = re.search(r'<body>(.*?)</body>', grade_html_content, re.DOTALL)
-    if body_match:
-        grade_body = body_match.group(1).strip()
-    else:
-        # Fallback: use the entire content if no body tag found
-        grade_body = grade_html_content.strip()
-
     # Since students don't have access to result.html, we need to send complete content through Teams
     # Teams supports scrolling and has a practical limit around 28KB
     # Let's optimize the HTML for Teams while preserving ALL content
 
     max_length = 28000  # Teams practical limit
 
-    # Apply HTML compression if enabled
     if compress_html:
-        import re
-        original_length = len(grade_body)
-
-        # Remove excessive whitespace while preserving readability
-        grade_body = re.sub(r'\n\s+', '\n', grade_body)  # Remove indentation
-        grade_body = re.sub(r'\s+', ' ', grade_body)  # Collapse multiple spaces
-        grade_body = re.sub(r'>\s+<', '><', grade_body)  # Remove spaces between tags
+        # Body extraction and whitespace compression in one pass
+        original_length = len(grade_html_content)
+        grade_body = minify_html(grade_html_content)
 
         compressed_length = len(grade_body)
         if original_length != compressed_length:
             logging.info(
                 f"HTML compressed from {original_length} to {compressed_length} characters ({((original_length - compressed_length) / original_length * 100):.1f}% reduction)")
+    else:
+        grade_body = extract_body(grade_html_content).strip()
 
     # Add guidance notice for large reports
     if len(grade_body) > 20000:  # Large but manageable
@@ -260,7 +189,7 @@ def build_html_message(student_name, grade_html_content, force_condensed=False,
     """
 
 
-def main():
+def main(resend=False):
     logging.info("Starting grade sending process...")
     token = get_access_token()
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
@@ -273,6 +202,13 @@ def main():
     allow_message_splitting = True  # Set to True to allow splitting large reports into multiple messages
     compress_html = True  # Set to True to compress HTML for better Teams compatibility
 
+    if resend:
+        notification_outbox.forget_deliveries(OUTBOX_KIND)
+        logging.info("Delivery history cleared; every report will be sent again.")
+
+    # Queue every report; ones already delivered unchanged are skipped
+    unchanged = 0
+
     for student_folder, student_email in STUDENT_EMAILS.items():
         logging.info(f"Processing {student_folder} ({student_email})...")
         grade_path = os.path.join(STUDENT_REPOS_PATH, student_folder, "result.html")
@@ -296,39 +232,60 @@ def main():
             continue
 
         try:
-            message_html = build_html_message(student_folder, grade_content, force_condensed, compress_html)
-            logging.info(f"Built HTML message for {student_folder}: {len(message_html)} characters")
-
-            # Check if we should allow message splitting for very large content
-            if not allow_message_splitting and len(message_html) > 28000:
-                logging.warning(
-                    f"Message is {len(message_html)} characters but splitting is disabled. May fail to send.")
-            elif allow_message_splitting and len(message_html) > 28000:
-                logging.info(f"Large message will be split into multiple parts for better delivery.")
-
-            success = send_message_to_user(
-                student_email=student_email,
-                instructor_email=INSTRUCTOR_EMAIL,
-                message_html=message_html,
-                headers=headers
-            )
-
-            if success:
-                successful_sends += 1
-                logging.info(
-                    f"Successfully sent grade to {student_folder} ({student_email}) [{successful_sends}/{total_students}]")
+            # Prefer the compact rendering written at grading time; it is sent as is
+            message_html = load_teams_report(grade_path)
+            if message_html:
+                logging.info(f"Using Teams report for {student_folder}: {len(message_html)} characters")
             else:
-                logging.error(f"Failed to send grade to {student_folder} ({student_email})")
+                message_html = build_html_message(student_folder, grade_content, force_condensed, compress_html)
+                logging.info(f"Built HTML message for {student_folder}: {len(message_html)} characters")
+
+            status = notification_outbox.enqueue(OUTBOX_KIND, student_folder, message_html, student_email)
+            if status == notification_outbox.UNCHANGED:
+                unchanged += 1
+                logging.info(f"Report for {student_folder} unchanged since last delivery. Skipping.")
 
         except Exception as e:
             logging.error(f"Error processing {student_folder}: {e}")
 
-        # Add delay between sends to avoid rate limiting
-        time.sleep(2)
+    def message_parts(message_html):
+        # Check if we should allow message splitting for very large content
+        message_size = len(message_html.encode("utf-8"))
+        if message_size <= TEAMS_MESSAGE_LIMIT:
+            return [message_html]
+        if not allow_message_splitting:
+            logging.warning(f"Message is {message_size} bytes but splitting is disabled. May fail to send.")
+            return [message_html]
+        parts = split_message(message_html)
+        logging.info(f"Large message split into {len(parts)} part(s) for delivery.")
+        return parts
+
+    def send(messages):
+        logging.info(f"Sending {len(messages)} grade reports via Graph batch requests...")
+        outgoing = {email: message_parts(content) for email, content in messages.items()}
+        return send_messages_batched(INSTRUCTOR_EMAIL, outgoing, headers)
+
+    # Deliver everything pending, including items left over from an interrupted run
+    outcomes = notification_outbox.drain(OUTBOX_KIND, send, resolve_recipient=STUDENT_EMAILS.get)
+
+    for item, success, error in outcomes:
+        if success:
+            successful_sends += 1
+            logging.info(
+                f"Successfully sent grade to {item['student']} ({item['recipient']}) [{successful_sends}/{len(outcomes)}]")
+        else:
+            logging.error(f"Failed to send grade to {item['student']} ({item['recipient']}): {error}")
 
     logging.info(
-        f"Grade sending process completed. Successfully sent {successful_sends}/{total_students} grade reports.")
+        f"Grade sending process completed. Sent {successful_sends}/{len(outcomes)} pending reports; "
+        f"{unchanged}/{total_students} unchanged since last delivery.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Send grade reports to students via Teams")
+    parser.add_argument("--resend", action="store_true",
+                        help="Send every report again, even if it was already delivered unchanged")
+    args = parser.parse_args()
+    main(resend=args.resend)
@@ -0,0 +1,306 @@
+"""
+Cohort Analytics
+Cross-assignment statistics computed from the results index only (no report
+files are opened). ATM and Laravel results are joined per student by the
+email in STUDENT_EMAILS (falling back to the GitHub username), then score
+distributions, percentiles, per-rubric-item difficulty and the correlation
+between the two assignments are computed on arrays.
+
+Usage:
+    python cohort_analytics.py                      # Print the analytics report
+    python cohort_analytics.py --export cohort.csv  # Also save the joined scores
+"""
+
+import argparse
+import csv
+
+import numpy as np
+
+import results_index
+from atm_rubric import MILESTONES
+
+try:
+    import config
+except ImportError:
+    config = None
+
+PERCENTILES = [10, 25, 50, 75, 90]
+
+# Item scores below this share of the maximum count as "struggled"
+STRUGGLE_THRESHOLD = 0.5
+
+ASSIGNMENTS = (('midterm', "ATM Banking System"), ('laravel', "Laravel Event Management"))
+
+
+class Assignment:
+    """One assignment's scored students and rubric items as arrays"""
+
+    def __init__(self, kind, label, keys, scores, item_names, item_weights, items):
+        self.kind = kind
+        self.label = label
+        self.keys = keys                    # Student join keys (S)
+        self.scores = scores                # (S,) final scores
+        self.item_names = item_names        # Rubric item labels (K)
+        self.item_weights = item_weights    # (K,) maximum points per item
+        self.items = items                  # (S, K) share of the item's maximum, NaN if not graded
+
+
+def student_key(entry, emails, username_emails):
+    """
+    Join key for a result: the mapped email, else the email mapped for the
+    same GitHub username in the other assignment, else the username (or
+    repository name)
+    """
+    username = (entry['github_username'] or entry['student']).lower()
+    email = emails.get(entry['student']) or username_emails.get(username)
+    return email.strip().lower() if email else username
+
+
+def _atm_items(entries):
+    nums = sorted(MILESTONES)
+    column = {num: j for j, num in enumerate(nums)}
+    items = np.full((len(entries), len(nums)), np.nan)
+    for i, entry in enumerate(entries):
+        for num, quality in ((entry['details'] or {}).get('quality') or {}).items():
+            j = column.get(int(num))
+            if j is not None:
+                items[i, j] = quality / 100.0
+    names = [f"M{num}: {MILESTONES[num]['desc']}" for num in nums]
+    weights = np.array([MILESTONES[num]['weight'] for num in nums], dtype=float)
+    return names, weights, items
+
+
+def _laravel_items(entries):
+    names = []
+    for entry in entries:
+        for category in ((entry['details'] or {}).get('categories') or {}):
+            if category not in names:
+                names.append(category)
+    column = {name: j for j, name in enumerate(names)}
+    items = np.full((len(entries), len(names)), np.nan)
+    weights = np.full(len(names), np.nan)
+    for i, entry in enumerate(entries):
+        for category, result in ((entry['details'] or {}).get('categories') or {}).items():
+            if result.get('max_score'):
+                j = column[category]
+                items[i, j] = result.get('score', 0) / result['max_score']
+                weights[j] = result['max_score']
+    return names, weights, items
+
+
+def load_assignments(emails=None):
+    """
+    Read both assignments from the results index.
+
+    Args:
+        emails: Repository name -> email mapping (default STUDENT_EMAILS)
+
+    Returns:
+        Dictionary of kind -> Assignment
+    """
+    if emails is None:
+        emails = getattr(config, 'STUDENT_EMAILS', {})
+    entries_by_kind = {kind: [e for e in results_index.results(kind) if e['score'] is not None]
+                       for kind, _ in ASSIGNMENTS}
+    username_emails = {
+        e['github_username'].lower(): emails[e['student']]
+        for entries in entries_by_kind.values() for e in entries
+        if e['github_username'] and emails.get(e['student'])
+    }
+    assignments = {}
+    for kind, label in ASSIGNMENTS:
+        entries = entries_by_kind[kind]
+        names, weights, items = (_atm_items if kind == 'midterm' else _laravel_items)(entries)
+        assignments[kind] = Assignment(
+            kind, label,
+            [student_key(e, emails, username_emails) for e in entries],
+            np.array([e['score'] for e in entries], dtype=float),
+            names, weights, items
+        )
+    return assignments
+
+
+def distribution(scores):
+    """Summary statistics and a 10-point histogram of a score array"""
+    if scores.size == 0:
+        return None
+    counts, _ = np.histogram(np.clip(scores, 0, 100), bins=np.arange(0, 101, 10))
+    return {
+        'count': int(scores.size),
+        'mean': float(scores.mean()),
+        'std': float(scores.std()),
+        'min': float(scores.min()),
+        'max': float(scores.max()),
+        'percentiles': dict(zip(PERCENTILES, np.percentile(scores, PERCENTILES).tolist())),
+        'histogram': counts.tolist(),
+    }
+
+
+def _masked_correlation(items, totals):
+    """Pearson r of every item column with the totals, ignoring NaN cells"""
+    valid = ~np.isnan(items)
+    n = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        item_mean = np.where(valid, items, 0).sum(axis=0) / n
+        total_mean = np.where(valid, totals[:, None], 0).sum(axis=0) / n
+        item_dev = np.where(valid, items - item_mean, 0)
+        total_dev = np.where(valid, totals[:, None] - total_mean, 0)
+        r = (item_dev * total_dev).sum(axis=0) / np.sqrt((item_dev ** 2).sum(axis=0) * (total_dev ** 2).sum(axis=0))
+    return np.where(n >= 3, r, np.nan)
+
+
+def item_difficulty(assignment):
+    """
+    Difficulty of every rubric item.
+
+    Returns:
+        List of dictionaries (hardest first) with the item name, weight,
+        number graded, mean share of the maximum, share of students below
+        STRUGGLE_THRESHOLD and discrimination (correlation with the final score)
+    """
+    items = assignment.items
+    graded = (~np.isnan(items)).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        facility = np.nansum(items, axis=0) / graded
+        struggled = (items < STRUGGLE_THRESHOLD).sum(axis=0) / graded
+    discrimination = _masked_correlation(items, assignment.scores)
+
+    rows = [
+        {'item': name, 'weight': assignment.item_weights[j], 'graded': int(graded[j]),
+         'facility': facility[j], 'struggled': struggled[j], 'discrimination': discrimination[j]}
+        for j, name in enumerate(assignment.item_names) if graded[j]
+    ]
+    return sorted(rows, key=lambda row: row['facility'])
+
+
+def _rank(values):
+    """Ranks with ties averaged (for Spearman's rho)"""
+    order = values.argsort(kind='stable')
+    ranks = np.empty(values.size)
+    ranks[order] = np.arange(values.size)
+    _, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    return (np.bincount(inverse, weights=ranks) / counts)[inverse]
+
+
+def duplicate_keys(keys):
+    """Join keys shared by more than one result, as key -> number of results"""
+    unique, counts = np.unique(np.array(keys, dtype=str), return_counts=True)
+    return {key: count for key, count in zip(unique.tolist(), counts.tolist()) if count > 1}
+
+
+def join(first, second):
+    """
+    Students present in both assignments. A key shared by several results of
+    one assignment (see duplicate_keys) is joined on its first result only.
+
+    Returns:
+        (keys, first scores, second scores) aligned on the join key
+    """
+    keys, first_at, second_at = np.intersect1d(np.array(first.keys, dtype=str), np.array(second.keys, dtype=str),
+                                               return_indices=True)
+    return keys.tolist(), first.scores[first_at], second.scores[second_at]
+
+
+def correlation(x, y):
+    """Pearson r and Spearman rho of two aligned score arrays (None below 3 students)"""
+    if x.size < 3 or x.std() == 0 or y.std() == 0:
+        return None, None
+    return float(np.corrcoef(x, y)[0, 1]), float(np.corrcoef(_rank(x), _rank(y))[0, 1])
+
+
+def _fmt(value, spec):
+    return "n/a" if value is None or np.isnan(value) else format(value, spec)
+
+
+def print_report(assignments, top=5):
+    """Print the analytics report for load_assignments() output"""
+    atm, laravel = assignments['midterm'], assignments['laravel']
+
+    print("\n" + "=" * 78)
+    print("COHORT ANALYTICS".center(78))
+    print("=" * 78)
+
+    for assignment in (atm, laravel):
+        stats = distribution(assignment.scores)
+        print(f"\n[{assignment.label}]")
+        if stats is None:
+            print("  No scored students in the results index.")
+            continue
+        pct = "  ".join(f"P{p}={v:.1f}" for p, v in stats['percentiles'].items())
+        print(f"  Students: {stats['count']}   Mean: {stats['mean']:.2f}   Std: {stats['std']:.2f}   "
+              f"Min: {stats['min']:.2f}   Max: {stats['max']:.2f}")
+        print(f"  {pct}")
+        widest = max(stats['histogram']) or 1
+        for band, count in enumerate(stats['histogram']):
+            low = band * 10
+            label = f"{low}-{low + 10}" if band < 9 else "90-100"
+            print(f"  {label:>7} | {'█' * round(count / widest * 40):40} {count}")
+
+        duplicates = duplicate_keys(assignment.keys)
+        if duplicates:
+            print(f"\n  ⚠ {len(duplicates)} student(s) have more than one result; only the first is compared "
+                  f"(check STUDENT_EMAILS):")
+            for key, count in duplicates.items():
+                print(f"    {key} ({count} results)")
+
+        rows = item_difficulty(assignment)
+        if rows:
+            print(f"\n  Rubric items, hardest first ({len(rows)} items)")
+            print(f"  {'Item':42} {'Max':>5} {'n':>4} {'Mean':>6} {'<50%':>6} {'Discr.':>7}")
+            for row in rows:
+                print(f"  {row['item'][:42]:42} {row['weight']:5g} {row['graded']:4d} "
+                      f"{row['facility'] * 100:5.1f}% {row['struggled'] * 100:5.1f}% {_fmt(row['discrimination'], '+7.2f'):>7}")
+
+    keys, atm_scores, laravel_scores = join(atm, laravel)
+    print("\n" + "=" * 78)
+    print("[ATM vs Laravel]")
+    print(f"  Students in both: {len(keys)}   ATM only: {len(set(atm.keys)) - len(keys)}   "
+          f"Laravel only: {len(set(laravel.keys)) - len(keys)}")
+    if not keys:
+        print("  No students matched across assignments (check STUDENT_EMAILS).")
+        return
+
+    pearson, spearman = correlation(atm_scores, laravel_scores)
+    difference = laravel_scores - atm_scores
+    print(f"  Pearson r: {_fmt(pearson, '.3f')}   Spearman rho: {_fmt(spearman, '.3f')}   "
+          f"Mean change (Laravel - ATM): {difference.mean():+.2f}")
+
+    order = np.argsort(difference)
+    for title, picks in (("Largest drops", order[:top]), ("Largest gains", order[::-1][:top])):
+        picks = [i for i in picks if (difference[i] < 0 if title == "Largest drops" else difference[i] > 0)]
+        if picks:
+            print(f"\n  {title}:")
+            for i in picks:
+                print(f"    {keys[i]:40} ATM {atm_scores[i]:6.2f}  Laravel {laravel_scores[i]:6.2f}  ({difference[i]:+.2f})")
+
+
+def export_csv(assignments, path):
+    """
+    Save one row per student with both assignment scores (blank when missing).
+    Like join(), a key with several results keeps its first one.
+    """
+    atm, laravel = assignments['midterm'], assignments['laravel']
+    atm_by_key = dict(reversed(list(zip(atm.keys, atm.scores.tolist()))))
+    laravel_by_key = dict(reversed(list(zip(laravel.keys, laravel.scores.tolist()))))
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['student', 'atm_score', 'laravel_score'])
+        for key in sorted(set(atm_by_key) | set(laravel_by_key)):
+            writer.writerow([key, atm_by_key.get(key, ''), laravel_by_key.get(key, '')])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cross-assignment analytics from the results index')
+    parser.add_argument('--top', type=int, default=5, help='Students listed per largest drop/gain list')
+    parser.add_argument('--export', metavar='PATH', help='Save the joined per-student scores as CSV')
+    args = parser.parse_args()
+
+    assignments = load_assignments()
+    print_report(assignments, top=args.top)
+    if args.export:
+        export_csv(assignments, args.export)
+        print(f"\n[SAVED] Joined scores: {args.export}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+Results Directory Watcher
+Reports result files being written or student folders being removed under
+OUTPUT_DIR as they happen. Uses Linux inotify (through ctypes, no extra
+packages); elsewhere it falls back to polling the modification time of a
+few files, such as the results index, instead of rescanning every folder.
+
+Usage:
+    watcher = ResultsWatcher(OUTPUT_DIR, on_change, poll_paths=[results_index.RESULTS_DB])
+    watcher.start()
+
+on_change(change, student) is called from the watcher thread with change
+'written' (a report file was saved), 'removed' (a student folder went away)
+or 'rescan' (state is unknown, e.g. event overflow or a polled file changed;
+student is None).
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+_EVENT = struct.Struct('iIII')
+
+# Events on OUTPUT_DIR itself (student folders) and inside each student folder
+_ROOT_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR
+_STUDENT_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE_SELF | IN_ONLYDIR
+
+
+def _load_inotify():
+    if not hasattr(os, 'uname') or os.uname().sysname != 'Linux':
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class ResultsWatcher:
+    """Watch OUTPUT_DIR/<student>/<report file> for changes"""
+
+    def __init__(self, root, on_change, filenames=('result.html',), poll_paths=(), poll_interval=2.0, prefix=''):
+        """Only student folders whose name starts with prefix are reported"""
+        self.root = os.path.abspath(root)
+        self.prefix = prefix
+        self.on_change = on_change
+        self.filenames = set(filenames)
+        self.poll_paths = list(poll_paths)
+        self.poll_interval = poll_interval
+        self.mode = None
+        self._stop = threading.Event()
+        self._fd = None
+        self._watches = {}          # watch descriptor -> student folder name ('' for the root)
+
+    def start(self):
+        """Start watching on a daemon thread. Returns 'inotify' or 'polling'"""
+        libc = _load_inotify()
+        if libc is not None and os.path.isdir(self.root) and self._init_inotify(libc):
+            self.mode = 'inotify'
+            target = self._inotify_loop
+        else:
+            self.mode = 'polling'
+            target = self._poll_loop
+        threading.Thread(target=target, daemon=True).start()
+        return self.mode
+
+    def stop(self):
+        self._stop.set()
+
+    # --- inotify ---
+
+    def _add_watch(self, path, mask, student):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), mask)
+        if wd >= 0:
+            self._watches[wd] = student
+        return wd
+
+    def _init_inotify(self, libc):
+        self._libc = libc
+        self._fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            return False
+        if self._add_watch(self.root, _ROOT_MASK, '') < 0:
+            os.close(self._fd)
+            return False
+        # One listing at start-up; new folders are picked up from events
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and entry.name.startswith(self.prefix):
+                self._add_watch(entry.path, _STUDENT_MASK, entry.name)
+        return True
+
+    def _inotify_loop(self):
+        try:
+            while not self._stop.is_set():
+                ready, _, _ = select.select([self._fd], [], [], 1.0)
+                if ready:
+                    self._dispatch(os.read(self._fd, 65536))
+        except OSError:
+            # Watching failed (e.g. OUTPUT_DIR removed); carry on by polling
+            self.mode = 'polling'
+            self.on_change('rescan', None)
+            self._poll_loop()
+        finally:
+            os.close(self._fd)
+
+    def _dispatch(self, buffer):
+        offset = 0
+        while offset + _EVENT.size <= len(buffer):
+            wd, mask, _cookie, length = _EVENT.unpack_from(buffer, offset)
+            offset += _EVENT.size
+            name = buffer[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.on_change('rescan', None)
+                continue
+            student = self._watches.get(wd)
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if student is None:
+                continue
+
+            if student == '':
+                if not mask & IN_ISDIR or not name.startswith(self.prefix):
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_watch(os.path.join(self.root, name), _STUDENT_MASK, name)
+                    if any(os.path.exists(os.path.join(self.root, name, f)) for f in self.filenames):
+                        self.on_change('written', name)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.on_change('removed', name)
+            elif mask & IN_DELETE_SELF:
+                self.on_change('removed', student)
+            elif name in self.filenames and mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self.on_change('written', student)
+
+    # --- Polling fallback ---
+
+    def _stamp(self):
+        stamp = []
+        for path in self.poll_paths:
+            try:
+                stamp.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                stamp.append(None)
+        return stamp
+
+    def _poll_loop(self):
+        last = self._stamp()
+        while not self._stop.wait(self.poll_interval):
+            current = self._stamp()
+            if current != last:
+                last = current
+                self.on_change('rescan', None)
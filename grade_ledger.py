@@ -0,0 +1,138 @@
+"""
+Grade Upload Ledger
+SQLite record of every Moodle grade upload (student, grade item, score, run ID,
+timestamp, status) used to skip uploads that are already confirmed
+"""
+
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+try:
+    import config
+except ImportError:
+    config = None
+
+# Ledger database (override with GRADE_LEDGER_DB in config.py)
+LEDGER_DB = getattr(config, 'GRADE_LEDGER_DB', 'grade_ledger.db')
+
+# Free-text log written by older versions; imported once into the ledger
+LEGACY_LOG = 'moodle_laravel_grade_log.txt'
+
+STATUS_PENDING = 'pending'
+STATUS_CONFIRMED = 'confirmed'
+STATUS_FAILED = 'failed'
+STATUS_OVERRIDDEN = 'overridden'
+
+_lock = threading.Lock()
+
+
+def _connect():
+    conn = sqlite3.connect(LEDGER_DB, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS uploads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student TEXT NOT NULL,
+            grade_item TEXT NOT NULL,
+            score REAL NOT NULL,
+            run_id TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            status TEXT NOT NULL,
+            response TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_uploads_student_item ON uploads (student, grade_item)")
+    return conn
+
+
+def new_run_id():
+    """Identifier shared by all uploads of one grading run"""
+    return f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def record_many(rows, run_id):
+    """
+    Append several attempts in one transaction.
+
+    Args:
+        rows: List of (student, grade_item, score, status, response) tuples
+    """
+    if not rows:
+        return
+    timestamp = datetime.now().isoformat(timespec='seconds')
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO uploads (student, grade_item, score, run_id, timestamp, status, response) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(student, str(item), float(score), run_id, timestamp, status,
+                      None if response is None else str(response))
+                     for student, item, score, status, response in rows]
+                )
+        finally:
+            conn.close()
+
+
+def confirmed_scores(grade_item):
+    """
+    Latest confirmed score per student for a grade item.
+
+    Returns:
+        Dictionary student -> score
+    """
+    _import_legacy_log()
+    with _lock:
+        conn = _connect()
+        try:
+            rows = conn.execute(
+                """
+                SELECT student, score FROM uploads u
+                WHERE grade_item = ? AND status = ?
+                  AND id = (SELECT MAX(id) FROM uploads
+                            WHERE student = u.student AND grade_item = u.grade_item AND status = ?)
+                """,
+                (str(grade_item), STATUS_CONFIRMED, STATUS_CONFIRMED)
+            ).fetchall()
+        finally:
+            conn.close()
+    return {student: score for student, score in rows}
+
+
+def is_confirmed(student, grade_item, score, confirmed=None):
+    """True if this exact score is the last one Moodle confirmed for the student"""
+    if confirmed is None:
+        confirmed = confirmed_scores(grade_item)
+    previous = confirmed.get(student)
+    return previous is not None and round(previous, 2) == round(float(score), 2)
+
+
+def _import_legacy_log():
+    """Bring lines from moodle_laravel_grade_log.txt into the ledger (once), then rename the file"""
+    if not os.path.exists(LEGACY_LOG):
+        return
+    try:
+        from config import LARAVEL_MOODLE_GRADE_ITEM_ID
+    except ImportError:
+        return
+
+    rows = {}
+    with open(LEGACY_LOG, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            # "timestamp | username | fullname | repo | score/100"
+            parts = [p.strip() for p in line.split('|')]
+            if len(parts) < 5:
+                continue
+            try:
+                score = float(parts[4].split('/')[0])
+            except ValueError:
+                continue
+            # Keep only the latest line per student (the old log has duplicates)
+            rows[parts[1]] = (parts[1], LARAVEL_MOODLE_GRADE_ITEM_ID, score, STATUS_CONFIRMED, f"legacy log {parts[0]}")
+
+    record_many(list(rows.values()), 'legacy-import')
+    os.replace(LEGACY_LOG, LEGACY_LOG + '.imported')
+    print(f"[LEDGER] Imported {len(rows)} upload(s) from {LEGACY_LOG}")
@@ -8,15 +8,40 @@ import threading
 import subprocess
 import os
 import sys
+import time
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 
+import grading_worker
+import results_index
+from fs_watch import ResultsWatcher
+from job_scheduler import JOB_TYPES, JobScheduler, CANCELLED, FAILED, RUNNING, SUCCEEDED
+
+try:
+    import config
+except ImportError:
+    config = None
+
 # Fix encoding for Windows
 if sys.platform == "win32":
     import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
+# Console rendering: lines are buffered and flushed to the view in batches
+LOG_FLUSH_INTERVAL = 0.075   # Seconds between flushes (one UI update each)
+LOG_VIEW_LINES = 2000        # Lines kept as controls in the console view
+LOG_HISTORY_LINES = 50000    # Lines kept for "Save Log"
+
+# Per-job log panes keep fewer lines than the main console
+JOB_VIEW_LINES = 500
+
+# Graded students are tracked from the results index and file change events
+RESULTS_DIR = getattr(config, 'OUTPUT_DIR', 'cloned_repos')
+RESULTS_PREFIX = getattr(config, 'ASSIGNMENT_REPO_PREFIX', '')   # Laravel repos share RESULTS_DIR
+RESULTS_KIND = 'midterm'
+
 
 class GradingSystemUI:
     def __init__(self, page: ft.Page):
@@ -29,8 +54,24 @@ class GradingSystemUI:
         self.page.window_resizable = True
 
         # Variables
-        self.grading_process = None
-        self.teams_process = None
+        self.scheduler = JobScheduler(self.on_job_update)
+        self.job_views = {}         # job id -> controls of its row in the Jobs card
+        self.job_recent = {}        # job id -> recent (timestamp, line) for its log pane
+        self.job_pending = {}       # job id -> lines not yet drawn in its log pane
+        self.jobs_dirty = set()     # job ids whose row needs redrawing on the next flush
+
+        # Console buffers: producers append, the flush thread renders.
+        # console_lock is held while the console view itself changes (flush or
+        # clear), and is always taken before log_lock.
+        self.console_lock = threading.Lock()
+        self.log_lock = threading.Lock()
+        self.log_pending = deque()
+        self.log_history = deque(maxlen=LOG_HISTORY_LINES)
+
+        # Graded students, kept current by the results watcher
+        self.graded_lock = threading.Lock()
+        self.graded_students = set()
+        self.results_watcher = None
 
         # UI Elements references
         self.output_column = None
@@ -40,18 +81,31 @@ class GradingSystemUI:
         self.status_deadline = None
         self.status_freeze = None
         self.status_bar = None
+        self.jobs_column = None
+        self.jobs_placeholder = None
         self.grade_btn = None
+        self.laravel_btn = None
         self.teams_btn = None
+        self.moodle_btn = None
 
         # Build UI
         self.build_ui()
 
+        # Jobs start from a warm worker process when USE_GRADING_WORKER is set
+        grading_worker.ensure_running()
+
+        # Load graded students and watch for new results
+        self.start_results_watch()
+
         # Load initial status
         self.update_status()
 
         # Show welcome message in console
         self.show_welcome_message()
 
+        # Render buffered console lines on a timer
+        threading.Thread(target=self.flush_log_loop, daemon=True).start()
+
     def build_ui(self):
         """Build the main user interface"""
 
@@ -116,6 +170,16 @@ class GradingSystemUI:
             height=50,
         )
 
+        self.laravel_btn = ft.ElevatedButton(
+            "Grade Laravel Projects",
+            icon=ft.Icons.PLAY_CIRCLE,
+            on_click=self.run_laravel_grading,
+            bgcolor=ft.Colors.TEAL_700,
+            color=ft.Colors.WHITE,
+            width=280,
+            height=50,
+        )
+
         self.teams_btn = ft.ElevatedButton(
             "Send Teams Messages",
             icon=ft.Icons.EMAIL,
@@ -126,6 +190,16 @@ class GradingSystemUI:
             height=50,
         )
 
+        self.moodle_btn = ft.ElevatedButton(
+            "Upload Grades to Moodle",
+            icon=ft.Icons.CLOUD_UPLOAD,
+            on_click=self.upload_to_moodle,
+            bgcolor=ft.Colors.INDIGO_700,
+            color=ft.Colors.WHITE,
+            width=280,
+            height=50,
+        )
+
         verify_btn = ft.ElevatedButton(
             "Verify Email Mappings",
             icon=ft.Icons.CHECK_CIRCLE,
@@ -162,7 +236,9 @@ class GradingSystemUI:
                     ft.Text("Actions", size=18, weight=ft.FontWeight.BOLD),
                     ft.Divider(),
                     self.grade_btn,
+                    self.laravel_btn,
                     self.teams_btn,
+                    self.moodle_btn,
                     verify_btn,
                     summary_btn,
                     config_btn,
@@ -215,11 +291,11 @@ class GradingSystemUI:
     def create_right_panel(self):
         """Create right panel with console output and status"""
 
-        # Console output with modern terminal styling
-        self.output_column = ft.Column(
-            scroll=ft.ScrollMode.AUTO,
+        # Console output with modern terminal styling (virtualized list)
+        self.output_column = ft.ListView(
             spacing=0,
             auto_scroll=True,
+            expand=True,
         )
 
         # Terminal header bar
@@ -308,7 +384,25 @@ class GradingSystemUI:
                 padding=20,
             ),
             elevation=4,
-            expand=True,
+        )
+
+        # Jobs section: one row per queued/running/finished job
+        self.jobs_placeholder = ft.Text("No jobs yet. Start one from the Actions panel.", size=12, color=ft.Colors.GREY_600)
+        self.jobs_column = ft.Column([self.jobs_placeholder], spacing=8)
+
+        jobs_card = ft.Card(
+            content=ft.Container(
+                content=ft.Column([
+                    ft.Row([
+                        ft.Text("Jobs", size=18, weight=ft.FontWeight.BOLD),
+                        ft.Container(expand=True),
+                        ft.TextButton("Clear finished", icon=ft.Icons.CLEAR_ALL, on_click=self.clear_finished_jobs),
+                    ]),
+                    ft.Divider(),
+                    self.jobs_column,
+                ], spacing=10),
+                padding=20,
+            )
         )
 
         # Status section
@@ -345,9 +439,10 @@ class GradingSystemUI:
 
         return ft.Container(
             content=ft.Column([
+                jobs_card,
                 console_card,
                 status_card,
-            ], spacing=10),
+            ], spacing=10, scroll=ft.ScrollMode.AUTO),
             expand=True,
         )
 
@@ -355,152 +450,76 @@ class GradingSystemUI:
 
     def run_grading(self, e):
         """Run the grading process"""
-        if self.grading_process and self.grading_process.poll() is None:
-            self.show_dialog("Warning", "Grading is already in progress!")
-            return
-
-        def confirm_grading(e):
-            dialog.open = False
-            self.page.update()
-            self.start_grading()
-
-        def cancel_grading(e):
-            dialog.open = False
-            self.page.update()
-
-        dialog = ft.AlertDialog(
-            modal=True,
-            title=ft.Text("Confirm Grading"),
-            content=ft.Text("This will grade all student repositories.\n\nDo you want to continue?"),
-            actions=[
-                ft.TextButton("Cancel", on_click=cancel_grading),
-                ft.TextButton("Continue", on_click=confirm_grading),
-            ],
+        self.confirm_job(
+            'atm',
+            "Confirm Grading",
+            "This will grade all student repositories.\n\nDo you want to continue?",
         )
 
-        self.page.dialog = dialog
-        dialog.open = True
-        self.page.update()
-
-    def start_grading(self):
-        """Start the grading process"""
-        # Test output immediately
-        self.log_output("TEST: Button clicked - this message should appear immediately!")
-        self.log_output("=" * 60)
-        self.log_output("Starting grading process...")
-        self.log_output(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        self.log_output("=" * 60)
-
-        self.grade_btn.disabled = True
-        self.grade_btn.text = "Grading in Progress..."
-        self.update_status_bar("Grading students...")
-        self.page.update()
-
-        # Run in thread
-        thread = threading.Thread(target=self.execute_grading)
-        thread.daemon = True
-        thread.start()
-
-        # Confirm thread started
-        self.log_output("Background thread launched for grading...")
-
-    def execute_grading(self):
-        """Execute the grading script"""
-        try:
-            self.log_output("🚀 Launching grading subprocess...")
-
-            # Run Main.py
-            self.grading_process = subprocess.Popen(
-                [sys.executable, "Main.py"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                bufsize=1,
-                universal_newlines=True
-            )
-
-            self.log_output("📡 Subprocess started, reading output...")
-
-            # Read output line by line
-            import time
-            line_count = 0
-
-            # Read from stdout
-            while True:
-                line = self.grading_process.stdout.readline()
-                if not line:
-                    # Check if process has ended
-                    if self.grading_process.poll() is not None:
-                        break
-                    time.sleep(0.05)
-                    continue
-
-                line_count += 1
-                self.log_output(line.rstrip())
-
-            # Read any remaining stderr
-            stderr_output = self.grading_process.stderr.read()
-            if stderr_output:
-                for line in stderr_output.split('\n'):
-                    if line.strip():
-                        self.log_output(f"⚠️ {line}")
-
-            self.log_output(f"✓ Read {line_count} lines of output")
-
-            if self.grading_process.returncode == 0:
-                self.log_output("\n✅ Grading completed successfully!")
-                self.page.run_thread_safe(lambda: self.show_dialog("Success", "Grading completed successfully!"))
-            else:
-                self.log_output(f"\n❌ Grading failed with code {self.grading_process.returncode}")
-                self.page.run_thread_safe(lambda: self.show_dialog("Error", "Grading process failed. Check console for details."))
-
-        except Exception as e:
-            self.log_output(f"\n❌ Error: {str(e)}")
-            self.page.run_thread_safe(lambda: self.show_dialog("Error", f"Failed to run grading:\n{str(e)}"))
-
-        finally:
-            def _reset_button():
-                self.grade_btn.disabled = False
-                self.grade_btn.text = "Grade All Students"
-                self.update_status_bar("Ready")
-                self.update_status()
-                self.page.update()
-
-            self.page.run_thread_safe(_reset_button)
+    def run_laravel_grading(self, e):
+        """Run the Laravel grader"""
+        self.confirm_job(
+            'laravel',
+            "Confirm Laravel Grading",
+            "This will grade all Laravel project repositories, then send their Teams "
+            "notifications and upload their grades to Moodle.\n\nDo you want to continue?",
+        )
 
     def send_teams_messages(self, e):
         """Send messages via Microsoft Teams"""
-        if self.teams_process and self.teams_process.poll() is None:
-            self.show_dialog("Warning", "Teams messaging is already in progress!")
+        # Check if grading results exist
+        if not os.path.exists(RESULTS_DIR):
+            self.show_dialog("Error", "No grading results found!\n\nPlease run grading first.")
             return
 
-        # Check if grading results exist
-        if not os.path.exists("cloned_repos"):
+        self.confirm_job(
+            'teams',
+            "Confirm Teams Messaging",
+            "This will send grade reports to all students via Microsoft Teams.\n\n"
+            "Make sure you have graded the students first (a running grading job finishes first).\n\n"
+            "Do you want to continue?",
+        )
+
+    def upload_to_moodle(self, e):
+        """Upload ATM grades to Moodle"""
+        if not os.path.exists(os.path.join(RESULTS_DIR, "student_summary.txt")):
             self.show_dialog("Error", "No grading results found!\n\nPlease run grading first.")
             return
 
-        def confirm_teams(e):
+        self.confirm_job(
+            'moodle',
+            "Confirm Moodle Upload",
+            "This will upload student grades to Moodle.\n\n"
+            "Make sure you have reviewed the grades in student_summary.txt.\n\n"
+            "Do you want to continue?",
+        )
+
+    def verify_mappings(self, e):
+        """Verify email mappings"""
+        self.submit_job('verify')
+
+    def confirm_job(self, key, title, message):
+        """Ask for confirmation, then queue the job"""
+        if self.scheduler.active_job(key):
+            self.show_dialog("Warning", f"{JOB_TYPES[key].label} is already queued or running!")
+            return
+
+        def confirm(e):
             dialog.open = False
             self.page.update()
-            self.start_teams_messaging()
+            self.submit_job(key)
 
-        def cancel_teams(e):
+        def cancel(e):
             dialog.open = False
             self.page.update()
 
         dialog = ft.AlertDialog(
             modal=True,
-            title=ft.Text("Confirm Teams Messaging"),
-            content=ft.Text(
-                "This will send grade reports to all students via Microsoft Teams.\n\n"
-                "Make sure you have graded the students first.\n\n"
-                "Do you want to continue?"
-            ),
+            title=ft.Text(title),
+            content=ft.Text(message),
             actions=[
-                ft.TextButton("Cancel", on_click=cancel_teams),
-                ft.TextButton("Continue", on_click=confirm_teams),
+                ft.TextButton("Cancel", on_click=cancel),
+                ft.TextButton("Continue", on_click=confirm),
             ],
         )
 
@@ -508,103 +527,165 @@ class GradingSystemUI:
         dialog.open = True
         self.page.update()
 
-    def start_teams_messaging(self):
-        """Start Teams messaging process"""
-        self.log_output("\n" + "=" * 60)
-        self.log_output("Starting Teams messaging...")
-        self.log_output(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        self.log_output("=" * 60)
-
-        self.teams_btn.disabled = True
-        self.teams_btn.text = "Sending Messages..."
-        self.update_status_bar("Sending Teams messages...")
-        self.page.update()
-
-        # Run in thread
-        thread = threading.Thread(target=self.execute_teams_messaging)
-        thread.daemon = True
-        thread.start()
-
-    def execute_teams_messaging(self):
-        """Execute the Teams messaging script"""
-        try:
-            # Run chatMessage.py
-            self.teams_process = subprocess.Popen(
-                [sys.executable, "chatMessage.py"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                bufsize=1
-            )
-
-            # Read output line by line
-            for line in self.teams_process.stdout:
-                self.log_output(line.rstrip())
-
-            self.teams_process.wait()
-
-            if self.teams_process.returncode == 0:
-                self.log_output("\n✅ Messages sent successfully!")
-                self.page.run_thread_safe(lambda: self.show_dialog("Success", "Teams messages sent successfully!"))
-            else:
-                self.log_output(f"\n❌ Messaging failed with code {self.teams_process.returncode}")
-                self.page.run_thread_safe(lambda: self.show_dialog("Error", "Teams messaging failed. Check console for details."))
-
-        except Exception as e:
-            self.log_output(f"\n❌ Error: {str(e)}")
-            self.page.run_thread_safe(lambda: self.show_dialog("Error", f"Failed to send messages:\n{str(e)}"))
-
-        finally:
-            def _reset_button():
-                self.teams_btn.disabled = False
-                self.teams_btn.text = "Send Teams Messages"
-                self.update_status_bar("Ready")
-                self.page.update()
-
-            self.page.run_thread_safe(_reset_button)
-
-    def verify_mappings(self, e):
-        """Verify email mappings"""
-        self.log_output("\n" + "=" * 60)
-        self.log_output("Verifying email mappings...")
-        self.log_output("=" * 60)
-
-        self.update_status_bar("Verifying mappings...")
-
-        thread = threading.Thread(target=self.execute_verification)
-        thread.daemon = True
-        thread.start()
-
-    def execute_verification(self):
-        """Execute verification script"""
-        try:
-            process = subprocess.run(
-                [sys.executable, "verify_mappings.py"],
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace'
+    def submit_job(self, key):
+        """Queue a job; it starts as soon as its results are free and a slot is open"""
+        job = self.scheduler.submit(key)
+        if job is None:
+            self.show_dialog("Warning", f"{JOB_TYPES[key].label} is already queued or running!")
+
+    # Job scheduler integration
+
+    def on_job_update(self, job, change, line=None):
+        """
+        Scheduler callback (worker threads). Like log_output() it only records
+        what changed; flush_jobs() redraws the affected job rows.
+        """
+        with self.log_lock:
+            self.jobs_dirty.add(job.id)
+            if line is not None:
+                entry = (datetime.now().strftime("%H:%M:%S"), line)
+                self.job_recent.setdefault(job.id, deque(maxlen=JOB_VIEW_LINES)).append(entry)
+                self.job_pending.setdefault(job.id, deque(maxlen=JOB_VIEW_LINES)).append(entry)
+
+        if change != 'state':
+            return
+        if job.state == RUNNING:
+            self.log_output(f"▶ Starting {job.label}...")
+        elif job.state == SUCCEEDED:
+            self.log_output(f"✅ {job.label} completed successfully!")
+            if job.type.key == 'atm':
+                self.page.run_thread_safe(self.update_status)
+        elif job.state == FAILED:
+            self.log_output(f"❌ {job.label} failed with code {job.returncode}")
+            self.page.run_thread_safe(
+                lambda: self.show_dialog("Error", f"{job.label} failed. Open its log in the Jobs panel for details.")
             )
+        elif job.state == CANCELLED:
+            self.log_output(f"⚠️ {job.label} cancelled")
+
+    def create_job_view(self, job):
+        """Row for one job: title, status, progress bar, cancel and a collapsible log pane"""
+        view = {
+            'status': ft.Text("Queued", size=12, color=ft.Colors.GREY_700, font_family="Consolas"),
+            'progress': ft.ProgressBar(value=0, color=ft.Colors.GREEN_400, bgcolor=ft.Colors.GREY_300),
+            'log': ft.ListView(spacing=0, auto_scroll=True, height=180),
+        }
+        view['log_box'] = ft.Container(
+            content=view['log'],
+            bgcolor="#0d1117",
+            padding=10,
+            border_radius=6,
+            visible=False,
+        )
+        view['cancel'] = ft.IconButton(
+            icon=ft.Icons.STOP_CIRCLE,
+            icon_color=ft.Colors.RED_700,
+            tooltip="Cancel job",
+            on_click=lambda e: self.scheduler.cancel(job),
+        )
+        view['row'] = ft.Container(
+            content=ft.Column([
+                ft.Row([
+                    ft.Text(job.label, size=14, weight=ft.FontWeight.BOLD),
+                    view['status'],
+                    ft.Container(expand=True),
+                    ft.IconButton(
+                        icon=ft.Icons.TERMINAL,
+                        tooltip="Show/hide log",
+                        on_click=lambda e: self.toggle_job_log(job),
+                    ),
+                    view['cancel'],
+                ], spacing=8),
+                view['progress'],
+                view['log_box'],
+            ], spacing=4),
+            padding=ft.padding.symmetric(horizontal=10, vertical=6),
+            border=ft.border.all(1, ft.Colors.GREY_300),
+            border_radius=6,
+        )
+        return view
 
-            output = process.stdout if process.stdout else process.stderr
-            # Split output by lines for better formatting
-            for line in output.split('\n'):
-                if line.strip():
-                    self.log_output(line)
-
-            if process.returncode == 0:
-                self.page.run_thread_safe(lambda: self.show_dialog("Verification Complete", "All mappings verified successfully!"))
-            else:
-                self.page.run_thread_safe(lambda: self.show_dialog("Verification Issues", "Some mappings need attention. Check console for details."))
-
-        except Exception as e:
-            self.log_output(f"\n❌ Error: {str(e)}")
-            self.page.run_thread_safe(lambda: self.show_dialog("Error", f"Failed to verify mappings:\n{str(e)}"))
+    def toggle_job_log(self, job):
+        """Show or hide a job's log pane; it opens with the job's recent output"""
+        view = self.job_views.get(job.id)
+        if view is None:
+            return
+        box = view['log_box']
+        box.visible = not box.visible
+        with self.log_lock:
+            self.job_pending.pop(job.id, None)
+            recent = list(self.job_recent.get(job.id, ()))
+        if box.visible:
+            view['log'].controls = [self.render_log_line(ts, line) for ts, line in recent if line.strip()]
+        else:
+            view['log'].controls.clear()
+        view['row'].update()
+
+    def refresh_job_row(self, job, view, lines):
+        """Apply a job's current state and new output to its row"""
+        view['status'].value = job.describe()
+        if job.state == RUNNING:
+            # Indeterminate until the job reports how much work there is
+            view['progress'].value = job.tracker.fraction if job.tracker.total else None
+        elif job.state == SUCCEEDED:
+            view['progress'].value = 1.0
+        elif not job.active:
+            view['progress'].value = job.tracker.fraction
+        if job.state == FAILED:
+            view['progress'].color = ft.Colors.RED_400
+        elif job.state == CANCELLED:
+            view['progress'].color = ft.Colors.GREY_500
+        view['cancel'].disabled = not job.active
+
+        if view['log_box'].visible and lines:
+            controls = view['log'].controls
+            controls.extend(self.render_log_line(ts, line) for ts, line in lines if line.strip())
+            excess = len(controls) - JOB_VIEW_LINES
+            if excess > 0:
+                del controls[:excess]
+        view['row'].update()
+
+    def flush_jobs(self):
+        """Redraw the rows of jobs that changed since the last flush"""
+        with self.log_lock:
+            dirty = self.jobs_dirty
+            self.jobs_dirty = set()
+            pending = {job_id: list(self.job_pending.pop(job_id, ())) for job_id in dirty}
+        if not dirty:
+            return
 
-        finally:
-            self.page.run_thread_safe(lambda: self.update_status_bar("Ready"))
+        jobs = {job.id: job for job in self.scheduler.jobs}
+        new_rows = []
+        for job_id in sorted(dirty):
+            if job_id in jobs and job_id not in self.job_views:
+                self.job_views[job_id] = self.create_job_view(jobs[job_id])
+                new_rows.append(self.job_views[job_id]['row'])
+        if new_rows:
+            if self.jobs_placeholder in self.jobs_column.controls:
+                self.jobs_column.controls.remove(self.jobs_placeholder)
+            self.jobs_column.controls.extend(new_rows)
+            self.jobs_column.update()
+
+        for job_id in sorted(dirty):
+            if job_id in jobs and job_id in self.job_views:
+                self.refresh_job_row(jobs[job_id], self.job_views[job_id], pending.get(job_id))
+
+        running = self.scheduler.running_count()
+        self.status_bar.value = f"{running} job(s) running" if running else "Ready"
+        self.status_bar.update()
+
+    def clear_finished_jobs(self, e):
+        """Remove finished jobs from the Jobs panel"""
+        self.scheduler.clear_finished()
+        active = {job.id for job in self.scheduler.jobs}
+        with self.log_lock:
+            for job_id in list(self.job_views):
+                if job_id not in active:
+                    del self.job_views[job_id]
+                    self.job_recent.pop(job_id, None)
+                    self.job_pending.pop(job_id, None)
+        self.jobs_column.controls = [view['row'] for view in self.job_views.values()] or [self.jobs_placeholder]
+        self.jobs_column.update()
 
     def view_summary(self, e):
         """View student summary"""
@@ -650,113 +731,100 @@ class GradingSystemUI:
 
     # Utility methods
 
-    def log_output(self, message):
-        """Log message to output console with intelligent styling"""
-
-        def _add_message():
-            # Determine message type and color
-            msg_lower = message.lower()
-
-            if "✅" in message or "success" in msg_lower or "completed" in msg_lower:
-                # Success message
-                icon = "✅"
-                color = "#4ade80"  # Bright green
-                prefix_color = "#22c55e"
-            elif "❌" in message or "error" in msg_lower or "failed" in msg_lower:
-                # Error message
-                icon = "❌"
-                color = "#f87171"  # Bright red
-                prefix_color = "#ef4444"
-            elif "⚠" in message or "warning" in msg_lower:
-                # Warning message
-                icon = "⚠️"
-                color = "#fbbf24"  # Amber
-                prefix_color = "#f59e0b"
-            elif message.startswith("="):
-                # Separator line
-                icon = ""
-                color = "#6366f1"  # Indigo
-                prefix_color = color
-            elif "starting" in msg_lower or "running" in msg_lower:
-                # Info/process message
-                icon = "▶"
-                color = "#60a5fa"  # Blue
-                prefix_color = "#3b82f6"
-            elif "time:" in msg_lower or "deadline" in msg_lower:
-                # Time-related message
-                icon = "🕐"
-                color = "#a78bfa"  # Purple
-                prefix_color = "#8b5cf6"
-            elif "grading" in msg_lower or "grade" in msg_lower:
-                # Grading-related
-                icon = "📝"
-                color = "#34d399"  # Emerald
-                prefix_color = "#10b981"
-            elif "repository" in msg_lower or "repo" in msg_lower:
-                # Repository-related
-                icon = "📦"
-                color = "#f472b6"  # Pink
-                prefix_color = "#ec4899"
-            else:
-                # Default message
-                icon = "›"
-                color = "#9ca3af"  # Gray
-                prefix_color = "#6b7280"
-
-            # Get timestamp
-            timestamp = datetime.now().strftime("%H:%M:%S")
-
-            # Create styled message with timestamp
-            if message.strip():
-                message_row = ft.Row([
-                    ft.Text(
-                        f"[{timestamp}]",
-                        size=10,
-                        color="#4b5563",
-                        font_family="Consolas",
-                        weight=ft.FontWeight.W_300
-                    ),
-                    ft.Text(
-                        icon,
-                        size=11,
-                        color=prefix_color if icon else color,
-                    ),
-                    ft.Text(
-                        message.strip(),
-                        size=11,
-                        font_family="Consolas",
-                        color=color,
-                        selectable=True,
-                        weight=ft.FontWeight.W_400
-                    ),
-                ], spacing=8)
-
-                self.output_column.controls.append(message_row)
-
-            # Auto-scroll to bottom and limit lines
-            if len(self.output_column.controls) > 1000:  # Increased limit
-                self.output_column.controls.pop(0)
+    @staticmethod
+    def classify_message(message):
+        """Pick (icon, color, prefix color) for a console line"""
+        msg_lower = message.lower()
+
+        if "✅" in message or "success" in msg_lower or "completed" in msg_lower:
+            return "✅", "#4ade80", "#22c55e"      # Success: bright green
+        if "❌" in message or "error" in msg_lower or "failed" in msg_lower:
+            return "❌", "#f87171", "#ef4444"      # Error: bright red
+        if "⚠" in message or "warning" in msg_lower:
+            return "⚠️", "#fbbf24", "#f59e0b"      # Warning: amber
+        if message.startswith("="):
+            return "", "#6366f1", "#6366f1"       # Separator: indigo
+        if "starting" in msg_lower or "running" in msg_lower:
+            return "▶", "#60a5fa", "#3b82f6"      # Info/process: blue
+        if "time:" in msg_lower or "deadline" in msg_lower:
+            return "🕐", "#a78bfa", "#8b5cf6"     # Time-related: purple
+        if "grading" in msg_lower or "grade" in msg_lower:
+            return "📝", "#34d399", "#10b981"     # Grading-related: emerald
+        if "repository" in msg_lower or "repo" in msg_lower:
+            return "📦", "#f472b6", "#ec4899"     # Repository-related: pink
+        return "›", "#9ca3af", "#6b7280"          # Default: gray
 
-            self.page.update()
+    def log_output(self, message):
+        """
+        Queue a message for the console.
+
+        Safe to call from any thread and cheap: the line is only buffered here.
+        flush_log_loop() renders everything queued since the last flush with a
+        single update of the console view.
+        """
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        with self.log_lock:
+            for line in str(message).split("\n"):
+                self.log_pending.append((timestamp, line))
+                self.log_history.append(f"[{timestamp}] {line}")
+
+    def render_log_line(self, timestamp, message):
+        """Build the console control for one line (one Text with styled spans)"""
+        icon, color, prefix_color = self.classify_message(message)
+        return ft.Text(
+            spans=[
+                ft.TextSpan(f"[{timestamp}]  ", ft.TextStyle(size=10, color="#4b5563", weight=ft.FontWeight.W_300)),
+                ft.TextSpan(f"{icon}  " if icon else "", ft.TextStyle(size=11, color=prefix_color)),
+                ft.TextSpan(message.strip(), ft.TextStyle(size=11, color=color)),
+            ],
+            font_family="Consolas",
+            selectable=True,
+        )
 
-        # Execute in the main UI thread
-        try:
-            # Try thread-safe update first
-            if hasattr(self.page, 'run_thread_safe'):
-                self.page.run_thread_safe(_add_message)
-            else:
-                # Fallback: direct update (may work in some Flet versions)
-                _add_message()
-        except Exception as ex:
-            # Last resort: direct update
+    def flush_log(self):
+        """
+        Render all buffered lines with one update of the console view.
+
+        Lines leave the buffer only once the update went through; if it fails
+        the view is put back as it was and the same lines are drawn next time.
+        """
+        with self.console_lock:
+            with self.log_lock:
+                if not self.log_pending:
+                    return
+                batch = list(self.log_pending)
+
+            controls = self.output_column.controls
+            previous = list(controls)
+            # Only the newest LOG_VIEW_LINES can be visible after this flush
+            controls.extend(self.render_log_line(ts, line) for ts, line in batch[-LOG_VIEW_LINES:] if line.strip())
+            excess = len(controls) - LOG_VIEW_LINES
+            if excess > 0:
+                del controls[:excess]
             try:
-                _add_message()
-            except:
-                pass
+                self.output_column.update()
+            except Exception:
+                controls[:] = previous
+                raise
+
+            # Producers only append, so the drawn lines are still at the front
+            with self.log_lock:
+                for _ in batch:
+                    self.log_pending.popleft()
+
+    def flush_log_loop(self):
+        """Background timer driving flush_jobs() and flush_log()"""
+        while True:
+            time.sleep(LOG_FLUSH_INTERVAL)
+            for flush in (self.flush_jobs, self.flush_log):
+                try:
+                    flush()
+                except Exception:
+                    # Page closed or not ready yet; keep going
+                    pass
 
     def clear_output(self, e):
         """Clear output console"""
-        self.output_column.controls.clear()
         # Add a welcome message
         welcome_row = ft.Row([
             ft.Icon(ft.Icons.TERMINAL, color="#22c55e", size=16),
@@ -768,23 +836,27 @@ class GradingSystemUI:
                 italic=True
             )
         ], spacing=8)
-        self.output_column.controls.append(welcome_row)
-        self.page.update()
+        with self.console_lock:
+            with self.log_lock:
+                self.log_pending.clear()
+                self.log_history.clear()
+            self.output_column.controls[:] = [welcome_row]
+            self.page.update()
 
     def save_log(self, e):
         """Save console output to file"""
         def save_file(e: ft.FilePickerResultEvent):
             if e.path:
                 try:
+                    with self.log_lock:
+                        lines = list(self.log_history)
+                    # Each job's output follows the main console
+                    for job in list(self.scheduler.jobs):
+                        lines.append("")
+                        lines.append(f"===== {job.label} (job {job.id}, {job.describe()}) =====")
+                        lines.extend(job.lines)
                     with open(e.path, 'w', encoding='utf-8') as f:
-                        for control in self.output_column.controls:
-                            if isinstance(control, ft.Row):
-                                # Extract text from each component in the row
-                                line_parts = []
-                                for item in control.controls:
-                                    if isinstance(item, ft.Text):
-                                        line_parts.append(item.value)
-                                f.write(" ".join(line_parts) + "\n")
+                        f.write("\n".join(lines) + "\n")
                     self.show_dialog("Success", f"Log saved to:\n{e.path}")
                 except Exception as ex:
                     self.show_dialog("Error", f"Failed to save log:\n{str(ex)}")
@@ -865,20 +937,62 @@ Students Mapped: {len(STUDENT_EMAILS)}
                 self.status_freeze.value = "🔓 Active"
                 self.status_freeze.color = ft.Colors.GREEN_700
 
-            # Check for graded students
-            if os.path.exists("cloned_repos"):
-                graded_count = len([
-                    d for d in os.listdir("cloned_repos")
-                    if os.path.isdir(os.path.join("cloned_repos", d))
-                    and os.path.exists(os.path.join("cloned_repos", d, "result.txt"))
-                ])
-                self.status_graded.value = str(graded_count)
+            with self.graded_lock:
+                self.status_graded.value = str(len(self.graded_students))
 
             self.page.update()
 
         except Exception as e:
             self.log_output(f"Error updating status: {str(e)}")
 
+    def start_results_watch(self):
+        """Load graded students from the results index and follow changes as they happen"""
+        try:
+            imported = results_index.backfill(RESULTS_KIND, RESULTS_DIR, prefix=RESULTS_PREFIX)
+            if imported:
+                self.log_output(f"Indexed {imported} existing result(s)")
+            self.reload_graded_students(refresh=False)
+            self.results_watcher = ResultsWatcher(
+                RESULTS_DIR,
+                self.on_results_change,
+                poll_paths=[results_index.RESULTS_DB],
+                prefix=RESULTS_PREFIX,
+            )
+            self.results_watcher.start()
+        except Exception as e:
+            self.log_output(f"Error watching results: {str(e)}")
+
+    def reload_graded_students(self, refresh=True):
+        """Replace the graded set with the contents of the results index"""
+        students = results_index.graded_students(RESULTS_KIND)
+        with self.graded_lock:
+            self.graded_students = students
+        if refresh:
+            self.refresh_graded_count()
+
+    def on_results_change(self, change, student):
+        """Results watcher callback: adjust the graded set without rescanning"""
+        try:
+            if change == 'rescan':
+                self.reload_graded_students()
+                return
+            with self.graded_lock:
+                if change == 'written':
+                    self.graded_students.add(student)
+                elif change == 'removed':
+                    self.graded_students.discard(student)
+            if change == 'removed':
+                # The report went with the folder
+                results_index.remove_result(RESULTS_KIND, student)
+            self.refresh_graded_count()
+        except Exception as e:
+            self.log_output(f"Error updating results: {str(e)}")
+
+    def refresh_graded_count(self):
+        with self.graded_lock:
+            self.status_graded.value = str(len(self.graded_students))
+        self.status_graded.update()
+
     def show_dialog(self, title, message):
         """Show a dialog message"""
         def close_dialog(e):
@@ -0,0 +1,728 @@
+"""
+Grading Worker
+Long-lived helper process for the menus and the GUI. It imports the heavy
+libraries (PyGithub, GitPython, OpenAI, MSAL, requests) once and builds the
+shared HTTP sessions and the MSAL application with its token cache. Every
+script run is then forked from this warm process, so grading, Teams,
+Moodle and mapping checks start without paying for imports and client
+set-up again.
+
+The forks are made by a helper process split off right after warm-up,
+before the worker starts any threads, so scripts never inherit locks held
+by another thread. The worker itself only relays requests, output and exit
+codes.
+
+The worker needs fork (Linux/macOS) and is off unless USE_GRADING_WORKER is
+set. Whenever it is not running, not supported or cannot take a request,
+callers start a normal subprocess instead, so it is never required.
+
+Usage:
+    python grading_worker.py            # Run in the foreground (Ctrl+C to stop)
+    python grading_worker.py --status   # Show whether a worker is running
+    python grading_worker.py --stop     # Stop the running worker
+
+With USE_GRADING_WORKER = True the menus and the GUI start it in the
+background (output in a log file next to its socket); it exits by itself
+after WORKER_IDLE_MINUTES without requests, or with --stop, and restarts
+itself once idle when a project file such as config.py has changed.
+
+Configuration (optional, in config.py):
+    USE_GRADING_WORKER = False
+    WORKER_IDLE_MINUTES = 30
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import runpy
+import select
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import AuthenticationError, Pipe
+from multiprocessing.connection import Client, Listener
+from multiprocessing.reduction import recv_handle, recvfds, send_handle, sendfds
+
+import progress_events
+from progress_events import PROGRESS_ENV, ProgressProcess
+
+try:
+    import config
+except ImportError:
+    config = None
+
+USE_GRADING_WORKER = getattr(config, 'USE_GRADING_WORKER', False)
+WORKER_IDLE_MINUTES = getattr(config, 'WORKER_IDLE_MINUTES', 30)
+
+SUPPORTED = os.name == 'posix' and hasattr(os, 'fork')
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Imported once by the worker; anything missing (e.g. no config.py) is skipped
+WARM_MODULES = [
+    'requests', 'msal', 'github', 'git', 'openai',
+    'config', 'http_client', 'graph_auth', 'results_index',
+]
+
+# Seconds between idle/restart checks
+IDLE_CHECK_SECONDS = 30
+
+
+class WorkerUnavailable(Exception):
+    """No worker can run the request; the caller should start a subprocess"""
+
+
+def _paths():
+    """(private directory, socket, key file, log file) for this checkout"""
+    base = os.path.join(tempfile.gettempdir(), f"grading-worker-{os.getuid()}")
+    name = hashlib.sha1(REPO_DIR.encode('utf-8')).hexdigest()[:12]
+    return (base, os.path.join(base, f"{name}.sock"),
+            os.path.join(base, f"{name}.key"), os.path.join(base, f"{name}.log"))
+
+
+def _private_dir(base):
+    os.makedirs(base, mode=0o700, exist_ok=True)
+    info = os.stat(base)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise WorkerUnavailable(f"{base} is not private to this user")
+
+
+def _local_modules():
+    """Project modules currently imported: name -> (path, modification time)"""
+    modules = {}
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None)
+        if not path or 'site-packages' in path or not os.path.abspath(path).startswith(REPO_DIR + os.sep):
+            continue
+        try:
+            modules[name] = (path, os.path.getmtime(path))
+        except OSError:
+            pass
+    return modules
+
+
+# --- Client side ---
+
+def _connect():
+    if not SUPPORTED:
+        raise WorkerUnavailable("the grading worker needs fork (Linux/macOS)")
+    base, address, key_path, _ = _paths()
+    try:
+        _private_dir(base)
+        with open(key_path, 'rb') as f:
+            authkey = f.read()
+        return Client(address, family='AF_UNIX', authkey=authkey)
+    except (OSError, EOFError, AuthenticationError) as e:
+        raise WorkerUnavailable(str(e))
+
+
+def _request(message):
+    conn = _connect()
+    try:
+        conn.recv()                     # ('hello', worker pid)
+        conn.send(message)
+        return conn.recv()
+    except (OSError, EOFError) as e:
+        raise WorkerUnavailable(str(e))
+    finally:
+        conn.close()
+
+
+def status():
+    """Status dictionary of the running worker (raises WorkerUnavailable)"""
+    return _request(('status',))
+
+
+def stop():
+    """Ask the running worker to exit (raises WorkerUnavailable)"""
+    _request(('stop',))
+
+
+def is_running():
+    try:
+        status()
+        return True
+    except WorkerUnavailable:
+        return False
+
+
+def ensure_running():
+    """
+    Start a worker in the background if USE_GRADING_WORKER is set and none
+    is running (its output goes to a log file next to its socket; stop it
+    with "python grading_worker.py --stop").
+
+    Returns:
+        True if a worker was already running, False otherwise
+    """
+    if not (USE_GRADING_WORKER and SUPPORTED):
+        return False
+    if is_running():
+        return True
+    try:
+        base, _, _, log_path = _paths()
+        _private_dir(base)
+        with open(log_path, 'ab') as log:
+            subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__)],
+                cwd=REPO_DIR,
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+                start_new_session=True
+            )
+        print("[WORKER] Started the grading worker in the background (stop: python grading_worker.py --stop)")
+    except (OSError, WorkerUnavailable) as e:
+        print(f"[WORKER] Could not start the grading worker: {e}")
+    return False
+
+
+class _RemoteChild:
+    """Popen-like handle (pid, poll, wait, send_signal) of a script run by the worker"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+        self._done = threading.Event()
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if not self._done.wait(timeout):
+            raise subprocess.TimeoutExpired(f"grading worker pid {self.pid}", timeout)
+        return self.returncode
+
+    def send_signal(self, sig):
+        # The script leads its own process group, like start_new_session
+        if self.returncode is None:
+            try:
+                os.killpg(self.pid, sig)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class WorkerProcess:
+    """
+    Same interface as ProgressProcess, but the script is forked from the
+    warm worker. Raises WorkerUnavailable when no worker can take it.
+    """
+
+    def __init__(self, cmd, cwd=None, env=None, merge_stderr=False, stdin=False):
+        """stdin=True lets the script read this process's terminal (e.g. confirmation prompts)"""
+        cmd = list(cmd)
+        if len(cmd) < 2 or cmd[0] != sys.executable or not cmd[1].endswith('.py'):
+            raise WorkerUnavailable("only Python scripts run by this interpreter can use the worker")
+        env = dict(os.environ if env is None else env)
+        env.setdefault('PYTHONIOENCODING', 'utf-8')
+        request = {
+            'python': sys.executable,
+            'script': cmd[1],
+            'args': cmd[2:],
+            'cwd': os.path.abspath(cwd or os.getcwd()),
+            'env': env,
+            'merge_stderr': merge_stderr,
+            'stdin': bool(stdin and sys.stdin is not None and sys.stdin.isatty()),
+        }
+
+        self._conn = _connect()
+        try:
+            _, worker_pid = self._conn.recv()
+            self._conn.send(('run', request))
+            if request['stdin']:
+                send_handle(self._conn, sys.stdin.fileno(), worker_pid)
+            reply = self._conn.recv()
+        except (OSError, EOFError) as e:
+            self._conn.close()
+            raise WorkerUnavailable(str(e))
+        if reply[0] != 'started':
+            self._conn.close()
+            raise WorkerUnavailable(reply[1])
+
+        self.process = _RemoteChild(reply[1])
+        self._thread = None
+
+    def start(self, on_line, on_event=None, on_stderr=None):
+        """Start the reader thread (same callbacks as ProgressProcess.start)"""
+        def receive():
+            returncode = -1             # Worker went away before the script finished
+            try:
+                while True:
+                    message = self._conn.recv()
+                    if message[0] == 'line':
+                        on_line(message[1])
+                    elif message[0] == 'stderr':
+                        (on_stderr or on_line)(message[1])
+                    elif message[0] == 'event' and on_event:
+                        try:
+                            event = json.loads(message[1])
+                        except ValueError:
+                            continue
+                        on_event(event)
+                    elif message[0] == 'exit':
+                        returncode = message[1]
+                        break
+            except (OSError, EOFError):
+                pass
+            finally:
+                self._conn.close()
+                self.process.returncode = returncode
+                self.process._done.set()
+
+        self._thread = threading.Thread(target=receive, daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self):
+        """Wait for the script and for all output to be delivered. Returns the exit code"""
+        try:
+            self.process.wait()
+        except KeyboardInterrupt:
+            # The script is in its own session, so pass Ctrl+C on like a terminal would
+            self.process.send_signal(signal.SIGINT)
+            raise
+        self._thread.join()
+        return self.process.returncode
+
+
+def open_process(cmd, cwd=None, env=None, merge_stderr=False, stdin=False, **popen_kwargs):
+    """
+    Run cmd through the worker when one is available, else as a normal
+    subprocess. Popen-only options (start_new_session, creationflags, ...)
+    are used by the subprocess fallback; worker scripts always get their
+    own session. Without stdin the script reads from /dev/null either way.
+
+    Returns:
+        WorkerProcess or ProgressProcess
+    """
+    if USE_GRADING_WORKER and SUPPORTED:
+        try:
+            return WorkerProcess(cmd, cwd=cwd, env=env, merge_stderr=merge_stderr, stdin=stdin)
+        except WorkerUnavailable:
+            pass
+    if not stdin:
+        popen_kwargs['stdin'] = subprocess.DEVNULL
+    return ProgressProcess(cmd, cwd=cwd, env=env, merge_stderr=merge_stderr, **popen_kwargs)
+
+
+def open_terminal_process(cmd, cwd=None, merge_stderr=False):
+    """open_process for the console menus: the script shares the menu's terminal input"""
+    return open_process(cmd, cwd=cwd, merge_stderr=merge_stderr, stdin=True)
+
+
+# --- Worker side ---
+
+def _pump_to(fd, send, kind):
+    with os.fdopen(fd, 'r', encoding='utf-8', errors='replace') as stream:
+        for line in stream:
+            send(kind, line.rstrip('\n'))
+
+
+def _reap(status_fds):
+    """Write the exit code of every finished script to its status pipe"""
+    for pid in list(status_fds):
+        try:
+            done, wait_status = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            done, wait_status = pid, None
+        if not done:
+            continue
+        fd = status_fds.pop(pid)
+        try:
+            if wait_status is not None:
+                os.write(fd, str(os.waitstatus_to_exitcode(wait_status)).encode())
+        except OSError:
+            pass
+        os.close(fd)
+
+
+def _fork_helper(conn):
+    """
+    Body of the fork helper: a single-threaded copy of the warm worker that
+    forks each requested script and reports its exit code. Returns when the
+    worker closes the connection.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    fd_socket = socket.fromfd(conn.fileno(), socket.AF_UNIX, socket.SOCK_STREAM)
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    status_fds = {}                     # pid -> write end of the script's status pipe
+    while True:
+        readable, _, _ = select.select([conn, wake_r], [], [])
+        if wake_r in readable:
+            try:
+                os.read(wake_r, 512)
+            except BlockingIOError:
+                pass
+            _reap(status_fds)
+        if conn not in readable:
+            continue
+        try:
+            request = conn.recv()
+            fds = recvfds(fd_socket, request['nfds'])
+        except (OSError, EOFError, RuntimeError):
+            return
+        out_fd, err_fd, event_fd, status_fd, *stdin_fd = fds
+        pid = os.fork()
+        if pid == 0:
+            fd_socket.close()
+            conn.close()
+            _run_script(request, out_fd, err_fd, event_fd, status_fd, stdin_fd[0] if stdin_fd else None)
+        for fd in fds:
+            if fd != status_fd:
+                os.close(fd)
+        status_fds[pid] = status_fd
+        conn.send(pid)
+        # It may have finished before its pid was registered
+        _reap(status_fds)
+
+
+def _run_script(request, out_fd, err_fd, event_fd, status_fd, stdin_fd):
+    """
+    Run the script in a process forked by the helper. It leaves through
+    sys.exit (or an uncaught exception), so the interpreter shuts down as
+    for any script: non-daemon threads are joined and atexit handlers run.
+    """
+    os.setsid()
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    os.close(status_fd)
+    os.dup2(stdin_fd if stdin_fd is not None else os.open(os.devnull, os.O_RDONLY), 0)
+    os.dup2(out_fd, 1)
+    os.dup2(err_fd, 2)
+    os.dup2(event_fd, 3)
+    # The helper's connection and other scripts' pipes
+    os.closerange(4, os.sysconf('SC_OPEN_MAX'))
+    sys.stdin = open(0, 'r', encoding='utf-8', errors='replace', closefd=False)
+    sys.stdout = open(1, 'w', encoding='utf-8', errors='replace', buffering=1, closefd=False)
+    sys.stderr = open(2, 'w', encoding='utf-8', errors='replace', buffering=1, closefd=False)
+
+    os.environ.clear()
+    os.environ.update(request['env'])
+    os.environ[PROGRESS_ENV] = '3'
+    progress_events._channel = None
+    progress_events._channel_checked = False
+    os.chdir(request['cwd'])
+    if request['fresh_imports']:
+        # Edited project files are imported again; libraries stay warm
+        for name in _local_modules():
+            sys.modules.pop(name, None)
+
+    script = request['script']
+    sys.argv = [script] + list(request['args'])
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    runpy.run_path(script, run_name='__main__')
+    sys.exit(0)
+
+
+class WorkerServer:
+    """Accepts run requests on a private Unix socket and has the fork helper start each script"""
+
+    def __init__(self, idle_minutes=WORKER_IDLE_MINUTES):
+        self.idle_seconds = idle_minutes * 60
+        self.started = time.time()
+        self.last_activity = time.time()
+        self.lock = threading.Lock()
+        self.jobs = {}                  # pid -> script
+        self.clients = 0
+        self.warm = []
+        self.loaded = {}                # Project modules at warm-up: name -> (path, mtime)
+        self.restart_pending = False
+        self.helper = None              # Connection to the fork helper
+        self.helper_pid = None
+        self.helper_socket = None       # Same socket, for passing file descriptors
+        self.helper_lock = threading.Lock()
+
+    def warm_up(self):
+        started = time.time()
+        for name in WARM_MODULES:
+            try:
+                importlib.import_module(name)
+                self.warm.append(name)
+            except (Exception, SystemExit):
+                pass
+        if 'graph_auth' in sys.modules:
+            try:
+                sys.modules['graph_auth'].get_app()
+            except Exception as e:
+                print(f"[WORKER] MSAL application not prepared: {e}")
+        if 'http_client' in sys.modules:
+            sys.modules['http_client'].reset_pools()
+        self.loaded = _local_modules()
+        print(f"[WORKER] Warmed up {len(self.warm)} module(s) in {time.time() - started:.1f}s: {', '.join(self.warm)}")
+
+    def start_helper(self):
+        """Fork the helper; must run before the worker starts any thread"""
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self.helper, helper_end = Pipe()
+        pid = os.fork()
+        if pid == 0:
+            self.helper.close()
+            _fork_helper(helper_end)
+            os._exit(0)
+        helper_end.close()
+        self.helper_pid = pid
+        self.helper_socket = socket.fromfd(self.helper.fileno(), socket.AF_UNIX, socket.SOCK_STREAM)
+
+    def stop_helper(self):
+        """Close the helper's connection (it exits on EOF) and reap it"""
+        self.helper_socket.close()
+        self.helper.close()
+        try:
+            os.waitpid(self.helper_pid, 0)
+        except ChildProcessError:
+            pass
+
+    def project_changed(self):
+        """True when a project module imported at warm-up was edited since"""
+        for path, mtime in self.loaded.values():
+            try:
+                if os.path.getmtime(path) != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def status(self):
+        with self.lock:
+            return {
+                'pid': os.getpid(),
+                'python': sys.executable,
+                'uptime': time.time() - self.started,
+                'jobs': sorted(self.jobs.values()),
+                'warm': list(self.warm),
+                'restart_pending': self.restart_pending,
+            }
+
+    def serve(self):
+        base, address, key_path, _ = _paths()
+        _private_dir(base)
+        if is_running():
+            print("[WORKER] A grading worker is already running for this folder")
+            return
+        if os.path.exists(address):
+            os.unlink(address)
+        # A fresh key per run; only this user can read it (private folder, 0600)
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(os.urandom(32))
+        with open(key_path, 'rb') as f:
+            authkey = f.read()
+
+        self.warm_up()
+        self.start_helper()
+
+        listener = Listener(address, family='AF_UNIX', authkey=authkey)
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        threading.Thread(target=self._idle_watch, daemon=True).start()
+        threading.Thread(target=self._accept_loop, args=(listener,), daemon=True).start()
+        print(f"[WORKER] Listening on {address} (pid {os.getpid()}, fork helper pid {self.helper_pid})")
+        try:
+            while True:
+                signal.pause()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listener.close()
+            self.stop_helper()
+            try:
+                os.remove(key_path)
+            except OSError:
+                pass
+
+        if self.restart_pending:
+            print("[WORKER] Project files changed; restarting")
+            os.execv(sys.executable, [sys.executable, os.path.abspath(__file__)])
+        print("[WORKER] Stopped")
+
+    def _accept_loop(self, listener):
+        while True:
+            try:
+                conn = listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                continue
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _idle_watch(self):
+        while True:
+            time.sleep(IDLE_CHECK_SECONDS)
+            if not self.restart_pending and self.project_changed():
+                self.restart_pending = True
+            with self.lock:
+                busy = bool(self.jobs or self.clients)
+                idle_for = time.time() - self.last_activity
+            if not busy and (self.restart_pending or (self.idle_seconds and idle_for > self.idle_seconds)):
+                os.kill(os.getpid(), signal.SIGTERM)
+                return
+
+    def _handle(self, conn):
+        with self.lock:
+            self.clients += 1
+            self.last_activity = time.time()
+        try:
+            conn.send(('hello', os.getpid()))
+            message = conn.recv()
+            if message[0] == 'status':
+                conn.send(self.status())
+            elif message[0] == 'stop':
+                conn.send(('stopping',))
+                os.kill(os.getpid(), signal.SIGTERM)
+            elif message[0] == 'run':
+                self._run(conn, message[1])
+        except (OSError, EOFError):
+            pass
+        finally:
+            conn.close()
+            with self.lock:
+                self.clients -= 1
+                self.last_activity = time.time()
+
+    def _fork(self, request, fds):
+        """Have the helper fork the script. Returns its pid"""
+        request = dict(request, nfds=len(fds))
+        with self.helper_lock:
+            self.helper.send(request)
+            sendfds(self.helper_socket, fds)
+            return self.helper.recv()
+
+    def _run(self, conn, request):
+        stdin_fd = recv_handle(conn) if request['stdin'] else None
+        if request['python'] != sys.executable:
+            if stdin_fd is not None:
+                os.close(stdin_fd)
+            conn.send(('refused', f"worker runs {sys.executable}, not {request['python']}"))
+            return
+        request['fresh_imports'] = self.project_changed()
+        if request['fresh_imports']:
+            self.restart_pending = True
+
+        out_r, out_w = os.pipe()
+        err_r, err_w = (None, out_w) if request['merge_stderr'] else os.pipe()
+        event_r, event_w = os.pipe()
+        status_r, status_w = os.pipe()
+        fds = [out_w, err_w, event_w, status_w] + ([stdin_fd] if stdin_fd is not None else [])
+        try:
+            pid = self._fork(request, fds)
+        except (OSError, EOFError) as e:
+            for fd in (out_r, err_r, event_r, status_r):
+                if fd is not None:
+                    os.close(fd)
+            conn.send(('refused', f"fork helper unavailable: {e}"))
+            return
+        finally:
+            for fd in set(fds):
+                os.close(fd)
+
+        # Callers may signal the group as soon as they hear back
+        deadline = time.time() + 1
+        while time.time() < deadline:
+            try:
+                if os.getpgid(pid) == pid:
+                    break
+            except OSError:
+                break
+            time.sleep(0.001)
+
+        with self.lock:
+            self.jobs[pid] = request['script']
+        send_lock = threading.Lock()
+
+        def send(*message):
+            with send_lock:
+                try:
+                    conn.send(message)
+                except (OSError, ValueError):
+                    pass
+
+        send('started', pid)
+        readers = [threading.Thread(target=_pump_to, args=(out_r, send, 'line'), daemon=True),
+                   threading.Thread(target=_pump_to, args=(event_r, send, 'event'), daemon=True)]
+        if err_r is not None:
+            readers.append(threading.Thread(target=_pump_to, args=(err_r, send, 'stderr'), daemon=True))
+        for reader in readers:
+            reader.start()
+        threading.Thread(target=self._watch_client, args=(conn, pid), daemon=True).start()
+
+        # The helper writes the exit code when it reaps the script
+        with os.fdopen(status_r, 'rb') as status_pipe:
+            exit_status = status_pipe.read()
+        for reader in readers:
+            reader.join()
+        with self.lock:
+            self.jobs.pop(pid, None)
+        send('exit', int(exit_status) if exit_status else -1)
+
+    def _watch_client(self, conn, pid):
+        """Stop the script if its caller goes away (e.g. the GUI was closed)"""
+        while True:
+            with self.lock:
+                if pid not in self.jobs:
+                    return
+            try:
+                if not conn.poll(0.5):
+                    continue
+                conn.recv()
+            except (OSError, EOFError):
+                break
+        with self.lock:
+            if pid in self.jobs:
+                try:
+                    os.killpg(pid, signal.SIGTERM)
+                except (ProcessLookupError, PermissionError):
+                    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Warm worker process that runs grading scripts for the menus and the GUI')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--status', action='store_true', help='Show whether a worker is running')
+    group.add_argument('--stop', action='store_true', help='Stop the running worker')
+    args = parser.parse_args()
+
+    if args.status or args.stop:
+        try:
+            if args.stop:
+                stop()
+                print("[WORKER] Stop requested")
+                return
+            info = status()
+        except WorkerUnavailable:
+            print("[WORKER] Not running")
+            return
+        print(f"[WORKER] Running, pid {info['pid']}, up {progress_events.format_duration(info['uptime'])}")
+        print(f"  Python: {info['python']}")
+        print(f"  Warm modules: {', '.join(info['warm']) or 'none'}")
+        print(f"  Running scripts: {', '.join(info['jobs']) or 'none'}")
+        if info['restart_pending']:
+            print("  Restart pending (project files changed)")
+        return
+
+    if not SUPPORTED:
+        print("[WORKER] The grading worker needs fork (Linux/macOS); scripts run as normal subprocesses here")
+        sys.exit(1)
+    WorkerServer().serve()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Microsoft Graph Authentication
+Shared MSAL application backed by a persistent token cache, used by every Teams sender
+"""
+
+import os
+import threading
+
+import msal
+
+import config
+from http_client import graph_session
+
+AUTHORITY = f"https://login.microsoftonline.com/{config.TENANT_ID}"
+
+# Union of the scopes needed by all senders (messages + report uploads), so
+# a single interactive sign-in covers every tool
+GRAPH_SCOPES = ["User.Read", "Chat.ReadWrite", "Files.ReadWrite"]
+
+# Token cache file (override with TOKEN_CACHE_FILE in config.py)
+TOKEN_CACHE_FILE = getattr(config, 'TOKEN_CACHE_FILE', '.msal_token_cache.bin')
+
+_lock = threading.Lock()
+_app = None
+_cache = None
+_cache_mtime = None
+
+
+def _load_cache():
+    """Load the token cache from disk if another process updated it"""
+    global _cache_mtime
+    try:
+        mtime = os.path.getmtime(TOKEN_CACHE_FILE)
+    except OSError:
+        return
+    if mtime == _cache_mtime:
+        return
+    try:
+        with open(TOKEN_CACHE_FILE, 'r', encoding='utf-8') as f:
+            _cache.deserialize(f.read())
+        _cache_mtime = mtime
+    except (OSError, ValueError) as e:
+        print(f"[AUTH] Warning: Could not read token cache: {e}")
+
+
+def _save_cache():
+    """Write the token cache back to disk (owner-only permissions)"""
+    global _cache_mtime
+    if not _cache.has_state_changed:
+        return
+    tmp_path = f"{TOKEN_CACHE_FILE}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(_cache.serialize())
+        os.replace(tmp_path, TOKEN_CACHE_FILE)
+        _cache_mtime = os.path.getmtime(TOKEN_CACHE_FILE)
+        _cache.has_state_changed = False
+    except OSError as e:
+        print(f"[AUTH] Warning: Could not save token cache: {e}")
+
+
+def get_app():
+    """Return the process-wide MSAL application"""
+    global _app, _cache
+    if _app is None:
+        _cache = msal.SerializableTokenCache()
+        _load_cache()
+        _app = msal.PublicClientApplication(
+            config.CLIENT_ID,
+            authority=AUTHORITY,
+            token_cache=_cache,
+            http_client=graph_session()
+        )
+    return _app
+
+
+def acquire_token(scopes=None):
+    """
+    Acquire a Graph access token, signing in interactively only when needed.
+
+    Args:
+        scopes: Scopes required by the caller (defaults to GRAPH_SCOPES)
+
+    Returns:
+        MSAL result dictionary ("access_token" on success, "error_description" otherwise)
+    """
+    scopes = scopes or GRAPH_SCOPES
+    with _lock:
+        app = get_app()
+        _load_cache()
+
+        result = None
+        accounts = app.get_accounts()
+        if accounts:
+            result = app.acquire_token_silent(scopes, account=accounts[0])
+
+        if not result:
+            print("[AUTH] Please sign in to your Microsoft account in the browser...")
+            # Ask for every scope at once so later callers stay silent
+            result = app.acquire_token_interactive(
+                scopes=sorted(set(GRAPH_SCOPES) | set(scopes)),
+                login_hint=getattr(config, 'INSTRUCTOR_EMAIL', None) or None
+            )
+
+        _save_cache()
+        return result
+
+
+def get_access_token(scopes=None):
+    """Return an access token string, raising an Exception on failure"""
+    result = acquire_token(scopes)
+    if "access_token" not in result:
+        raise Exception(f"Failed to acquire token: {result.get('error_description', 'Unknown error')}")
+    return result["access_token"]
@@ -0,0 +1,271 @@
+"""
+Microsoft Graph JSON Batching
+Combines chat creation and message posts into $batch requests of up to 20 sub-requests
+"""
+
+import time
+
+import requests
+
+import graph_chats
+from http_client import graph_session
+from graph_delivery import (
+    graph_limiter, is_throttled_before_delivery, retry_after_seconds, run_concurrently, send_with_retry,
+    THROTTLE_STATUS
+)
+
+MAX_BATCH_SIZE = 20          # Graph limit per $batch request
+MAX_ATTEMPTS = 5             # Rounds for throttled / transient sub-requests
+# No response at all (timeout, connection reset): the request may have been applied
+TRANSPORT_ERROR = 0
+RETRYABLE_STATUS = (TRANSPORT_ERROR, 429, 500, 502, 503, 504)
+FAILED_DEPENDENCY = 424
+
+
+def is_transient(status, headers=None):
+    """Worth retrying for requests that are safe to repeat (chat creation)"""
+    return status in RETRYABLE_STATUS
+
+
+# Message posts are not idempotent: a timeout or a 5xx may still have
+# delivered the message, so only throttling that shows it was not applied
+# (429, or 503 with Retry-After) is retried for them
+is_message_retryable = is_throttled_before_delivery
+
+
+def _pack(items):
+    """
+    Group items into batches of at most MAX_BATCH_SIZE.
+
+    Items linked by depends_on stay in the same batch (dependsOn may only
+    reference requests of the same batch). A chain longer than one batch is
+    split; execute_batch holds the tail back until its head has completed.
+    """
+    chains = []
+    chain_of = {}
+    for item in items:
+        parent = item.get('depends_on')
+        if parent in chain_of:
+            chain_of[parent].append(item)
+            chain_of[item['id']] = chain_of[parent]
+        else:
+            chain = [item]
+            chains.append(chain)
+            chain_of[item['id']] = chain
+
+    batches = [[]]
+    for chain in chains:
+        if len(batches[-1]) + len(chain) > MAX_BATCH_SIZE:
+            batches.append([])
+        for item in chain:
+            if len(batches[-1]) == MAX_BATCH_SIZE:
+                batches.append([])
+            batches[-1].append(item)
+    return [batch for batch in batches if batch]
+
+
+def _post_batch(batch, headers, session, retry_on):
+    """Send one $batch request. Returns {id: sub-response}"""
+    batch_ids = {item['id'] for item in batch}
+    body = {"requests": []}
+    for item in batch:
+        sub_request = {
+            "id": item['id'],
+            "method": item.get('method', 'POST'),
+            "url": item['url'],
+        }
+        if item.get('body') is not None:
+            sub_request["body"] = item['body']
+            sub_request["headers"] = {"Content-Type": "application/json"}
+        if item.get('depends_on') in batch_ids:
+            sub_request["dependsOn"] = [item['depends_on']]
+        body["requests"].append(sub_request)
+
+    try:
+        resp = send_with_retry(lambda: (session or graph_session()).post(
+            f"{graph_chats.GRAPH_URL}/$batch",
+            headers=headers,
+            json=body,
+            timeout=60
+        ), retry_on=retry_on)
+    except requests.RequestException as e:
+        error = {'error': {'message': f"no response from Graph: {e}"}}
+        return {item['id']: {'status': TRANSPORT_ERROR, 'headers': {}, 'body': error} for item in batch}
+
+    if resp.status_code != 200:
+        # Whole batch rejected (throttled, auth, ...) - report it on every item
+        sub = {'status': resp.status_code, 'headers': dict(resp.headers), 'body': resp.text}
+        return {item['id']: sub for item in batch}
+
+    return {r['id']: r for r in resp.json().get('responses', [])}
+
+
+def execute_batch(items, headers, session=None, retry_on=is_transient):
+    """
+    Run sub-requests through Graph $batch, retrying throttled ones.
+
+    Batches are posted concurrently under the shared adaptive limiter, so a
+    429 (on the batch or on any sub-request) pauses every sender for the
+    Retry-After interval and lowers concurrency.
+
+    Args:
+        items: List of dicts with id, url (relative, e.g. "/chats"), method,
+               optional body and optional depends_on (id of an earlier item)
+        headers: Authorization headers
+        session: Optional requests session
+        retry_on: Predicate (status, headers) for responses worth retrying,
+            applied to the $batch POST and to every sub-response
+
+    Returns:
+        Dictionary id -> sub-response dict (status, headers, body)
+    """
+    results = {}
+    pending = list(items)
+    attempt = 0
+
+    while pending:
+        # Hold back items whose dependency lives in another batch and has not run yet
+        batches, deferred_ids = [], set()
+        for batch in _pack(pending):
+            batch_ids = {item['id'] for item in batch}
+            ready = []
+            for item in batch:
+                parent = item.get('depends_on')
+                if parent is None or (parent in batch_ids and parent not in deferred_ids):
+                    ready.append(item)
+                elif parent in results:
+                    if results[parent]['status'] in (200, 201, 204):
+                        ready.append(item)
+                    else:
+                        results[item['id']] = {'status': FAILED_DEPENDENCY, 'headers': {},
+                                               'body': 'dependency failed'}
+                else:
+                    deferred_ids.add(item['id'])
+            if ready:
+                batches.append(ready)
+
+        responses = {}
+        for batch_responses in run_concurrently(lambda b: _post_batch(b, headers, session, retry_on), batches):
+            responses.update(batch_responses)
+
+        final = attempt >= MAX_ATTEMPTS - 1
+        retry_ids, wait, throttled = set(), 0, False
+        for batch in batches:
+            for item in batch:
+                sub = responses.get(item['id'], {'status': 500, 'headers': {}, 'body': 'missing from batch response'})
+                status = sub['status']
+                # 424 only worth retrying if the request it waited on is being retried
+                retryable = retry_on(status, sub.get('headers')) or (
+                    status == FAILED_DEPENDENCY and item.get('depends_on') in retry_ids
+                )
+                if retryable and not final:
+                    retry_ids.add(item['id'])
+                    if status != FAILED_DEPENDENCY:
+                        wait = max(wait, retry_after_seconds(sub.get('headers')))
+                        throttled = throttled or status in THROTTLE_STATUS
+                else:
+                    results[item['id']] = sub
+
+        pending = [item for item in pending if item['id'] in retry_ids or item['id'] in deferred_ids]
+        if retry_ids:
+            attempt += 1
+            print(f"[BATCH] {len(retry_ids)} request(s) throttled or failed transiently, retrying in {wait:.0f}s...")
+            if throttled:
+                # Pauses every sender sharing the limiter, not just this loop
+                graph_limiter.record_throttle(wait)
+            else:
+                time.sleep(wait)
+
+    return results
+
+
+def _error_text(sub):
+    body = sub.get('body')
+    if isinstance(body, dict) and isinstance(body.get('error'), dict):
+        return body['error'].get('message', '')
+    return str(body)
+
+
+def send_messages_batched(instructor_email, messages, headers, session=None):
+    """
+    Deliver messages to many students using $batch.
+
+    Missing chats are created in one round of batches, then every student's
+    message parts are posted in order (dependsOn chains). Chats that Graph no
+    longer knows (404) are recreated and the undelivered parts resent once.
+
+    Args:
+        instructor_email: Instructor address (chat owner)
+        messages: Dictionary student_email -> list of HTML message parts
+        headers: Authorization headers
+
+    Returns:
+        Dictionary student_email -> (success, error message or None)
+    """
+    outcome = {}
+    remaining = {email: list(parts) for email, parts in messages.items() if parts}
+
+    for round_number in range(2):
+        if not remaining:
+            break
+
+        # Step 1: create chats for cache misses
+        students = list(remaining)
+        missing = [s for s in students if not graph_chats.get_cached_chat_id(instructor_email, s)]
+        if missing:
+            chat_items = [
+                {'id': f"chat{i}", 'url': "/chats", 'body': graph_chats.chat_payload(instructor_email, s)}
+                for i, s in enumerate(missing)
+            ]
+            chat_results = execute_batch(chat_items, headers, session)
+            for i, student_email in enumerate(missing):
+                sub = chat_results[f"chat{i}"]
+                if sub['status'] in (200, 201):
+                    graph_chats.cache_chat_id(instructor_email, student_email, sub['body']['id'])
+                else:
+                    outcome[student_email] = (False, f"chat creation failed ({sub['status']}): {_error_text(sub)}")
+                    del remaining[student_email]
+
+        # Step 2: post message parts, each part depending on the previous one
+        message_items, owner = [], {}
+        for s_index, student_email in enumerate(remaining):
+            chat_id = graph_chats.get_cached_chat_id(instructor_email, student_email)
+            previous = None
+            for p_index, content in enumerate(remaining[student_email]):
+                item_id = f"msg{s_index}_{p_index}"
+                message_items.append({
+                    'id': item_id,
+                    'url': f"/chats/{chat_id}/messages",
+                    'body': {"body": {"contentType": "html", "content": content}},
+                    'depends_on': previous,
+                })
+                owner[item_id] = (student_email, p_index)
+                previous = item_id
+
+        msg_results = execute_batch(message_items, headers, session, retry_on=is_message_retryable)
+
+        # Step 3: per-student outcome
+        first_failure = {}
+        for item in message_items:
+            student_email, p_index = owner[item['id']]
+            sub = msg_results[item['id']]
+            if sub['status'] not in (200, 201) and student_email not in first_failure:
+                first_failure[student_email] = (p_index, sub)
+
+        next_round = {}
+        for student_email, parts in remaining.items():
+            if student_email not in first_failure:
+                outcome[student_email] = (True, None)
+                continue
+            p_index, sub = first_failure[student_email]
+            if sub['status'] == 404 and round_number == 0:
+                # Stale cached chat: recreate it and resend what was not delivered
+                graph_chats.invalidate_chat_id(instructor_email, student_email)
+                next_round[student_email] = parts[p_index:]
+            else:
+                outcome[student_email] = (
+                    False, f"part {p_index + 1}/{len(parts)} failed ({sub['status']}): {_error_text(sub)}"
+                )
+        remaining = next_round
+
+    return outcome
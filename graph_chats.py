@@ -0,0 +1,162 @@
+"""
+Teams Chat Lookup
+Caches one-on-one chat IDs on disk per (instructor, student) so repeat
+notifications skip the POST /chats round trip
+"""
+
+import json
+import os
+import threading
+
+from graph_delivery import is_throttled_before_delivery, send_with_retry
+from http_client import graph_session
+
+try:
+    import config
+except ImportError:
+    config = None
+
+# Graph endpoint (override with GRAPH_URL in config.py, e.g. to point at graph_standin.py)
+GRAPH_URL = getattr(config, 'GRAPH_URL', "https://graph.microsoft.com/v1.0")
+
+# Chat ID cache file (override with CHAT_CACHE_FILE in config.py)
+CHAT_CACHE_FILE = getattr(config, 'CHAT_CACHE_FILE', '.teams_chat_cache.json')
+
+_lock = threading.Lock()
+_chat_ids = None
+
+
+def _cache_key(instructor_email, student_email):
+    return f"{instructor_email.strip().lower()}|{student_email.strip().lower()}"
+
+
+def _load():
+    """Load the chat ID cache (once per process)"""
+    global _chat_ids
+    if _chat_ids is None:
+        try:
+            with open(CHAT_CACHE_FILE, 'r', encoding='utf-8') as f:
+                _chat_ids = json.load(f)
+        except (OSError, ValueError):
+            _chat_ids = {}
+    return _chat_ids
+
+
+def _save():
+    tmp_path = f"{CHAT_CACHE_FILE}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(_chat_ids, f, indent=2)
+        os.replace(tmp_path, CHAT_CACHE_FILE)
+    except OSError as e:
+        print(f"[TEAMS] Warning: Could not save chat cache: {e}")
+
+
+def chat_payload(instructor_email, student_email):
+    """Body for POST /chats creating a one-on-one chat"""
+    return {
+        "chatType": "oneOnOne",
+        "members": [
+            {
+                "@odata.type": "#microsoft.graph.aadUserConversationMember",
+                "roles": ["owner"],
+                "user@odata.bind": f"https://graph.microsoft.com/v1.0/users('{instructor_email}')"
+            },
+            {
+                "@odata.type": "#microsoft.graph.aadUserConversationMember",
+                "roles": ["owner"],
+                "user@odata.bind": f"https://graph.microsoft.com/v1.0/users('{student_email}')"
+            }
+        ]
+    }
+
+
+def get_cached_chat_id(instructor_email, student_email):
+    """Return the cached chat ID, or None on a miss"""
+    with _lock:
+        return _load().get(_cache_key(instructor_email, student_email))
+
+
+def cache_chat_id(instructor_email, student_email, chat_id):
+    """Remember a chat ID for later runs"""
+    with _lock:
+        _load()[_cache_key(instructor_email, student_email)] = chat_id
+        _save()
+
+
+def create_chat(instructor_email, student_email, headers, session=None):
+    """
+    Create (or fetch the existing) one-on-one chat via Graph.
+
+    Returns:
+        requests.Response from POST /chats
+    """
+    return send_with_retry(lambda: (session or graph_session()).post(
+        f"{GRAPH_URL}/chats",
+        headers=headers,
+        json=chat_payload(instructor_email, student_email),
+        timeout=30
+    ))
+
+
+def get_chat_id(instructor_email, student_email, headers, session=None):
+    """
+    Return the chat ID for an instructor-student pair, creating the chat only on a cache miss.
+
+    Returns:
+        Chat ID string, or None if the chat could not be created
+    """
+    chat_id = get_cached_chat_id(instructor_email, student_email)
+    if chat_id:
+        return chat_id
+
+    chat_resp = create_chat(instructor_email, student_email, headers, session)
+    if chat_resp.status_code not in [200, 201]:
+        print(f"[TEAMS] ✗ Failed to create chat with {student_email}: {chat_resp.status_code} {chat_resp.text}")
+        return None
+
+    chat_id = chat_resp.json()["id"]
+    cache_chat_id(instructor_email, student_email, chat_id)
+    return chat_id
+
+
+def invalidate_chat_id(instructor_email, student_email):
+    """Drop a cached chat ID (call when Graph says the chat no longer exists)"""
+    key = _cache_key(instructor_email, student_email)
+    with _lock:
+        if _load().pop(key, None) is not None:
+            _save()
+
+
+def send_chat_message(instructor_email, student_email, content, headers, session=None):
+    """
+    Post an HTML message to the instructor-student chat.
+
+    A 404 from a cached chat ID invalidates it and retries once with a fresh chat;
+    429s (and 503s with Retry-After) wait out Retry-After through the shared
+    limiter. Other failures are not replayed, since the message may already
+    have been posted.
+
+    Returns:
+        requests.Response from the message POST, or None if no chat could be created
+    """
+    payload = {"body": {"contentType": "html", "content": content}}
+
+    for attempt in range(2):
+        chat_id = get_chat_id(instructor_email, student_email, headers, session)
+        if not chat_id:
+            return None
+
+        msg_resp = send_with_retry(lambda: (session or graph_session()).post(
+            f"{GRAPH_URL}/chats/{chat_id}/messages",
+            headers=headers,
+            json=payload,
+            timeout=30
+        ), retry_on=is_throttled_before_delivery)
+        if msg_resp.status_code != 404 or attempt:
+            return msg_resp
+
+        print(f"[TEAMS] Cached chat for {student_email} not found, recreating...")
+        invalidate_chat_id(instructor_email, student_email)
+
+    return msg_resp
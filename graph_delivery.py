@@ -0,0 +1,142 @@
+"""
+Adaptive Graph Delivery
+Runs Graph sends concurrently under an AIMD concurrency limit that honours Retry-After
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_RETRY_AFTER = 2      # Seconds, when a throttled response has no Retry-After
+MAX_ATTEMPTS = 5
+THROTTLE_STATUS = (429, 503)
+
+
+def _retry_after_header(headers):
+    for key, value in (headers or {}).items():
+        if key.lower() == 'retry-after':
+            return value
+    return None
+
+
+def is_throttled(status, headers=None):
+    """Throttled (429/503): worth replaying for requests that are safe to repeat"""
+    return status in THROTTLE_STATUS
+
+
+def is_throttled_before_delivery(status, headers=None):
+    """
+    Throttled in a way that means the request was not applied: a 429, or a
+    503 with an explicit Retry-After. A bare 503 may come back after a chat
+    message was already posted, so message POSTs are not replayed on it.
+    """
+    return status == 429 or (status == 503 and _retry_after_header(headers) is not None)
+
+
+def retry_after_seconds(headers, default=DEFAULT_RETRY_AFTER):
+    """Read Retry-After (seconds) from a header map"""
+    try:
+        return max(0.0, float(_retry_after_header(headers)))
+    except (TypeError, ValueError):
+        return default
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that grows by one after a run of clean responses and
+    halves when Graph throttles. A Retry-After pauses every sender for
+    exactly that long.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=16, increase_after=10):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase_after = increase_after
+        self._in_flight = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                delay = self._paused_until - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                elif self._in_flight >= self.limit:
+                    self._cond.wait()
+                else:
+                    self._in_flight += 1
+                    return
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def record_success(self):
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.increase_after and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+    def record_throttle(self, retry_after):
+        """Halve the limit and pause all senders for retry_after seconds"""
+        with self._cond:
+            self.limit = max(self.minimum, self.limit // 2)
+            self._successes = 0
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+            self._cond.notify_all()
+
+
+# Shared by every Graph sender in the process
+graph_limiter = AdaptiveLimiter()
+
+
+def send_with_retry(send, limiter=None, max_attempts=MAX_ATTEMPTS, retry_on=is_throttled):
+    """
+    Call send() (returning a requests.Response) under the limiter.
+
+    Responses for which retry_on(status, headers) is true are retried after
+    their Retry-After; the last response is returned if every attempt is
+    throttled. Pass is_throttled_before_delivery for requests that must not
+    be repeated once applied (chat message POSTs).
+    """
+    limiter = limiter or graph_limiter
+    for attempt in range(max_attempts):
+        limiter.acquire()
+        try:
+            response = send()
+        finally:
+            limiter.release()
+
+        if not retry_on(response.status_code, response.headers):
+            if response.status_code not in THROTTLE_STATUS:
+                limiter.record_success()
+            return response
+
+        wait = retry_after_seconds(response.headers)
+        limiter.record_throttle(wait)
+        if attempt < max_attempts - 1:
+            print(f"[GRAPH] Throttled ({response.status_code}), retrying in {wait:.0f}s "
+                  f"(concurrency now {limiter.limit})")
+
+    return response
+
+
+def run_concurrently(func, items, limiter=None):
+    """
+    Apply func to every item on a thread pool sized by the limiter.
+
+    func should do its Graph calls through send_with_retry so the limiter
+    sees throttling. Results are returned in the order of items.
+    """
+    limiter = limiter or graph_limiter
+    items = list(items)
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(limiter.maximum, len(items))) as pool:
+        return list(pool.map(func, items))
@@ -0,0 +1,245 @@
+"""
+Local Microsoft Graph Stand-in
+Minimal offline imitation of the Graph endpoints used by the Teams senders
+(POST /chats, POST/GET /chats/{id}/messages, POST /$batch) with optional
+latency and throttling injection.
+
+Usage:
+    python graph_standin.py --port 8765                 # serve; set GRAPH_URL = "http://127.0.0.1:8765/v1.0" in config.py
+    python graph_standin.py --selftest --students 40    # batched cohort send against a private instance
+"""
+
+import argparse
+import json
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_PREFIX = "/v1.0"
+USER_BIND_PATTERN = re.compile(r"users\('([^']+)'\)")
+
+
+class GraphState:
+    """In-memory chats and messages plus fault-injection settings"""
+
+    def __init__(self, latency_ms=0, throttle_rate=0.0, retry_after=1):
+        self.latency_ms = latency_ms
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.chats = {}           # chat_id -> sorted member tuple
+        self.chat_by_members = {}
+        self.messages = {}        # chat_id -> [content]
+        self.http_requests = 0    # Top-level HTTP requests received
+        self.operations = 0       # Individual operations (batch sub-requests included)
+
+    def dispatch(self, method, path, body):
+        """Handle one Graph operation. Returns (status, headers, body)"""
+        with self.lock:
+            self.operations += 1
+            throttled = random.random() < self.throttle_rate
+        if throttled:
+            return 429, {"Retry-After": str(self.retry_after)}, _error("TooManyRequests", "Throttled by stand-in")
+
+        parts = [p for p in path.split('?')[0].split('/') if p]
+
+        if method == 'POST' and parts == ['chats']:
+            members = tuple(sorted(
+                m.group(1).lower()
+                for member in (body or {}).get('members', [])
+                for m in [USER_BIND_PATTERN.search(member.get('user@odata.bind', ''))] if m
+            ))
+            if len(members) != 2:
+                return 400, {}, _error("BadRequest", "oneOnOne chat needs two members")
+            with self.lock:
+                chat_id = self.chat_by_members.get(members)
+                if chat_id is None:
+                    chat_id = f"19:{uuid.uuid4().hex}@unq.gbl.spaces"
+                    self.chat_by_members[members] = chat_id
+                    self.chats[chat_id] = members
+                    self.messages[chat_id] = []
+            return 201, {}, {"id": chat_id, "chatType": "oneOnOne"}
+
+        if len(parts) == 3 and parts[0] == 'chats' and parts[2] == 'messages':
+            chat_id = parts[1]
+            with self.lock:
+                if chat_id not in self.chats:
+                    return 404, {}, _error("NotFound", "Chat not found")
+                if method == 'GET':
+                    return 200, {}, {"value": [{"body": {"content": c}} for c in self.messages[chat_id]]}
+                if method == 'POST':
+                    content = (body or {}).get('body', {}).get('content', '')
+                    self.messages[chat_id].append(content)
+                    return 201, {}, {"id": str(len(self.messages[chat_id])), "body": {"content": content}}
+
+        return 404, {}, _error("NotFound", f"No stand-in route for {method} /{'/'.join(parts)}")
+
+    def delete_chat(self, chat_id):
+        """Forget a chat (to exercise stale chat-ID handling)"""
+        with self.lock:
+            members = self.chats.pop(chat_id, None)
+            self.messages.pop(chat_id, None)
+            if members:
+                self.chat_by_members.pop(members, None)
+
+
+def _error(code, message):
+    return {"error": {"code": code, "message": message}}
+
+
+def _run_batch(state, requests_list):
+    """Execute $batch sub-requests in order, honouring dependsOn"""
+    if len(requests_list) > 20:
+        return 400, _error("BadRequest", "A batch may contain at most 20 requests")
+
+    status_by_id = {}
+    responses = []
+    for sub in requests_list:
+        failed_dependency = any(
+            status_by_id.get(dep, 0) not in (200, 201, 204) for dep in sub.get('dependsOn', [])
+        )
+        if failed_dependency:
+            status, headers, body = 424, {}, _error("FailedDependency", "Dependent request failed")
+        else:
+            status, headers, body = state.dispatch(sub.get('method', 'GET'), sub.get('url', ''), sub.get('body'))
+        status_by_id[sub['id']] = status
+        responses.append({"id": sub['id'], "status": status, "headers": headers, "body": body})
+    return 200, {"responses": responses}
+
+
+def make_handler(state):
+    class GraphHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, body, headers=None):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _handle(self, method):
+            with state.lock:
+                state.http_requests += 1
+            if state.latency_ms:
+                time.sleep(state.latency_ms / 1000)
+
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'null') if length else None
+
+            if not self.path.startswith(API_PREFIX):
+                self._reply(404, _error("NotFound", "Unknown API version"))
+                return
+            path = self.path[len(API_PREFIX):]
+
+            if method == 'POST' and path == '/$batch':
+                status, payload = _run_batch(state, (body or {}).get('requests', []))
+                self._reply(status, payload)
+                return
+
+            status, headers, payload = state.dispatch(method, path, body)
+            self._reply(status, payload, headers)
+
+        def do_GET(self):
+            self._handle('GET')
+
+        def do_POST(self):
+            self._handle('POST')
+
+    return GraphHandler
+
+
+def start_standin(port=0, latency_ms=0, throttle_rate=0.0, retry_after=1):
+    """
+    Start a stand-in server on a background thread.
+
+    Returns:
+        (server, state, base_url) - call server.shutdown() when done
+    """
+    state = GraphState(latency_ms, throttle_rate, retry_after)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}{API_PREFIX}"
+    return server, state, base_url
+
+
+def selftest(students, parts, latency_ms, throttle_rate):
+    """Send a fake cohort through graph_batch and verify every part arrived in order"""
+    import graph_batch
+    import graph_chats
+
+    server, state, base_url = start_standin(latency_ms=latency_ms, throttle_rate=throttle_rate)
+    graph_chats.GRAPH_URL = base_url
+    graph_chats.CHAT_CACHE_FILE = tempfile.mktemp(suffix='.json')
+    headers = {"Authorization": "Bearer standin", "Content-Type": "application/json"}
+    instructor = "instructor@example.edu"
+
+    messages = {
+        f"student{i:03d}@example.edu": [f"<p>student {i} part {p + 1}</p>" for p in range(parts)]
+        for i in range(students)
+    }
+
+    try:
+        print(f"[STANDIN] Sending {students} students x {parts} part(s) "
+              f"(latency {latency_ms}ms, throttle {throttle_rate:.0%})")
+        start = time.time()
+        outcome = graph_batch.send_messages_batched(instructor, messages, headers)
+        elapsed = time.time() - start
+
+        delivered = sum(1 for ok, _ in outcome.values() if ok)
+        print(f"[STANDIN] Delivered {delivered}/{students} in {elapsed:.2f}s "
+              f"using {state.http_requests} HTTP requests ({state.operations} operations)")
+
+        # Stale chat: drop one chat server-side, resend, expect recreation
+        victim = next(iter(messages))
+        state.delete_chat(graph_chats.get_cached_chat_id(instructor, victim))
+        state.throttle_rate = 0.0
+        retry = graph_batch.send_messages_batched(instructor, {victim: ["<p>after reset</p>"]}, headers)
+        print(f"[STANDIN] Stale chat recovery: {'OK' if retry[victim][0] else retry[victim][1]}")
+
+        ordered = all(
+            state.messages[graph_chats.get_cached_chat_id(instructor, email)][:parts] == expected
+            for email, expected in messages.items() if email != victim and outcome[email][0]
+        )
+        print(f"[STANDIN] Message order preserved: {ordered}")
+        return delivered == students and retry[victim][0] and ordered
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Microsoft Graph stand-in')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--latency-ms', type=int, default=0, help='Delay added to every HTTP request')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Fraction of operations answered with 429')
+    parser.add_argument('--retry-after', type=int, default=1, help='Retry-After seconds sent with 429')
+    parser.add_argument('--selftest', action='store_true', help='Run a batched cohort send against a private instance')
+    parser.add_argument('--students', type=int, default=40, help='Students for --selftest')
+    parser.add_argument('--parts', type=int, default=2, help='Message parts per student for --selftest')
+    args = parser.parse_args()
+
+    if args.selftest:
+        ok = selftest(args.students, args.parts, args.latency_ms, args.throttle_rate)
+        raise SystemExit(0 if ok else 1)
+
+    server, state, base_url = start_standin(args.port, args.latency_ms, args.throttle_rate, args.retry_after)
+    print(f"[STANDIN] Graph stand-in listening at {base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Shared HTTP Client
+Pooled keep-alive sessions with default timeouts and retry adapters for
+Microsoft Graph, OneDrive and Moodle
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds, used when a call does not pass its own timeout
+DEFAULT_TIMEOUT = (5, 30)
+
+POOL_CONNECTIONS = 4         # Distinct hosts kept per session
+POOL_MAXSIZE = 16            # Keep-alive connections per host (matches the Graph limiter ceiling)
+
+_lock = threading.Lock()
+_sessions = {}
+
+
+class TimeoutSession(requests.Session):
+    """requests.Session that applies a default timeout to every call"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def _build_session(retry, timeout=DEFAULT_TIMEOUT):
+    session = TimeoutSession(timeout)
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def _get(name, factory):
+    with _lock:
+        if name not in _sessions:
+            _sessions[name] = factory()
+        return _sessions[name]
+
+
+def graph_session():
+    """
+    Session for Microsoft Graph and OneDrive.
+
+    Only connection failures and 502/504 on idempotent methods are retried
+    here; 429/503 are left to graph_delivery so Retry-After drives the
+    shared concurrency limiter, and message POSTs are never replayed.
+    """
+    return _get('graph', lambda: _build_session(Retry(
+        total=3,
+        connect=3,
+        read=0,
+        status=2,
+        status_forcelist=(502, 504),
+        allowed_methods=frozenset(['GET', 'PUT', 'DELETE']),
+        backoff_factor=0.5,
+        raise_on_status=False,
+    )))
+
+
+def moodle_session():
+    """
+    Session for the Moodle REST endpoint.
+
+    Moodle web service calls are all POSTs; the ones this project makes are
+    lookups or absolute grade sets, so replaying them is safe.
+    """
+    return _get('moodle', lambda: _build_session(Retry(
+        total=3,
+        connect=3,
+        read=2,
+        status=3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'POST']),
+        backoff_factor=0.5,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )))
+
+
+def reset_pools():
+    """
+    Drop pooled connections but keep the sessions, e.g. before forking so
+    child processes never share a keep-alive socket
+    """
+    with _lock:
+        for session in _sessions.values():
+            session.close()
@@ -0,0 +1,289 @@
+"""
+Job Scheduler
+Runs grading-day jobs (ATM grading, Laravel grading, Teams messages,
+Moodle upload, mapping verification) as concurrent subprocesses with
+their own progress, log and cancel.
+
+Jobs that touch the same results are kept apart: a job that writes a set
+of results waits for readers and writers of it, readers may share. The
+number of jobs running at once is capped, and each job's process can be
+given a lower priority and memory/CPU limits.
+
+Configuration (optional, in config.py):
+    MAX_CONCURRENT_JOBS = 3
+    JOB_LIMITS = {'atm': {'nice': 5, 'memory_mb': 2048, 'cpu_seconds': None}}
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+
+from grading_worker import open_process
+from progress_events import ProgressTracker
+
+try:
+    import config
+except ImportError:
+    config = None
+
+MAX_CONCURRENT_JOBS = getattr(config, 'MAX_CONCURRENT_JOBS', 3)
+
+# Lines kept per job for its log pane and "Save Log"
+JOB_LOG_LINES = 20000
+
+# Seconds a cancelled job gets to exit before it is killed
+CANCEL_GRACE_SECONDS = 5
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobType:
+    """What a job runs and which shared results it reads or writes"""
+
+    def __init__(self, key, label, script, args=(), reads=(), writes=(), limits=None):
+        self.key = key
+        self.label = label
+        self.script = script
+        self.args = list(args)
+        self.reads = set(reads)
+        self.writes = set(writes)
+        self.limits = dict(limits or {})
+        self.limits.update(getattr(config, 'JOB_LIMITS', {}).get(key, {}))
+
+    def command(self):
+        return [sys.executable, self.script] + self.args
+
+
+# Graders run at lower priority so sending and uploads stay responsive. The
+# Laravel grader also messages students and uploads grades itself, so it
+# holds the Teams and Moodle resources too.
+JOB_TYPES = {
+    job_type.key: job_type for job_type in (
+        JobType('atm', "ATM Grading", "Main.py", writes=['atm_results'], limits={'nice': 5}),
+        JobType('laravel', "Laravel Grading", "Laravel_grader.py",
+                writes=['laravel_results', 'teams_messages', 'moodle_grades'], limits={'nice': 5}),
+        JobType('teams', "Teams Messages", "chatMessage.py", reads=['atm_results'], writes=['teams_messages']),
+        JobType('moodle', "Moodle Upload", "MoodleIntegration.py", args=['--yes'],
+                reads=['atm_results'], writes=['moodle_grades']),
+        JobType('verify', "Verify Mappings", "verify_mappings.py"),
+    )
+}
+
+
+# Limited jobs start through this script, which applies the limits to itself
+RUN_LIMITED = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run_limited.py')
+
+
+def _limited_command(command, limits):
+    """
+    Start the script through run_limited.py, so nice/memory/CPU limits are set
+    inside the job's own process before the script runs (POSIX; inherited by
+    its own children). This works the same for worker and subprocess jobs.
+    Windows jobs get their lower priority from creationflags instead.
+    """
+    if os.name == 'nt' or not any(limits.values()):
+        return command
+    return [command[0], RUN_LIMITED, json.dumps(limits)] + command[1:]
+
+
+class Job:
+    """One run of a job type"""
+
+    def __init__(self, job_id, job_type):
+        self.id = job_id
+        self.type = job_type
+        self.state = QUEUED
+        self.tracker = ProgressTracker()
+        self.lines = deque(maxlen=JOB_LOG_LINES)
+        self.process = None
+        self.returncode = None
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+
+    @property
+    def label(self):
+        return self.type.label
+
+    @property
+    def active(self):
+        return self.state not in FINISHED_STATES
+
+    def describe(self):
+        """One-line status for the job list"""
+        if self.state == QUEUED:
+            return "Queued"
+        if self.state == RUNNING:
+            if self.tracker.total:
+                return self.tracker.describe()
+            return f"Running for {int(time.time() - self.started_at)}s"
+        elapsed = int((self.finished_at or time.time()) - (self.started_at or self.queued_at))
+        if self.state == SUCCEEDED:
+            return f"Completed in {elapsed}s"
+        if self.state == CANCELLED:
+            return "Cancelled"
+        return f"Failed (exit code {self.returncode})"
+
+
+class JobScheduler:
+    """
+    Starts queued jobs as soon as their results are free and a slot is open.
+
+    on_update(job, change, line=None) is called from worker threads with
+    change 'state', 'progress' or 'line' (with the new output line).
+    """
+
+    def __init__(self, on_update, max_concurrent=MAX_CONCURRENT_JOBS):
+        self.on_update = on_update
+        self.max_concurrent = max_concurrent
+        self.jobs = []
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def active_job(self, key):
+        """The queued or running job of this type, if any"""
+        with self._lock:
+            return next((job for job in self.jobs if job.type.key == key and job.active), None)
+
+    def running_count(self):
+        with self._lock:
+            return sum(1 for job in self.jobs if job.state == RUNNING)
+
+    def submit(self, key):
+        """
+        Queue a job by type key.
+
+        Returns:
+            The new Job, or None if one of that type is already queued or running
+        """
+        with self._lock:
+            if any(job.type.key == key and job.active for job in self.jobs):
+                return None
+            job = Job(self._next_id, JOB_TYPES[key])
+            self._next_id += 1
+            self.jobs.append(job)
+        self.on_update(job, 'state')
+        self._start_ready()
+        return job
+
+    def cancel(self, job):
+        """Cancel a queued job, or stop a running one (its whole process group)"""
+        with self._lock:
+            if not job.active:
+                return
+            job.cancel_requested = True
+            if job.state == QUEUED:
+                job.state = CANCELLED
+                job.finished_at = time.time()
+                process = None
+            else:
+                process = job.process
+        if process is None:
+            self.on_update(job, 'state')
+            self._start_ready()
+            return
+        threading.Thread(target=self._stop_process, args=(process,), daemon=True).start()
+
+    def clear_finished(self):
+        with self._lock:
+            self.jobs = [job for job in self.jobs if job.active]
+
+    def _stop_process(self, process):
+        try:
+            if os.name == 'nt':
+                subprocess.run(['taskkill', '/T', '/PID', str(process.pid)], capture_output=True)
+            else:
+                os.killpg(process.pid, signal.SIGTERM)
+            process.wait(timeout=CANCEL_GRACE_SECONDS)
+        except subprocess.TimeoutExpired:
+            if os.name == 'nt':
+                subprocess.run(['taskkill', '/T', '/F', '/PID', str(process.pid)], capture_output=True)
+            else:
+                os.killpg(process.pid, signal.SIGKILL)
+        except (OSError, ProcessLookupError):
+            pass
+
+    def _can_start(self, job, running):
+        if len(running) >= self.max_concurrent:
+            return False
+        for other in running:
+            if job.type.writes & (other.type.reads | other.type.writes):
+                return False
+            if job.type.reads & other.type.writes:
+                return False
+        return True
+
+    def _start_ready(self):
+        to_start = []
+        with self._lock:
+            running = [job for job in self.jobs if job.state == RUNNING]
+            # Oldest first; a waiting writer does not hold back unrelated jobs
+            for job in self.jobs:
+                if job.state == QUEUED and self._can_start(job, running):
+                    job.state = RUNNING
+                    job.started_at = time.time()
+                    running.append(job)
+                    to_start.append(job)
+        for job in to_start:
+            threading.Thread(target=self._run, args=(job,), daemon=True).start()
+
+    def _popen_options(self, job):
+        # Own process group/session, so cancel reaches git, php, composer, ...
+        limits = job.type.limits
+        if os.name == 'nt':
+            flags = subprocess.CREATE_NEW_PROCESS_GROUP
+            if limits.get('nice'):
+                flags |= subprocess.BELOW_NORMAL_PRIORITY_CLASS
+            return {'creationflags': flags}
+        return {'start_new_session': True}
+
+    def _add_line(self, job, line):
+        job.lines.append(line)
+        self.on_update(job, 'line', line)
+
+    def _run(self, job):
+        self.on_update(job, 'state')
+        try:
+            # Forked from the warm grading worker when it is running. No terminal
+            # input (stdin is /dev/null), so a prompt fails at once instead of hanging
+            command = _limited_command(job.type.command(), job.type.limits)
+            process = open_process(command, merge_stderr=True, stdin=False, **self._popen_options(job))
+            with self._lock:
+                job.process = process.process
+                cancel_now = job.cancel_requested
+            if cancel_now:
+                self._stop_process(process.process)
+
+            def on_event(event):
+                job.tracker.handle(event)
+                if event.get('event') == 'error':
+                    self._add_line(job, f"⚠️ {event.get('repo') or job.label}: {event.get('message', '')}")
+                self.on_update(job, 'progress')
+
+            process.start(on_line=lambda line: self._add_line(job, line), on_event=on_event)
+            job.returncode = process.wait()
+        except Exception as e:
+            self._add_line(job, f"❌ Could not run {job.type.script}: {e}")
+            job.returncode = -1
+
+        with self._lock:
+            job.finished_at = time.time()
+            if job.cancel_requested:
+                job.state = CANCELLED
+            elif job.returncode == 0:
+                job.state = SUCCEEDED
+            else:
+                job.state = FAILED
+        self.on_update(job, 'state')
+        self._start_ready()
@@ -8,6 +8,10 @@ import sys
 import subprocess
 from datetime import datetime
 
+import results_index
+import grading_worker
+from progress_events import run_with_console_progress
+
 # Fix encoding for Windows
 if sys.platform == "win32":
     import io
@@ -17,6 +21,8 @@ if sys.platform == "win32":
 
 class GradingMenu:
     def __init__(self):
+        # Scripts start from a warm worker process when USE_GRADING_WORKER is set
+        grading_worker.ensure_running()
         self.clear_screen()
         self.show_banner()
 
@@ -71,16 +77,13 @@ class GradingMenu:
             print(f"  Grading Status: {'🔒 Frozen' if FREEZE_GRADING else '🔓 Active'}")
             print(f"  Students Mapped: {len(STUDENT_EMAILS)}")
 
-            # Check graded count
-            if os.path.exists("cloned_repos"):
-                graded_count = len([
-                    d for d in os.listdir("cloned_repos")
-                    if os.path.isdir(os.path.join("cloned_repos", d))
-                    and os.path.exists(os.path.join("cloned_repos", d, "result.txt"))
-                ])
-                print(f"  Students Graded: {graded_count}")
-            else:
-                print(f"  Students Graded: 0")
+            # Graded count from the results index (reports from before it existed included)
+            try:
+                from config import OUTPUT_DIR
+            except ImportError:
+                OUTPUT_DIR = "cloned_repos"
+            results_index.backfill('midterm', OUTPUT_DIR, prefix=ASSIGNMENT_REPO_PREFIX)
+            print(f"  Students Graded: {len(results_index.graded_students('midterm'))}")
 
             # Check Moodle configuration
             try:
@@ -105,29 +108,14 @@ class GradingMenu:
         print()
 
         try:
-            # Run the script with real-time output
-            process = subprocess.Popen(
-                [sys.executable, script_name],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                bufsize=1,
-                universal_newlines=True
-            )
-
-            # Print output in real-time
-            for line in process.stdout:
-                print(line, end='', flush=True)
-
-            process.wait()
+            # Run the script with real-time output and progress
+            returncode = run_with_console_progress([sys.executable, script_name], spawn=grading_worker.open_terminal_process)
 
             print()
-            if process.returncode == 0:
+            if returncode == 0:
                 print("peration completed successfully!")
             else:
-                print(f"Operation failed with exit code: {process.returncode}")
+                print(f"Operation failed with exit code: {returncode}")
 
         except FileNotFoundError:
             print(f"Error: {script_name} not found!")
@@ -188,7 +176,7 @@ class GradingMenu:
         self.run_script("verify_mappings.py", "VERIFYING EMAIL MAPPINGS")
 
     def view_summary(self):
-        """View student summary - read from individual result files"""
+        """View student summary from the results index"""
         import re
         from datetime import datetime
 
@@ -205,67 +193,65 @@ class GradingMenu:
         print()
 
         try:
-            # Read grades from individual result files
+            # Grades come from the results index written at grading time
+            try:
+                from config import ASSIGNMENT_REPO_PREFIX
+            except ImportError:
+                ASSIGNMENT_REPO_PREFIX = ""
+            results_index.backfill('midterm', output_dir, prefix=ASSIGNMENT_REPO_PREFIX)
             students = []
 
-            for repo_name in os.listdir(output_dir):
-                repo_path = os.path.join(output_dir, repo_name)
-
-                # Skip if not a directory
-                if not os.path.isdir(repo_path):
-                    continue
-
-                # Look for result files
-                result_file = os.path.join(repo_path, "result.txt")
-                if not os.path.exists(result_file):
-                    result_file = os.path.join(repo_path, "result.html")
-
-                if not os.path.exists(result_file):
-                    continue
-
-                # Read and parse the result file
-                try:
-                    with open(result_file, 'r', encoding='utf-8', errors='replace') as f:
-                        content = f.read()
-
-                    # Extract information (handle both HTML and plain text)
-                    github_username = "Unknown"
-                    # Try HTML format first: <strong>GitHub Username:</strong> @username
-                    username_match = re.search(r'<strong>GitHub Username:</strong>\s*@?([^\s<]+)', content)
-                    if not username_match:
-                        # Fallback to plain text: GitHub Username: @username
-                        username_match = re.search(r'GitHub Username:\s*@?([^\s\n<]+)', content)
-                    if username_match:
-                        github_username = username_match.group(1)
-
-                    final_score = 0.0
-                    # Try HTML format: FINAL TOTAL SCORE: 88.76/100 pts
-                    score_match = re.search(r'FINAL TOTAL SCORE:\s*([\d.]+)/100', content)
-                    if not score_match:
-                        # Fallback to plain text: Final Score: 88.76/100
-                        score_match = re.search(r'Final Score:\s*([\d.]+)\s*/\s*100', content)
-                    if score_match:
-                        final_score = float(score_match.group(1))
-
-                    grade = "N/A"
-                    # Try HTML format: FINAL GRADE: A (Excellent)
-                    grade_match = re.search(r'FINAL GRADE:\s*([^<\n]+)', content)
-                    if not grade_match:
-                        # Fallback to plain text: Grade: A (Excellent)
-                        grade_match = re.search(r'Grade:\s*([^\n<]+)', content)
-                    if grade_match:
-                        grade = grade_match.group(1).strip()
-
-                    students.append({
-                        'repo_name': repo_name,
-                        'github_username': github_username,
-                        'final_score': final_score,
-                        'grade': grade
-                    })
-
-                except Exception as e:
-                    print(f"Error reading {repo_name}: {e}")
-                    continue
+            for entry in results_index.results('midterm'):
+                repo_name = entry['student']
+                github_username = entry['github_username'] or "Unknown"
+                final_score = entry['score']
+                grade = entry['grade']
+
+                if final_score is None:
+                    # Graded before the index existed: read the report once and remember it
+                    try:
+                        with open(entry['report_path'], 'r', encoding='utf-8', errors='replace') as f:
+                            content = f.read()
+
+                        # Try HTML format first: <strong>GitHub Username:</strong> @username
+                        username_match = re.search(r'<strong>GitHub Username:</strong>\s*@?([^\s<]+)', content)
+                        if not username_match:
+                            # Fallback to plain text: GitHub Username: @username
+                            username_match = re.search(r'GitHub Username:\s*@?([^\s\n<]+)', content)
+                        if username_match:
+                            github_username = username_match.group(1)
+
+                        final_score = 0.0
+                        # Try HTML format: FINAL TOTAL SCORE: 88.76/100 pts
+                        score_match = re.search(r'FINAL TOTAL SCORE:\s*([\d.]+)/100', content)
+                        if not score_match:
+                            # Fallback to plain text: Final Score: 88.76/100
+                            score_match = re.search(r'Final Score:\s*([\d.]+)\s*/\s*100', content)
+                        if score_match:
+                            final_score = float(score_match.group(1))
+
+                        grade = "N/A"
+                        # Try HTML format: FINAL GRADE: A (Excellent)
+                        grade_match = re.search(r'FINAL GRADE:\s*([^<\n]+)', content)
+                        if not grade_match:
+                            # Fallback to plain text: Grade: A (Excellent)
+                            grade_match = re.search(r'Grade:\s*([^\n<]+)', content)
+                        if grade_match:
+                            grade = grade_match.group(1).strip()
+
+                        results_index.record_result('midterm', repo_name, final_score, grade, entry['report_path'],
+                                                    github_username=github_username)
+
+                    except Exception as e:
+                        print(f"Error reading {repo_name}: {e}")
+                        continue
+
+                students.append({
+                    'repo_name': repo_name,
+                    'github_username': github_username,
+                    'final_score': final_score,
+                    'grade': grade
+                })
 
             # Display summary
             if not students:
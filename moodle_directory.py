@@ -0,0 +1,145 @@
+"""
+Moodle Directory
+Resolves students to Moodle users from one bulk fetch of the course's
+enrolment list, indexed by username and email and persisted on disk with a TTL.
+Site info is fetched once per session.
+"""
+
+import json
+import os
+import time
+
+import MoodleIntegration
+
+try:
+    import config
+except ImportError:
+    config = None
+
+# Index file and lifetime (override with MOODLE_DIRECTORY_FILE / MOODLE_DIRECTORY_TTL in config.py)
+DIRECTORY_FILE = getattr(config, 'MOODLE_DIRECTORY_FILE', '.moodle_directory.json')
+DIRECTORY_TTL = getattr(config, 'MOODLE_DIRECTORY_TTL', 6 * 3600)
+
+_site_info = None
+_directories = {}
+_refreshed = set()
+
+
+def get_site_info():
+    """core_webservice_get_site_info, called at most once per session (None on failure)"""
+    global _site_info
+    if _site_info is None:
+        _site_info = MoodleIntegration.call_moodle_api('core_webservice_get_site_info')
+    return _site_info
+
+
+def _load_file():
+    try:
+        with open(DIRECTORY_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_file(data):
+    tmp_path = f"{DIRECTORY_FILE}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, DIRECTORY_FILE)
+    except OSError as e:
+        print(f"[MOODLE] Warning: Could not save user directory: {e}")
+
+
+def _build_index(users):
+    by_username, by_email = {}, {}
+    for user in users:
+        entry = {
+            'id': user.get('id'),
+            'username': user.get('username', ''),
+            'fullname': user.get('fullname') or f"{user.get('firstname', '')} {user.get('lastname', '')}".strip(),
+            'email': user.get('email', ''),
+        }
+        if entry['username']:
+            by_username[entry['username'].lower()] = entry
+        if entry['email']:
+            by_email[entry['email'].lower()] = entry
+    return {'by_username': by_username, 'by_email': by_email}
+
+
+def refresh(course_id):
+    """
+    Fetch the course enrolment list in one request and rebuild the index.
+
+    Returns:
+        The index, or None if Moodle could not be reached
+    """
+    users = MoodleIntegration.call_moodle_api('core_enrol_get_enrolled_users', {'courseid': course_id})
+    if users is None:
+        return None
+
+    directory = _build_index(users)
+    directory['fetched_at'] = time.time()
+    _directories[str(course_id)] = directory
+    _refreshed.add(str(course_id))
+
+    data = _load_file()
+    data[str(course_id)] = directory
+    _save_file(data)
+    print(f"[MOODLE] Indexed {len(users)} enrolled user(s) for course {course_id}")
+    return directory
+
+
+def get_directory(course_id):
+    """Return the course index, refetching when missing or older than DIRECTORY_TTL"""
+    key = str(course_id)
+    directory = _directories.get(key) or _load_file().get(key)
+    if directory and time.time() - directory.get('fetched_at', 0) < DIRECTORY_TTL:
+        _directories[key] = directory
+        return directory
+    return refresh(course_id)
+
+
+def find_user(course_id, username=None, email=None):
+    """
+    Look up one enrolled user by username, falling back to email.
+
+    A miss against a cached index triggers one refresh per session, so
+    students enrolled since the last fetch are still found.
+
+    Returns:
+        Dictionary with id, username, fullname, email - or None
+    """
+    for attempt in range(2):
+        directory = get_directory(course_id)
+        if directory is None:
+            return None
+
+        user = None
+        if username:
+            user = directory['by_username'].get(username.lower())
+        if user is None and email:
+            user = directory['by_email'].get(email.lower())
+        if user is not None or str(course_id) in _refreshed:
+            return user
+
+        refresh(course_id)
+
+    return None
+
+
+def find_users(course_id, students):
+    """
+    Resolve many students at once.
+
+    Args:
+        students: List of (username, email) tuples
+
+    Returns:
+        Dictionary username -> user dictionary (missing students are left out)
+    """
+    return {
+        username: user
+        for username, email in students
+        for user in [find_user(course_id, username, email)] if user is not None
+    }
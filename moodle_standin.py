@@ -0,0 +1,230 @@
+"""
+Local Moodle Web Service Stand-in
+Offline imitation of the Moodle REST functions this project calls, with
+configurable latency, HTTP error rate and Moodle exception payloads.
+
+Usage:
+    python moodle_standin.py --port 8766 --students 40 --latency-ms 80
+    # then set MOODLE_URL = "http://127.0.0.1:8766" in config.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+REST_PATH = "/webservice/rest/server.php"
+INDEXED_PARAM = re.compile(r'^(\w+)\[(\d+)\]\[(\w+)\]$')
+
+
+class MoodleState:
+    """Course, enrolled users and gradebook held in memory"""
+
+    def __init__(self, students=40, course_id=1, activity_id=100, grade_item_id=500,
+                 latency_ms=0, error_rate=0.0, exception_rate=0.0, token=None):
+        self.course_id = course_id
+        self.activity_id = activity_id
+        self.grade_item_id = grade_item_id
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.exception_rate = exception_rate
+        self.token = token
+        self.lock = threading.Lock()
+        self.users = [
+            {
+                'id': 1000 + i,
+                'username': f"2024{i:05d}",
+                'firstname': 'Student',
+                'lastname': f"{i:03d}",
+                'fullname': f"Student {i:03d}",
+                'email': f"2024{i:05d}@example.edu",
+            }
+            for i in range(students)
+        ]
+        self.grades = {}          # user_id -> grade
+        self.overridden = set()   # user_ids with a manual override
+        self.calls = {}           # wsfunction -> count
+        self.grade_writes = 0     # Individual grades written
+
+    # --- Web service functions ---
+
+    def core_webservice_get_site_info(self, params):
+        return {'sitename': 'Moodle Stand-in', 'release': '4.1 (stand-in)', 'firstname': 'Web',
+                'lastname': 'Service', 'userid': 2, 'username': 'webservice'}
+
+    def core_user_get_users(self, params):
+        criteria = _indexed(params, 'criteria')
+        matches = self.users
+        for criterion in criteria:
+            key, value = criterion.get('key'), criterion.get('value', '')
+            matches = [u for u in matches if str(u.get(key, '')).lower() == value.lower()]
+        return {'users': matches, 'warnings': []}
+
+    def core_enrol_get_enrolled_users(self, params):
+        if int(params.get('courseid', 0)) != self.course_id:
+            return _exception('invalidrecord', 'Course not found')
+        return self.users
+
+    def core_course_get_courses(self, params):
+        return [{'id': self.course_id, 'fullname': 'Stand-in Course', 'shortname': 'STANDIN'}]
+
+    def gradereport_user_get_grade_items(self, params):
+        if int(params.get('courseid', 0)) != self.course_id:
+            return _exception('invalidrecord', 'Course not found')
+        user_id = params.get('userid')
+        users = [u for u in self.users if user_id is None or u['id'] == int(user_id)]
+        with self.lock:
+            return {'usergrades': [
+                {
+                    'courseid': self.course_id,
+                    'userid': u['id'],
+                    'userfullname': u['fullname'],
+                    'gradeitems': [{
+                        'id': self.grade_item_id,
+                        'itemname': 'Assignment',
+                        'itemmodule': 'assign',
+                        'cmid': self.activity_id,
+                        'idnumber': str(self.grade_item_id),
+                        'graderaw': self.grades.get(u['id']),
+                        'gradeoverridden': u['id'] in self.overridden,
+                    }],
+                }
+                for u in users
+            ], 'warnings': []}
+
+    def core_grades_update_grades(self, params):
+        known = {u['id'] for u in self.users}
+        grades = _indexed(params, 'grades')
+        if any(int(g.get('studentid', 0)) not in known for g in grades):
+            # Moodle rejects the whole call
+            return 1
+        with self.lock:
+            for g in grades:
+                self.grades[int(g['studentid'])] = float(g['grade'])
+            self.grade_writes += len(grades)
+        return 0
+
+    # --- Dispatch ---
+
+    def call(self, params):
+        """Handle one REST call. Returns (http_status, body)"""
+        function = params.get('wsfunction', '')
+        with self.lock:
+            self.calls[function] = self.calls.get(function, 0) + 1
+
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if random.random() < self.error_rate:
+            return 503, {'error': 'Service temporarily unavailable (stand-in)'}
+        if self.token is not None and params.get('wstoken') != self.token:
+            return 200, _exception('invalidtoken', 'Invalid token - token not found')
+        if random.random() < self.exception_rate:
+            return 200, _exception('dmlwriteexception', 'Error writing to database (injected)')
+
+        handler = getattr(self, function, None)
+        if handler is None or function.startswith('_'):
+            return 200, _exception('invalidfunction', f"Function {function} does not exist")
+        return 200, handler(params)
+
+
+def _exception(errorcode, message):
+    return {'exception': 'moodle_exception', 'errorcode': errorcode, 'message': message}
+
+
+def _indexed(params, name):
+    """Collect name[i][field] parameters into a list of dicts ordered by i"""
+    rows = {}
+    for key, value in params.items():
+        match = INDEXED_PARAM.match(key)
+        if match and match.group(1) == name:
+            rows.setdefault(int(match.group(2)), {})[match.group(3)] = value
+    return [rows[i] for i in sorted(rows)]
+
+
+def make_handler(state):
+    class MoodleHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, body):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            form = parse_qs(self.rfile.read(length).decode('utf-8'), keep_blank_values=True)
+            if self.path.split('?')[0] != REST_PATH:
+                self._reply(404, {'error': 'Not found'})
+                return
+            status, body = state.call({key: values[-1] for key, values in form.items()})
+            self._reply(status, body)
+
+        def do_GET(self):
+            query = self.path.split('?', 1)[1] if '?' in self.path else ''
+            form = parse_qs(query, keep_blank_values=True)
+            status, body = state.call({key: values[-1] for key, values in form.items()})
+            self._reply(status, body)
+
+    return MoodleHandler
+
+
+def start_standin(port=0, **options):
+    """
+    Start a stand-in on a background thread.
+
+    Returns:
+        (server, state, base_url) - use base_url as MOODLE_URL; call server.shutdown() when done
+    """
+    state = MoodleState(**options)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Moodle web service stand-in')
+    parser.add_argument('--port', type=int, default=8766, help='Port to listen on')
+    parser.add_argument('--students', type=int, default=40, help='Enrolled students to generate')
+    parser.add_argument('--course-id', type=int, default=1, help='Course ID')
+    parser.add_argument('--activity-id', type=int, default=100, help='Assignment course module ID')
+    parser.add_argument('--grade-item-id', type=int, default=500, help='Grade item ID')
+    parser.add_argument('--latency-ms', type=int, default=0, help='Delay added to every call')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls answered with HTTP 503')
+    parser.add_argument('--exception-rate', type=float, default=0.0,
+                        help='Fraction of calls answered with a Moodle exception payload')
+    parser.add_argument('--token', help='Require this wstoken (any token accepted if omitted)')
+    args = parser.parse_args()
+
+    server, state, base_url = start_standin(
+        args.port,
+        students=args.students,
+        course_id=args.course_id,
+        activity_id=args.activity_id,
+        grade_item_id=args.grade_item_id,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        exception_rate=args.exception_rate,
+        token=args.token,
+    )
+    print(f"[STANDIN] Moodle stand-in listening at {base_url} with {args.students} students (Ctrl+C to stop)")
+    print(f"          Course {args.course_id}, activity {args.activity_id}, grade item {args.grade_item_id}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print(f"\n[STANDIN] Calls: {state.calls}")
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
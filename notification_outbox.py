@@ -0,0 +1,270 @@
+"""
+Notification Outbox
+SQLite queue of Teams grade notifications. Graders enqueue each student's
+report with its content hash; senders drain the queue and mark items
+delivered. A report whose hash matches the last one delivered to that
+student is not queued again, and undelivered items survive crashes.
+"""
+
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+
+try:
+    import config
+except ImportError:
+    config = None
+
+# Outbox database (override with NOTIFICATION_OUTBOX_DB in config.py)
+OUTBOX_DB = getattr(config, 'NOTIFICATION_OUTBOX_DB', 'notification_outbox.db')
+
+# Recipients per send() call in drain(); each call's results are saved before
+# the next starts, so an interrupted run resends at most one chunk
+SEND_CHUNK_SIZE = getattr(config, 'NOTIFICATION_SEND_CHUNK', 20)
+
+STATUS_PENDING = 'pending'
+STATUS_DELIVERED = 'delivered'
+STATUS_SUPERSEDED = 'superseded'
+
+# Enqueue outcomes
+QUEUED = 'queued'
+ALREADY_QUEUED = 'already queued'
+UNCHANGED = 'unchanged'
+
+_lock = threading.Lock()
+
+
+def _connect():
+    conn = sqlite3.connect(OUTBOX_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            student TEXT NOT NULL,
+            recipient TEXT,
+            report_hash TEXT NOT NULL,
+            content TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            delivered_at TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_kind_student ON outbox (kind, student, status)")
+    return conn
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def report_hash(content):
+    """Content hash used to recognise a report that was already delivered"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def enqueue(kind, student, content, recipient=None):
+    """
+    Queue a notification unless this exact report was already delivered.
+
+    An older pending notification for the same student is superseded.
+
+    Args:
+        kind: Notification type, e.g. 'midterm' or 'laravel'
+        student: Stable student key (repository folder name)
+        content: Message HTML
+        recipient: Student email, if known (senders can resolve it later)
+
+    Returns:
+        QUEUED, ALREADY_QUEUED or UNCHANGED
+    """
+    digest = report_hash(content)
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                last_delivered = conn.execute(
+                    "SELECT report_hash FROM outbox WHERE kind = ? AND student = ? AND status = ? "
+                    "ORDER BY id DESC LIMIT 1",
+                    (kind, student, STATUS_DELIVERED)
+                ).fetchone()
+                pending_rows = conn.execute(
+                    "SELECT id, report_hash, recipient FROM outbox WHERE kind = ? AND student = ? AND status = ?",
+                    (kind, student, STATUS_PENDING)
+                ).fetchall()
+
+                if any(row['report_hash'] == digest for row in pending_rows):
+                    if recipient:
+                        conn.execute(
+                            "UPDATE outbox SET recipient = ? WHERE kind = ? AND student = ? AND status = ? AND report_hash = ?",
+                            (recipient, kind, student, STATUS_PENDING, digest)
+                        )
+                    return ALREADY_QUEUED
+
+                # Anything still pending is out of date now
+                conn.execute(
+                    "UPDATE outbox SET status = ? WHERE kind = ? AND student = ? AND status = ?",
+                    (STATUS_SUPERSEDED, kind, student, STATUS_PENDING)
+                )
+                if last_delivered is not None and last_delivered['report_hash'] == digest:
+                    return UNCHANGED
+
+                conn.execute(
+                    "INSERT INTO outbox (kind, student, recipient, report_hash, content, status, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (kind, student, recipient, digest, content, STATUS_PENDING, _now())
+                )
+                return QUEUED
+        finally:
+            conn.close()
+
+
+def pending(kind):
+    """
+    Undelivered notifications of one kind, oldest first.
+
+    Returns:
+        List of dictionaries with id, student, recipient, report_hash, content, attempts
+    """
+    with _lock:
+        conn = _connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, student, recipient, report_hash, content, attempts FROM outbox "
+                "WHERE kind = ? AND status = ? ORDER BY id",
+                (kind, STATUS_PENDING)
+            ).fetchall()
+        finally:
+            conn.close()
+    return [dict(row) for row in rows]
+
+
+def mark_delivered(item_ids):
+    """Mark notifications as delivered"""
+    if not item_ids:
+        return
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "UPDATE outbox SET status = ?, delivered_at = ?, attempts = attempts + 1, last_error = NULL "
+                    "WHERE id = ?",
+                    [(STATUS_DELIVERED, _now(), item_id) for item_id in item_ids]
+                )
+        finally:
+            conn.close()
+
+
+def mark_student_delivered(kind, student):
+    """
+    Mark a student's pending notification delivered after it was sent some
+    other way (e.g. the grader's own Teams message), so drain() does not
+    send it again and the next enqueue sees it as delivered.
+    """
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE outbox SET status = ?, delivered_at = ?, attempts = attempts + 1, last_error = NULL "
+                    "WHERE kind = ? AND student = ? AND status = ?",
+                    (STATUS_DELIVERED, _now(), kind, student, STATUS_PENDING)
+                )
+        finally:
+            conn.close()
+
+
+def mark_failed(item_id, error):
+    """Record a failed attempt; the notification stays pending for the next run"""
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE id = ?",
+                    (None if error is None else str(error)[:500], item_id)
+                )
+        finally:
+            conn.close()
+
+
+def forget_deliveries(kind, students=None):
+    """
+    Clear delivery history so the next enqueue sends again (e.g. a forced resend).
+
+    Args:
+        students: Student keys to reset, or None for everyone
+    """
+    query = "UPDATE outbox SET status = ? WHERE kind = ? AND status = ?"
+    params = [STATUS_SUPERSEDED, kind, STATUS_DELIVERED]
+    if students is not None:
+        students = list(students)
+        if not students:
+            return
+        query += f" AND student IN ({', '.join('?' * len(students))})"
+        params.extend(students)
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(query, params)
+        finally:
+            conn.close()
+
+
+def drain(kind, send, resolve_recipient=None):
+    """
+    Deliver every pending notification of one kind.
+
+    Items are sent SEND_CHUNK_SIZE recipients at a time and marked
+    delivered or failed as soon as their call returns. Items are tracked by
+    ID: several students can share a recipient email, so each call carries
+    at most one item per recipient and the rest go out in later calls.
+
+    Args:
+        send: Callable taking {recipient: content} and returning
+            {recipient: (success, error)}, e.g. a wrapper around
+            graph_batch.send_messages_batched
+        resolve_recipient: Optional callable student -> email for items
+            queued without a recipient
+
+    Returns:
+        List of (item, success, error) tuples
+    """
+    outcomes = []
+    queue = []
+    for item in pending(kind):
+        recipient = item['recipient'] or (resolve_recipient(item['student']) if resolve_recipient else None)
+        if not recipient:
+            mark_failed(item['id'], 'No recipient email for student')
+            outcomes.append((item, False, 'No recipient email for student'))
+            continue
+        item['recipient'] = recipient
+        queue.append(item)
+
+    while queue:
+        batch, queue = queue, []
+        recipients = {}     # recipient -> item ID in this send call
+        items = {}          # item ID -> item
+        for item in batch:
+            if item['recipient'] in recipients or len(recipients) >= SEND_CHUNK_SIZE:
+                queue.append(item)
+            else:
+                recipients[item['recipient']] = item['id']
+                items[item['id']] = item
+
+        results = send({recipient: items[item_id]['content'] for recipient, item_id in recipients.items()})
+        delivered = []
+        for recipient, item_id in recipients.items():
+            success, error = results.get(recipient, (False, 'Not sent'))
+            if success:
+                delivered.append(item_id)
+            else:
+                mark_failed(item_id, error)
+            outcomes.append((items[item_id], success, error))
+        mark_delivered(delivered)
+    return outcomes
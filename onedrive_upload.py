@@ -0,0 +1,170 @@
+"""
+OneDrive Report Uploads
+Chunked, resumable uploads through Graph upload sessions, with parallel
+uploads for several students
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from graph_delivery import retry_after_seconds
+from http_client import graph_session
+
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+
+# Graph requires chunk sizes that are multiples of 320 KiB
+CHUNK_SIZE = 5 * 320 * 1024
+MAX_CHUNK_RETRIES = 5
+MAX_SESSION_RESTARTS = 1
+UPLOAD_WORKERS = 4
+
+
+def create_upload_session(remote_path, access_token, session=None):
+    """
+    Start an upload session for a file under the signed-in user's OneDrive root.
+
+    Returns:
+        Upload URL, or None if Graph refused
+    """
+    session = session or graph_session()
+    name = remote_path.rsplit('/', 1)[-1]
+    response = session.post(
+        f"{GRAPH_URL}/me/drive/root:/{remote_path}:/createUploadSession",
+        headers={"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"},
+        json={"item": {"@microsoft.graph.conflictBehavior": "rename", "name": name}},
+        timeout=30
+    )
+    if response.status_code not in [200, 201]:
+        print(f"[ONEDRIVE] ✗ Failed to create upload session for {name}: {response.status_code}")
+        return None
+    return response.json()["uploadUrl"]
+
+
+def _next_offset(upload_url, session):
+    """Ask the upload session where to resume. Returns byte offset, or None if the session is gone"""
+    response = session.get(upload_url, timeout=30)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    ranges = response.json().get("nextExpectedRanges") or ["0-"]
+    return int(ranges[0].split('-')[0])
+
+
+def _upload_chunks(local_path, upload_url, session):
+    """
+    Send the file in fixed-size ranges, resuming from nextExpectedRanges after failures.
+
+    Returns:
+        (driveItem dict or None, session_expired flag)
+    """
+    file_size = os.path.getsize(local_path)
+    offset = 0
+    failures = 0
+
+    with open(local_path, 'rb') as f:
+        while offset < file_size:
+            f.seek(offset)
+            chunk = f.read(CHUNK_SIZE)
+            end = offset + len(chunk) - 1
+            # The upload URL is pre-authenticated: no Authorization header
+            headers = {
+                "Content-Length": str(len(chunk)),
+                "Content-Range": f"bytes {offset}-{end}/{file_size}"
+            }
+
+            try:
+                response = session.put(upload_url, headers=headers, data=chunk, timeout=60)
+                status = response.status_code
+            except Exception as e:
+                response, status = None, None
+                print(f"[ONEDRIVE] Chunk {offset}-{end} failed: {e}")
+
+            if status in (200, 201):
+                return response.json(), False
+            if status == 202:
+                failures = 0
+                offset = end + 1
+                continue
+            if status == 404:
+                return None, True
+            if status is not None and status < 500 and status not in (408, 416, 429):
+                print(f"[ONEDRIVE] ✗ Upload rejected: {status} {response.text[:200]}")
+                return None, False
+
+            failures += 1
+            if failures > MAX_CHUNK_RETRIES:
+                print(f"[ONEDRIVE] ✗ Giving up after {MAX_CHUNK_RETRIES} retries")
+                return None, False
+
+            wait = retry_after_seconds(response.headers if response is not None else None, default=2 ** failures)
+            time.sleep(wait)
+
+            # Resume from whatever the service actually received
+            try:
+                resumed = _next_offset(upload_url, session)
+            except Exception as e:
+                print(f"[ONEDRIVE] Could not query upload status: {e}")
+                continue
+            if resumed is None:
+                return None, True
+            offset = resumed
+
+    return None, False
+
+
+def upload_file(local_path, remote_path, access_token, session=None):
+    """
+    Upload a local file to OneDrive in resumable chunks.
+
+    Args:
+        local_path: File to upload
+        remote_path: Path under the OneDrive root, e.g. "GradingReports/jdoe_result.html"
+        access_token: Graph access token with Files.ReadWrite
+
+    Returns:
+        driveItem dictionary, or None on failure
+    """
+    session = session or graph_session()
+
+    for attempt in range(MAX_SESSION_RESTARTS + 1):
+        upload_url = create_upload_session(remote_path, access_token, session)
+        if not upload_url:
+            return None
+
+        item, expired = _upload_chunks(local_path, upload_url, session)
+        if item or not expired:
+            return item
+        print(f"[ONEDRIVE] Upload session expired, starting a new one...")
+
+    return None
+
+
+def upload_files(jobs, access_token, max_workers=UPLOAD_WORKERS):
+    """
+    Upload several files in parallel.
+
+    Args:
+        jobs: List of (local_path, remote_path) tuples
+
+    Returns:
+        List of driveItem dictionaries (None for failures), in job order
+    """
+    if not jobs:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+        return list(pool.map(lambda job: upload_file(job[0], job[1], access_token), jobs))
+
+
+def create_sharing_link(item_id, access_token, session=None):
+    """Create an organization-scoped view link for a drive item. Returns the URL or None"""
+    session = session or graph_session()
+    response = session.post(
+        f"{GRAPH_URL}/me/drive/items/{item_id}/createLink",
+        headers={"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"},
+        json={"type": "view", "scope": "organization"},
+        timeout=30
+    )
+    if response.status_code in [200, 201]:
+        return response.json().get('link', {}).get('webUrl')
+    return None
@@ -0,0 +1,275 @@
+"""
+Grading Progress Events
+JSON-lines progress events sent from the graders to whoever launched them,
+on a dedicated pipe separate from stdout/stderr.
+
+Grader side:
+    import progress_events as progress
+    progress.emit('repo_started', repo=name, index=i, total=n)
+
+Launcher side:
+    proc = ProgressProcess([sys.executable, 'Main.py'])
+    proc.start(on_line=print, on_event=tracker.handle)
+    proc.wait()
+
+Events: run_started(total), repo_started(repo, index, total), stage(repo, stage),
+milestone_scored(repo, milestone, total, quality, earned, weight),
+repo_finished(repo, score, grade), error(repo, message), run_finished(graded)
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+
+# Environment variable carrying the write end of the pipe to the child
+PROGRESS_ENV = 'GRADER_PROGRESS_FD'
+
+_channel = None
+_channel_checked = False
+_channel_lock = threading.Lock()
+
+
+# --- Grader side ---
+
+def _open_channel():
+    value = os.environ.pop(PROGRESS_ENV, None)   # Not inherited by our own children
+    if not value:
+        return None
+    try:
+        if value.startswith('handle:'):
+            import msvcrt
+            fd = msvcrt.open_osfhandle(int(value.split(':', 1)[1]), os.O_WRONLY)
+        else:
+            fd = int(value)
+        return os.fdopen(fd, 'w', encoding='utf-8', buffering=1)
+    except (OSError, ValueError):
+        return None
+
+
+def emit(event, **fields):
+    """Send one progress event (no-op when not launched with a progress channel)"""
+    global _channel, _channel_checked
+    with _channel_lock:
+        if not _channel_checked:
+            _channel = _open_channel()
+            _channel_checked = True
+        if _channel is None:
+            return
+        try:
+            _channel.write(json.dumps({'event': event, 'time': time.time(), **fields}, default=str) + '\n')
+        except (OSError, ValueError):
+            # Launcher went away; keep grading without progress
+            _channel = None
+
+
+# --- Launcher side ---
+
+def _pump(stream, callback):
+    try:
+        for line in stream:
+            callback(line.rstrip('\n'))
+    except (OSError, ValueError):
+        pass
+    finally:
+        stream.close()
+
+
+class ProgressProcess:
+    """
+    Child process with stdout, stderr and progress events each read on their
+    own thread, so no pipe can fill up and block the child.
+    """
+
+    def __init__(self, cmd, cwd=None, env=None, merge_stderr=False, **popen_kwargs):
+        """Extra keyword arguments (e.g. start_new_session, creationflags) go to Popen"""
+        env = dict(os.environ if env is None else env)
+        env.setdefault('PYTHONIOENCODING', 'utf-8')
+        read_fd, write_fd = os.pipe()
+
+        if os.name == 'nt':
+            import msvcrt
+            handle = msvcrt.get_osfhandle(write_fd)
+            os.set_handle_inheritable(handle, True)
+            env[PROGRESS_ENV] = f"handle:{handle}"
+            startupinfo = popen_kwargs.pop('startupinfo', None) or subprocess.STARTUPINFO()
+            startupinfo.lpAttributeList = {'handle_list': [handle]}
+            popen_kwargs['startupinfo'] = startupinfo
+        else:
+            env[PROGRESS_ENV] = str(write_fd)
+            popen_kwargs['pass_fds'] = tuple(popen_kwargs.get('pass_fds', ())) + (write_fd,)
+
+        try:
+            self.process = subprocess.Popen(
+                cmd,
+                cwd=cwd,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                bufsize=1,
+                **popen_kwargs
+            )
+        except Exception:
+            os.close(read_fd)
+            raise
+        finally:
+            # Only the child keeps the write end, so EOF arrives when it exits
+            os.close(write_fd)
+
+        self.events = os.fdopen(read_fd, 'r', encoding='utf-8', errors='replace')
+        self.threads = []
+
+    def start(self, on_line, on_event=None, on_stderr=None):
+        """
+        Start reader threads.
+
+        Args:
+            on_line: Called with each stdout line
+            on_event: Called with each progress event dictionary
+            on_stderr: Called with each stderr line (defaults to on_line)
+        """
+        def handle_event(line):
+            if not on_event or not line.strip():
+                return
+            try:
+                event = json.loads(line)
+            except ValueError:
+                return
+            on_event(event)
+
+        streams = [(self.process.stdout, on_line), (self.events, handle_event)]
+        if self.process.stderr is not None:
+            streams.append((self.process.stderr, on_stderr or on_line))
+        for stream, callback in streams:
+            thread = threading.Thread(target=_pump, args=(stream, callback), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def wait(self):
+        """Wait for the child and for all output to be delivered. Returns the exit code"""
+        returncode = self.process.wait()
+        for thread in self.threads:
+            thread.join()
+        return returncode
+
+
+def format_duration(seconds):
+    seconds = int(max(0, seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def format_bar(fraction, width=30):
+    filled = int(round(max(0.0, min(1.0, fraction)) * width))
+    return '█' * filled + '░' * (width - filled)
+
+
+class ProgressTracker:
+    """Folds progress events into counts, the current step and an ETA"""
+
+    def __init__(self):
+        self.total = None
+        self.done = 0
+        self.errors = 0
+        self.repo = None
+        self.stage = None
+        self.milestone = None
+        self.started = time.time()
+        self.repo_started = None
+        self.repo_durations = []
+
+    def handle(self, event):
+        kind = event.get('event')
+        now = event.get('time', time.time())
+        if kind == 'run_started':
+            self.total = event.get('total')
+            self.started = now
+        elif kind == 'repo_started':
+            self.repo = event.get('repo')
+            self.total = event.get('total', self.total)
+            self.stage = None
+            self.milestone = None
+            self.repo_started = now
+        elif kind == 'stage':
+            self.stage = event.get('stage')
+        elif kind == 'milestone_scored':
+            self.milestone = (event.get('milestone'), event.get('total'))
+        elif kind == 'repo_finished':
+            self.done += 1
+            if self.repo_started is not None:
+                self.repo_durations.append(now - self.repo_started)
+            self.repo_started = None
+        elif kind == 'error':
+            self.errors += 1
+        return kind
+
+    @property
+    def fraction(self):
+        if not self.total:
+            return 0.0
+        # Count partial progress through the current repository's milestones
+        partial = 0.0
+        if self.repo_started is not None and self.milestone and self.milestone[1]:
+            partial = self.milestone[0] / self.milestone[1]
+        return min(1.0, (self.done + partial) / self.total)
+
+    @property
+    def eta_seconds(self):
+        """Remaining time from the average repository duration so far (None until known)"""
+        if not self.total or not self.repo_durations:
+            return None
+        average = sum(self.repo_durations) / len(self.repo_durations)
+        return max(0.0, (self.total - self.done) * average)
+
+    def describe(self):
+        """One-line summary, e.g. '12/40 repos (30%) · ETA 3m20s · repo: milestone 5/22'"""
+        parts = [f"{self.done}/{self.total or '?'} repos ({self.fraction:.0%})"]
+        eta = self.eta_seconds
+        parts.append(f"ETA {format_duration(eta)}" if eta is not None else "ETA --")
+        if self.repo and self.repo_started is not None:
+            step = self.repo
+            if self.milestone:
+                step += f": milestone {self.milestone[0]}/{self.milestone[1]}"
+            elif self.stage:
+                step += f": {self.stage}"
+            parts.append(step)
+        if self.errors:
+            parts.append(f"{self.errors} error(s)")
+        return ' · '.join(parts)
+
+
+def run_with_console_progress(cmd, cwd=None, spawn=ProgressProcess):
+    """
+    Run a grader for the terminal menus: its output is echoed as it arrives,
+    with a [PROGRESS] line whenever a repository finishes.
+
+    Args:
+        spawn: Process factory with the ProgressProcess interface (e.g.
+            grading_worker.open_terminal_process)
+
+    Returns:
+        Exit code
+    """
+    tracker = ProgressTracker()
+    print_lock = threading.Lock()
+
+    def on_line(line):
+        with print_lock:
+            print(line, flush=True)
+
+    def on_event(event):
+        if tracker.handle(event) == 'repo_finished':
+            with print_lock:
+                print(f"[PROGRESS] {format_bar(tracker.fraction)} {tracker.describe()}", flush=True)
+
+    process = spawn(cmd, cwd=cwd, merge_stderr=True)
+    process.start(on_line=on_line, on_event=on_event)
+    return process.wait()
@@ -0,0 +1,178 @@
+"""
+Results Index
+SQLite index of graded students. Graders record each student's score, grade
+and report location when the report is written, so status panels and
+summaries can read one table instead of scanning the cloned repositories.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+try:
+    import config
+except ImportError:
+    config = None
+
+# Index database (override with RESULTS_INDEX_DB in config.py)
+RESULTS_DB = getattr(config, 'RESULTS_INDEX_DB', 'results_index.db')
+
+_lock = threading.Lock()
+
+
+def _connect():
+    conn = sqlite3.connect(RESULTS_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS results (
+            kind TEXT NOT NULL,
+            student TEXT NOT NULL,
+            github_username TEXT,
+            score REAL,
+            grade TEXT,
+            report_path TEXT,
+            details TEXT,
+            graded_at TEXT NOT NULL,
+            PRIMARY KEY (kind, student)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS scanned (
+            kind TEXT NOT NULL,
+            student TEXT NOT NULL,
+            mtime REAL NOT NULL,
+            PRIMARY KEY (kind, student)
+        )
+    """)
+    return conn
+
+
+def _row(row):
+    result = dict(row)
+    result['details'] = json.loads(result['details']) if result['details'] else None
+    return result
+
+
+def record_result(kind, student, score, grade, report_path, github_username=None, details=None):
+    """
+    Record (or replace) a student's latest result.
+
+    Args:
+        kind: Assignment type, e.g. 'midterm' or 'laravel'
+        student: Stable student key (repository folder name)
+        score: Final score out of 100, or None when unknown
+        grade: Letter grade
+        report_path: Path of the student's result.html
+        github_username: Student's GitHub username, if known
+        details: Optional JSON-serialisable breakdown (categories, milestones, ...)
+    """
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results "
+                    "(kind, student, github_username, score, grade, report_path, details, graded_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (kind, student, github_username, score, grade, report_path,
+                     None if details is None else json.dumps(details, default=str),
+                     datetime.now().isoformat(timespec='seconds'))
+                )
+        finally:
+            conn.close()
+
+
+def results(kind=None):
+    """
+    Latest results, ordered by student.
+
+    Args:
+        kind: Assignment type, or None for all of them
+    """
+    query = "SELECT * FROM results"
+    params = ()
+    if kind is not None:
+        query += " WHERE kind = ?"
+        params = (kind,)
+    with _lock:
+        conn = _connect()
+        try:
+            rows = conn.execute(query + " ORDER BY kind, student", params).fetchall()
+        finally:
+            conn.close()
+    return [_row(row) for row in rows]
+
+
+def graded_students(kind):
+    """Set of student keys with a recorded result"""
+    with _lock:
+        conn = _connect()
+        try:
+            rows = conn.execute("SELECT student FROM results WHERE kind = ?", (kind,)).fetchall()
+        finally:
+            conn.close()
+    return {row['student'] for row in rows}
+
+
+def scanned_folders(kind):
+    """Student folders searched without finding a result, as student -> folder mtime"""
+    with _lock:
+        conn = _connect()
+        try:
+            rows = conn.execute("SELECT student, mtime FROM scanned WHERE kind = ?", (kind,)).fetchall()
+        finally:
+            conn.close()
+    return {row['student']: row['mtime'] for row in rows}
+
+
+def record_scanned(kind, student, mtime):
+    """Remember that a student folder (at this mtime) holds no result to import"""
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO scanned (kind, student, mtime) VALUES (?, ?, ?)",
+                    (kind, student, mtime)
+                )
+        finally:
+            conn.close()
+
+
+def remove_result(kind, student):
+    """Drop a student's entry (e.g. the repository was deleted)"""
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM results WHERE kind = ? AND student = ?", (kind, student))
+        finally:
+            conn.close()
+
+
+def backfill(kind, output_dir, report_name='result.html', prefix=''):
+    """
+    Import reports graded before the index existed.
+
+    Every student folder with a report but no entry of this kind is added;
+    imported entries have no score until the student is graded again (or a
+    summary reads the report once). Folders not starting with prefix are
+    ignored, since both assignments share OUTPUT_DIR.
+
+    Returns:
+        Number of students imported
+    """
+    if not os.path.isdir(output_dir):
+        return 0
+    indexed = graded_students(kind)
+    imported = 0
+    for entry in os.scandir(output_dir):
+        if entry.name in indexed:
+            continue
+        report_path = os.path.join(entry.path, report_name)
+        if entry.is_dir() and entry.name.startswith(prefix) and os.path.exists(report_path):
+            record_result(kind, entry.name, None, None, report_path)
+            imported += 1
+    return imported
@@ -0,0 +1,50 @@
+"""
+Run Limited
+Runs a Python script at a lower priority and with memory/CPU limits that
+this process sets on itself before the script starts, so they hold from the
+script's first line and are inherited by everything it runs. The job
+scheduler starts limited jobs through it (no preexec_fn in the threaded GUI).
+
+Usage:
+    python run_limited.py '{"nice": 5, "memory_mb": 2048}' Main.py [args...]
+"""
+
+import json
+import os
+import runpy
+import sys
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def apply_limits(limits):
+    """Apply nice/memory/CPU limits to this process (memory and CPU need POSIX)"""
+    try:
+        if limits.get('nice') and hasattr(os, 'setpriority'):
+            os.setpriority(os.PRIO_PROCESS, 0, limits['nice'])
+        if limits.get('memory_mb') and resource is not None:
+            size = limits['memory_mb'] * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (size, size))
+        if limits.get('cpu_seconds') and resource is not None:
+            seconds = limits['cpu_seconds']
+            resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds))
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] Could not apply job limits {limits}: {e}", file=sys.stderr)
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python run_limited.py LIMITS_JSON SCRIPT [ARGS...]", file=sys.stderr)
+        sys.exit(2)
+    apply_limits(json.loads(sys.argv[1]))
+    script = sys.argv[2]
+    sys.argv = [script] + sys.argv[3:]
+    sys.path[0] = os.path.dirname(os.path.abspath(script))
+    runpy.run_path(script, run_name='__main__')
+
+
+if __name__ == "__main__":
+    main()
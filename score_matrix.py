@@ -0,0 +1,218 @@
+"""
+Cohort Score Matrix
+Re-scores the whole Midterm (ATM) cohort from the raw per-milestone quality
+scores saved in the results index, without git or the AI. Quality scores are
+held as a students x milestones array, and category totals, the
+instruction-following bonus, the late penalty and letter grades are computed
+for everyone in one pass, so a rubric change can be previewed instantly.
+
+Usage:
+    python score_matrix.py                               # Re-score with the current rubric
+    python score_matrix.py --weight 5=8 --weight 23=2    # Preview new milestone weights
+    python score_matrix.py --bonus 3 --threshold 75 --penalty 10
+    python score_matrix.py --deadline "2025-11-01 23:59:59"
+    python score_matrix.py --export cohort.npz           # Save the raw arrays
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+
+import results_index
+from atm_rubric import CATEGORIES, GRADE_BANDS, MILESTONES
+
+try:
+    import config
+except ImportError:
+    config = None
+
+NO_SUBMISSION = "No submissions"
+
+
+class Cohort:
+    """Raw grading inputs of one assignment, as arrays aligned on students"""
+
+    def __init__(self, students, milestone_nums, quality, late, last_commit, recorded_scores):
+        self.students = students                  # Repository names (S)
+        self.milestone_nums = milestone_nums      # Milestone numbers (M)
+        self.quality = quality                    # (S, M) quality 0-100, NaN where not graded
+        self.late = late                          # (S,) late flag as graded
+        self.last_commit = last_commit            # (S,) last commit POSIX time, NaN if unknown
+        self.recorded_scores = recorded_scores    # (S,) final scores written at grading time
+
+
+def load_cohort(kind='midterm'):
+    """
+    Build the cohort arrays from the results index.
+
+    Students graded before raw scores were recorded are left out until they
+    are graded again.
+    """
+    entries = [e for e in results_index.results(kind) if e['details'] and 'quality' in e['details']]
+    milestone_nums = np.array(sorted(MILESTONES), dtype=int)
+    column = {int(num): j for j, num in enumerate(milestone_nums)}
+
+    quality = np.full((len(entries), len(milestone_nums)), np.nan)
+    late = np.zeros(len(entries), dtype=bool)
+    last_commit = np.full(len(entries), np.nan)
+    recorded = np.full(len(entries), np.nan)
+    for i, entry in enumerate(entries):
+        details = entry['details']
+        for num, score in details['quality'].items():
+            j = column.get(int(num))
+            if j is not None:
+                quality[i, j] = score
+        late[i] = bool(details.get('late'))
+        if details.get('last_commit') is not None:
+            last_commit[i] = details['last_commit']
+        if entry['score'] is not None:
+            recorded[i] = entry['score']
+
+    return Cohort([e['student'] for e in entries], milestone_nums, quality, late, last_commit, recorded)
+
+
+def score_cohort(cohort, weights=None, bonus=None, threshold=None, penalty=None, deadline=None):
+    """
+    Score every student at once, the same way Main.py scores one.
+
+    Args:
+        cohort: Cohort from load_cohort()
+        weights: Optional {milestone number: weight} overrides
+        bonus: Instruction-following bonus (default INSTRUCTION_FOLLOWING_BONUS)
+        threshold: Average quality needed for the bonus (default INSTRUCTION_THRESHOLD)
+        penalty: Late submission penalty (default LATE_SUBMISSION_PENALTY)
+        deadline: Optional datetime; re-decides lateness from the last commit
+            time instead of using the flag recorded at grading time
+
+    Returns:
+        Dictionary of arrays: raw, adjustment, final, grade (per student) and
+        category_earned (students x categories), plus category_names and
+        category_total
+    """
+    bonus = getattr(config, 'INSTRUCTION_FOLLOWING_BONUS', 0) if bonus is None else bonus
+    threshold = getattr(config, 'INSTRUCTION_THRESHOLD', 80) if threshold is None else threshold
+    penalty = getattr(config, 'LATE_SUBMISSION_PENALTY', 0) if penalty is None else penalty
+    weights = weights or {}
+
+    nums = cohort.milestone_nums
+    w = np.array([weights.get(int(n), MILESTONES[int(n)]['weight']) for n in nums], dtype=float)
+
+    graded = ~np.isnan(cohort.quality)
+    quality = np.where(graded, cohort.quality, 0.0)
+    earned = quality / 100.0 * w
+    raw = earned.sum(axis=1)
+
+    # Bonus on the average over graded milestones; penalty for late work
+    counts = graded.sum(axis=1)
+    average = np.divide(quality.sum(axis=1), counts, out=np.zeros(len(counts)), where=counts > 0)
+    if deadline is not None:
+        late = np.nan_to_num(cohort.last_commit, nan=-np.inf) > deadline.timestamp()
+    else:
+        late = cohort.late
+    adjustment = np.where(average >= threshold, bonus, 0.0) - np.where(late, penalty, 0.0)
+
+    has_work = counts > 0
+    final = np.where(has_work, np.clip(raw + adjustment, 0, 100), 0.0)
+
+    # Categories as a membership matrix: earned points summed per category in one product
+    category_names = list(CATEGORIES)
+    membership = np.array([np.isin(nums, CATEGORIES[name]) for name in category_names], dtype=float)
+    category_earned = earned @ membership.T
+    category_total = membership @ w
+
+    # Grade bands are highest first: count the minimums a score falls short of
+    minimums = np.array([minimum for minimum, _ in GRADE_BANDS], dtype=float)
+    labels = np.array([label for _, label in GRADE_BANDS] + [GRADE_BANDS[-1][1]])
+    grade = labels[(final[:, None] < minimums[None, :]).sum(axis=1)]
+    grade = np.where(has_work, grade, NO_SUBMISSION)
+
+    return {
+        'raw': raw,
+        'adjustment': np.where(has_work, adjustment, 0.0),
+        'final': final,
+        'grade': grade,
+        'category_names': category_names,
+        'category_earned': category_earned,
+        'category_total': category_total,
+    }
+
+
+def _parse_weight(value):
+    try:
+        num, weight = value.split('=', 1)
+        num, weight = int(num), float(weight)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected MILESTONE=WEIGHT, got '{value}'")
+    if num not in MILESTONES:
+        raise argparse.ArgumentTypeError(f"unknown milestone {num}")
+    return num, weight
+
+
+def _grade_counts(grades):
+    labels, counts = np.unique(grades, return_counts=True)
+    return dict(zip(labels.tolist(), counts.tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-score the ATM cohort from saved quality scores (what-if previews)')
+    parser.add_argument('--weight', '-w', action='append', type=_parse_weight, default=[], metavar='MILESTONE=WEIGHT',
+                        help='Override a milestone weight (repeatable)')
+    parser.add_argument('--bonus', type=float, help='Instruction-following bonus points')
+    parser.add_argument('--threshold', type=float, help='Average quality needed for the bonus')
+    parser.add_argument('--penalty', type=float, help='Late submission penalty points')
+    parser.add_argument('--deadline', help='Submission deadline, "YYYY-MM-DD HH:MM:SS"')
+    parser.add_argument('--export', metavar='PATH', help='Save the raw cohort arrays to a .npz file')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    cohort = load_cohort()
+    loaded = time.perf_counter()
+    if not cohort.students:
+        print("No students with saved quality scores. Grade the cohort with Main.py first.")
+        return
+
+    deadline = datetime.strptime(args.deadline, "%Y-%m-%d %H:%M:%S") if args.deadline else None
+    current = score_cohort(cohort)
+    preview = score_cohort(cohort, weights=dict(args.weight), bonus=args.bonus, threshold=args.threshold,
+                           penalty=args.penalty, deadline=deadline)
+    scored = time.perf_counter()
+
+    total_weight = sum(dict(args.weight).get(n, m['weight']) for n, m in MILESTONES.items())
+    print("=" * 78)
+    print(f"COHORT WHAT-IF: {len(cohort.students)} students x {len(cohort.milestone_nums)} milestones")
+    print(f"Loaded in {(loaded - start) * 1000:.1f} ms, scored in {(scored - loaded) * 1000:.1f} ms")
+    if total_weight != 100:
+        print(f"[WARNING] Milestone weights add up to {total_weight:g}, not 100")
+    print("=" * 78)
+
+    delta = preview['final'] - current['final']
+    changed = np.flatnonzero((np.abs(delta) > 1e-9) | (preview['grade'] != current['grade']))
+    if changed.size:
+        print(f"{'Student':40} {'Now':>7} {'Preview':>8} {'Change':>7}  Grade")
+        for i in changed[np.argsort(delta[changed])]:
+            grade_note = current['grade'][i]
+            if preview['grade'][i] != current['grade'][i]:
+                grade_note += f" -> {preview['grade'][i]}"
+            print(f"{cohort.students[i]:40} {current['final'][i]:7.2f} {preview['final'][i]:8.2f} {delta[i]:+7.2f}  {grade_note}")
+    else:
+        print("No student's score or grade changes.")
+
+    print("-" * 78)
+    print(f"Mean final score: {current['final'].mean():.2f} -> {preview['final'].mean():.2f}")
+    print(f"Grades now:     {_grade_counts(current['grade'])}")
+    print(f"Grades preview: {_grade_counts(preview['grade'])}")
+
+    stale = np.flatnonzero(np.abs(np.nan_to_num(cohort.recorded_scores - current['final'])) > 0.01)
+    if stale.size:
+        print(f"[INFO] {stale.size} student(s) were graded with a different rubric than the current one")
+
+    if args.export:
+        np.savez_compressed(args.export, students=np.array(cohort.students), milestones=cohort.milestone_nums,
+                            quality=cohort.quality, late=cohort.late, last_commit=cohort.last_commit)
+        print(f"[SAVED] Cohort arrays: {args.export}")
+
+
+if __name__ == '__main__':
+    main()
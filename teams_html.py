@@ -0,0 +1,261 @@
+"""
+Teams HTML Helpers
+Body extraction and whitespace compression for report HTML sent as Teams
+chat messages (<pre>/<textarea> contents and quoted attribute values are
+left untouched), and structure-aware splitting under the message size limit.
+"""
+
+import re
+
+_BODY_OPEN = re.compile(r'<body\b[^>]*>', re.IGNORECASE)
+_BODY_CLOSE = re.compile(r'</body\s*>', re.IGNORECASE)
+_COMMENT = re.compile(r'<!--.*?-->', re.DOTALL)
+
+# Spans copied verbatim: preformatted blocks, and attribute values whose
+# whitespace would otherwise be changed (tabs, newlines or repeated spaces)
+_PROTECTED = re.compile(
+    r'(<pre\b.*?</pre\s*>'
+    r'|<textarea\b.*?</textarea\s*>'
+    r'|="[^"<>]*?(?:\s\s|[\t\n\r\f\v])[^"]*"'
+    r"|='[^'<>]*?(?:\s\s|[\t\n\r\f\v])[^']*')",
+    re.IGNORECASE | re.DOTALL
+)
+
+
+def extract_body(html):
+    """Contents of <body>, or the whole document if it has none"""
+    start = _BODY_OPEN.search(html)
+    if not start:
+        return html
+    end = _BODY_CLOSE.search(html, start.end())
+    return html[start.end():end.start() if end else len(html)]
+
+
+def _collapse(text):
+    """Collapse whitespace runs to one space and drop whitespace between tags"""
+    words = text.split()
+    if not words:
+        return ' ' if text else ''
+    collapsed = ' '.join(words).replace('> <', '><')
+    if text[0].isspace():
+        collapsed = ' ' + collapsed
+    if text[-1].isspace():
+        collapsed += ' '
+    return collapsed
+
+
+def minify_html(html, body_only=True):
+    """
+    Minify report HTML for a Teams message.
+
+    - Keeps only the contents of <body> when present (body_only)
+    - Collapses whitespace runs in text to a single space
+    - Drops whitespace between tags and HTML comments
+    - Leaves <pre>/<textarea> contents and attribute values as they are
+
+    The protected spans are found with one regex split; everything between
+    them is collapsed with str.split/join, so the work stays linear and
+    mostly in C.
+
+    Returns:
+        Minified HTML string
+    """
+    if body_only:
+        html = extract_body(html)
+    if '<!--' in html:
+        html = _COMMENT.sub('', html)
+
+    pieces = _PROTECTED.split(html)
+    out = []
+    for i, piece in enumerate(pieces):
+        if i % 2:
+            # Protected span; a tag-starting one also ends inter-tag whitespace before it
+            if piece[0] == '<' and out and out[-1].endswith('> '):
+                out[-1] = out[-1][:-1]
+            out.append(piece)
+            continue
+        text = _collapse(piece)
+        if text.startswith(' <') and out and out[-1].endswith('>') and out[-1][0] == '<':
+            text = text[1:]
+        out.append(text)
+
+    return ''.join(out).strip()
+
+
+# --- Splitting for the Teams message size limit ---
+
+# Graph rejects chat messages over roughly 28 KB of body content
+TEAMS_MESSAGE_LIMIT = 28000
+
+# Room kept in every part for the "Part i of n" label
+PART_LABEL_RESERVE = 200
+
+_TAG = re.compile(
+    r'<!--.*?-->|<(/?)([a-zA-Z][a-zA-Z0-9]*)(?:"[^"]*"|\'[^\']*\'|[^\'">])*?(/?)>',
+    re.DOTALL
+)
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+
+def _size(html):
+    return len(html.encode('utf-8'))
+
+
+def top_level_sections(html):
+    """
+    Split an HTML fragment into its top-level elements.
+
+    Text between elements is kept with the element that follows it, so
+    joining the result gives back the input. Unclosed tags are tolerated.
+
+    Returns:
+        List of HTML strings
+    """
+    sections = []
+    stack = []
+    start = 0
+    for match in _TAG.finditer(html):
+        closing, name, self_closing = match.group(1), match.group(2), match.group(3)
+        if not name:
+            continue
+        name = name.lower()
+        if closing:
+            if name in stack:
+                while stack.pop() != name:
+                    pass
+                if not stack:
+                    sections.append(html[start:match.end()])
+                    start = match.end()
+        elif name in VOID_TAGS or self_closing:
+            if not stack:
+                sections.append(html[start:match.end()])
+                start = match.end()
+        else:
+            stack.append(name)
+    if html[start:].strip():
+        sections.append(html[start:])
+    elif sections:
+        sections[-1] += html[start:]
+    return sections
+
+
+def _unwrap(section):
+    """Split a single element into (open tag, inner HTML, close tag), or None"""
+    stripped = section.strip()
+    first = _TAG.match(stripped)
+    if not first or not first.group(2) or first.group(1) or first.group(3):
+        return None
+    close = f"</{first.group(2)}"
+    end = stripped.lower().rfind(close.lower())
+    if end < first.end() or not stripped[end:].rstrip().endswith('>'):
+        return None
+    return stripped[:first.end()], stripped[first.end():end], stripped[end:]
+
+
+def _cut(text, limit):
+    """Longest prefix of text within limit bytes that does not end inside a character reference"""
+    prefix = text.encode('utf-8')[:limit].decode('utf-8', 'ignore')
+    amp = prefix.rfind('&')
+    if amp > prefix.rfind(';') and amp > 0:
+        prefix = prefix[:amp]
+    return max(len(prefix), 1)
+
+
+def _split_text(text, limit):
+    """Split text without markup at whitespace, cutting words that are longer than the limit"""
+    parts = []
+    current, current_size = '', 0
+    for word in re.findall(r'\S+\s*|\s+', text):
+        size = _size(word)
+        if current_size + size <= limit:
+            current += word
+            current_size += size
+            continue
+        if current.strip():
+            parts.append(current)
+        while size > limit:
+            n = _cut(word, limit)
+            parts.append(word[:n])
+            word = word[n:]
+            size = _size(word)
+        current, current_size = word, size
+    if current.strip():
+        parts.append(current)
+    return parts
+
+
+def _split(html, limit):
+    if _size(html) <= limit:
+        return [html]
+
+    sections = top_level_sections(html)
+    if len(sections) == 1:
+        parts = _unwrap(sections[0])
+        if parts is None:
+            first = _TAG.search(html)
+            if first is None:
+                return _split_text(html, limit)
+            if first.start() > 0:
+                # Text before the first element is split on its own
+                return _split_text(html[:first.start()], limit) + _split(html[first.start():], limit)
+            # Unparseable markup: nothing safe to split on
+            return [html]
+        open_tag, inner, close_tag = parts
+        budget = limit - _size(open_tag) - _size(close_tag)
+        if budget <= 0 or not inner.strip():
+            return [html]
+        return [open_tag + piece + close_tag for piece in _split(inner, budget)]
+
+    # Pack sections greedily; oversized ones are split further
+    parts = []
+    current, current_size = '', 0
+    for section in sections:
+        size = _size(section)
+        if current_size + size <= limit:
+            current += section
+            current_size += size
+            continue
+        if current.strip():
+            parts.append(current)
+        if size <= limit:
+            current, current_size = section, size
+        else:
+            pieces = _split(section, limit)
+            parts.extend(pieces[:-1])
+            # The last piece is closed, so following sections can share its message
+            current, current_size = pieces[-1], _size(pieces[-1])
+    if current.strip():
+        parts.append(current)
+    return parts
+
+
+def split_for_teams(html, limit=TEAMS_MESSAGE_LIMIT):
+    """
+    Split a message into as few parts as fit under the Teams size limit.
+
+    Top-level sections (milestones, summaries, ...) are packed greedily into
+    each part. A section that is too large on its own is split at its child
+    elements and re-wrapped in its own opening and closing tags, so styling
+    carries over to every part; text without child elements is split at
+    whitespace.
+
+    Returns:
+        List of HTML parts (a single part when the message already fits)
+    """
+    if _size(html) <= limit:
+        return [html]
+
+    budget = limit - PART_LABEL_RESERVE
+    parts = []
+    for piece in _split(html, budget):
+        # Neighbouring pieces from different wrappers are still valid side by side
+        if parts and _size(parts[-1]) + _size(piece) <= budget:
+            parts[-1] += piece
+        else:
+            parts.append(piece)
+    if len(parts) == 1:
+        return parts
+    return [
+        f'<p style="margin:0 0 8px; font-size:12px; color:#007acc;"><strong>Part {i} of {len(parts)}</strong></p>{part}'
+        for i, part in enumerate(parts, 1)
+    ]
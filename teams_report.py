@@ -0,0 +1,191 @@
+"""
+Teams Report Rendering
+Compact, Teams-native grade reports rendered from the structured results at
+grading time and saved next to result.html as result.teams.html. Markup is
+inline and minimal (no <style> blocks, gradients or shadows), with one table
+row per milestone/category, so most reports fit in a single chat message and
+the senders can post the file as is.
+"""
+
+import os
+from html import escape
+
+TEAMS_REPORT_NAME = "result.teams.html"
+
+SIGNATURE = "Mr. Rindra"
+
+_WRAP = '<div style="font-family:Segoe UI,Arial,sans-serif;font-size:13px;line-height:1.4">'
+_TABLE = '<table cellpadding="3" style="border-collapse:collapse;width:100%">'
+_TH = '<th align="left">'
+_TD = '<td valign="top">'
+_NOTE = '<td colspan="3" style="color:#666;font-size:12px">'
+
+
+def _color(percentage):
+    if percentage >= 80:
+        return "#28a745"
+    if percentage >= 60:
+        return "#17a2b8"
+    if percentage >= 45:
+        return "#d39e00"
+    return "#dc3545"
+
+
+def _pct(percentage, text=None):
+    return f'<b style="color:{_color(percentage)}">{text or f"{percentage:.0f}%"}</b>'
+
+
+def _header(title, student_name, score, grade):
+    return (
+        f'<p style="margin:0 0 6px"><b>Hello {escape(student_name)},</b> here is your {escape(title)} grade report.</p>'
+        f'<h3 style="margin:0 0 8px">Final score: {_pct(score, f"{score:.2f}/100")} &middot; Grade {escape(grade)}</h3>'
+    )
+
+
+def _footer():
+    return f'<p style="margin:10px 0 0">Best regards,<br>{SIGNATURE}</p></div>'
+
+
+def _bullets(items):
+    """Bullet list of already-escaped HTML items"""
+    return '<ul style="margin:4px 0;padding-left:18px">' + ''.join(f'<li>{item}</li>' for item in items) + '</ul>'
+
+
+def render_midterm_report(student_name, report):
+    """
+    Render the Midterm (ATM) report.
+
+    Args:
+        student_name: Name used in the greeting
+        report: Dictionary with final_score, grade, grade_feedback, next_steps,
+            milestones (list of dicts: milestone_num, desc, quality_score, weight,
+            earned_points, remark, missing_files), categories (list of
+            (name, earned, total, percentage)) and adjustments (list of strings)
+
+    Returns:
+        HTML string
+    """
+    out = [_WRAP, _header("Midterm Project", student_name, report['final_score'], report['grade'])]
+
+    if report.get('grade_feedback'):
+        out.append(f'<p style="margin:0 0 8px">{escape(report["grade_feedback"])} '
+                   f'<i>{escape(report.get("next_steps", ""))}</i></p>')
+
+    out.append(_TABLE)
+    out.append(f'<tr>{_TH}Milestone</th>{_TH}Quality</th>{_TH}Points</th></tr>')
+    for m in report['milestones']:
+        out.append(
+            f'<tr>{_TD}{m["milestone_num"]}. {escape(m["desc"])}</td>'
+            f'{_TD}{_pct(m["quality_score"])}</td>'
+            f'{_TD}{m["earned_points"]:.2f}/{m["weight"]}</td></tr>'
+        )
+        # Details only where there is something to fix
+        notes = []
+        if m.get('quality_score', 0) < 90 and m.get('remark'):
+            notes.append(escape(m['remark']))
+        if m.get('missing_files'):
+            notes.append('Missing: ' + escape(', '.join(m['missing_files'])))
+        if notes:
+            out.append(f'<tr>{_NOTE}{" &middot; ".join(notes)}</td></tr>')
+    out.append('</table>')
+
+    if report.get('categories'):
+        out.append('<p style="margin:10px 0 2px"><b>Categories</b></p>')
+        out.append(_bullets(
+            f'{escape(name)}: {earned:.2f}/{total} ({_pct(percentage, f"{percentage:.0f}%")})'
+            for name, earned, total, percentage in report['categories']
+        ))
+
+    if report.get('adjustments'):
+        out.append('<p style="margin:10px 0 2px"><b>Bonuses &amp; penalties</b></p>')
+        out.append(_bullets(escape(item) for item in report['adjustments']))
+
+    out.append(_footer())
+    return ''.join(out)
+
+
+def _ai_items(value):
+    """Flatten AI feedback values (strings, lists, nested dicts) into bullet strings"""
+    if isinstance(value, dict):
+        items = []
+        for key, val in value.items():
+            for item in _ai_items(val):
+                items.append(f"{key.replace('_', ' ').title()}: {item}")
+        return items
+    if isinstance(value, list):
+        return [item for entry in value for item in _ai_items(entry)]
+    if value in (None, ''):
+        return []
+    return [str(value)]
+
+
+def render_laravel_report(student_name, results, total_score, grade, rubric):
+    """
+    Render the Laravel project report.
+
+    Args:
+        student_name: Name used in the greeting
+        results: Category -> details dictionary from Laravel_grader.grade_project()
+        total_score: Final score out of 100
+        grade: Letter grade
+        rubric: Category -> maximum points used for this grading run
+
+    Returns:
+        HTML string
+    """
+    out = [_WRAP, _header("Laravel Event Management Project", student_name, total_score, grade)]
+
+    out.append(_TABLE)
+    out.append(f'<tr>{_TH}Category</th>{_TH}Score</th>{_TH}Points</th></tr>')
+    for category, details in results.items():
+        if category == "AI Review":
+            continue
+        score = details.get('score', 0)
+        max_score = details.get('max_score', rubric.get(category, 0))
+        percentage = (score / max_score * 100) if max_score else 0
+        label = escape(category)
+        if category == "Functionality Tests":
+            label += f' ({details.get("test_passed", 0)}/{details.get("test_total", 0)} tests passed)'
+        out.append(f'<tr>{_TD}{label}</td>{_TD}{_pct(percentage)}</td>{_TD}{score}/{max_score}</td></tr>')
+        remarks = details.get('remarks') or []
+        if remarks and percentage < 100:
+            out.append(f'<tr>{_NOTE}{" &middot; ".join(escape(str(r)) for r in remarks)}</td></tr>')
+    out.append('</table>')
+
+    ai = results.get("AI Review")
+    if isinstance(ai, dict):
+        summary = ai.get('summary')
+        if summary:
+            out.append('<p style="margin:10px 0 2px"><b>AI review</b></p>')
+            out.append(f'<p style="margin:0 0 4px">{escape(" ".join(_ai_items(summary)))}</p>')
+        suggestions = _ai_items(ai.get('suggestions'))
+        if suggestions:
+            out.append(_bullets(escape(item) for item in suggestions))
+
+    out.append(_footer())
+    return ''.join(out)
+
+
+def write_teams_report(local_path, html):
+    """Save the Teams rendering next to result.html. Returns the path"""
+    path = os.path.join(local_path, TEAMS_REPORT_NAME)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(html)
+    return path
+
+
+def load_teams_report(result_html_path):
+    """
+    Teams rendering that belongs to a result.html, if one exists.
+
+    Returns None when there is no rendering or it is older than result.html
+    (e.g. the browser report was regenerated by an older grader).
+    """
+    path = os.path.join(os.path.dirname(result_html_path), TEAMS_REPORT_NAME)
+    try:
+        if os.path.exists(result_html_path) and os.path.getmtime(path) < os.path.getmtime(result_html_path) - 1:
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
@@ -1,21 +1,14 @@
 import logging
-import requests
-import msal
-from config import TENANT_ID, CLIENT_ID, INSTRUCTOR_EMAIL, STUDENT_EMAILS
+from config import INSTRUCTOR_EMAIL, STUDENT_EMAILS
+from graph_auth import acquire_token
+from graph_chats import send_chat_message
 
-AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
 SCOPES = ["User.Read", "Chat.ReadWrite"]
 GRAPH_URL = "https://graph.microsoft.com/v1.0"
 
 
 def get_access_token():
-    app = msal.PublicClientApplication(CLIENT_ID, authority=AUTHORITY)
-    accounts = app.get_accounts()
-    result = None
-    if accounts:
-        result = app.acquire_token_silent(SCOPES, account=accounts[0])
-    if not result:
-        result = app.acquire_token_interactive(scopes=SCOPES)
+    result = acquire_token(SCOPES)
     if "access_token" in result:
         return result["access_token"]
     else:
@@ -46,31 +39,10 @@ def send_test_message(student_email, instructor_email, headers):
     <p>Regards,<br>Your Instructor</p>
     """
 
-    chat_payload = {
-        "chatType": "oneOnOne",
-        "members": [
-            {
-                "@odata.type": "#microsoft.graph.aadUserConversationMember",
-                "roles": ["owner"],
-                "user@odata.bind": f"https://graph.microsoft.com/v1.0/users('{instructor_email}')"
-            },
-            {
-                "@odata.type": "#microsoft.graph.aadUserConversationMember",
-                "roles": ["owner"],
-                "user@odata.bind": f"https://graph.microsoft.com/v1.0/users('{student_email}')"
-            }
-        ]
-    }
-
-    chat_resp = requests.post(f"{GRAPH_URL}/chats", headers=headers, json=chat_payload)
-    if chat_resp.status_code not in [200, 201]:
-        logging.error(f"Failed to create chat: {chat_resp.text}")
+    msg_resp = send_chat_message(instructor_email, student_email, message, headers)
+    if msg_resp is None:
         return
 
-    chat_id = chat_resp.json()["id"]
-    msg_payload = {"body": {"contentType": "html", "content": message}}
-    msg_resp = requests.post(f"{GRAPH_URL}/chats/{chat_id}/messages", headers=headers, json=msg_payload)
-
     if msg_resp.status_code in [200, 201]:
         logging.info("✅ Test message sent successfully.")
     else:
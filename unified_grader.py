@@ -12,18 +12,98 @@ import sys
 import os
 import json
 import io
-import subprocess
 from datetime import datetime
 
+import results_index
+import grading_worker
+from progress_events import run_with_console_progress
+
 # Fix encoding for Windows
 if sys.platform == "win32":
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
+# Folders skipped when importing results graded before the results index existed
+SKIP_SCAN_DIRS = {'vendor', 'node_modules', '.git', 'storage', 'bootstrap'}
+
+
+def laravel_score_from_json(data):
+    """Total score and per-category scores from a grading_result.json dictionary"""
+    categories = {
+        category: {'score': details.get('score', 0), 'max_score': details.get('max_score')}
+        for category, details in data.items()
+        if category != "AI Review" and isinstance(details, dict)
+    }
+    return sum(c['score'] for c in categories.values()), categories
+
+
+def index_existing_laravel_results(output_dir="cloned_repos"):
+    """
+    Import Laravel results graded before the results index existed, for every
+    student without an entry (vendor/, node_modules/ and similar folders are
+    not searched). Folders searched without finding a result are remembered
+    and only searched again once their modification time changes.
+
+    Returns:
+        Number of students imported
+    """
+    if not os.path.isdir(output_dir):
+        return 0
+    indexed = results_index.graded_students('laravel')
+    scanned = results_index.scanned_folders('laravel')
+    imported = 0
+    for entry in os.scandir(output_dir):
+        if not entry.is_dir() or not entry.name.startswith("event-scheduler-") or entry.name in indexed:
+            continue
+        mtime = entry.stat().st_mtime
+        if scanned.get(entry.name) == mtime:
+            continue
+        for root, dirs, files in os.walk(entry.path):
+            dirs[:] = [d for d in dirs if d not in SKIP_SCAN_DIRS]
+            if "grading_result.json" not in files:
+                continue
+            json_path = os.path.join(root, "grading_result.json")
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    total_score, categories = laravel_score_from_json(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Could not import {entry.name}: {e}")
+                break
+            results_index.record_result(
+                'laravel', entry.name, total_score, None, os.path.join(root, "result.html"),
+                github_username=entry.name.replace("event-scheduler-", ""),
+                details={'json_path': json_path, 'categories': categories}
+            )
+            imported += 1
+            break
+        else:
+            results_index.record_scanned('laravel', entry.name, mtime)
+    if imported:
+        print(f"[INDEX] Imported {imported} Laravel result(s) graded before the results index existed")
+    return imported
+
+
+def laravel_results():
+    """Laravel results from the results index, ordered by repository"""
+    index_existing_laravel_results()
+    return results_index.results('laravel')
+
+
+def atm_results():
+    """ATM results from the results index, ordered by repository"""
+    try:
+        from config import OUTPUT_DIR
+    except ImportError:
+        OUTPUT_DIR = "cloned_repos"
+    results_index.backfill('midterm', OUTPUT_DIR, prefix="midterm-exam-atm-")
+    return results_index.results('midterm')
+
 class UnifiedGradingMenu:
     """Unified menu system for both ATM and Laravel grading"""
     
     def __init__(self):
+        # Scripts start from a warm worker process when USE_GRADING_WORKER is set
+        grading_worker.ensure_running()
         self.clear_screen()
         self.show_banner()
     
@@ -104,29 +184,14 @@ class UnifiedGradingMenu:
             if args:
                 cmd.extend(args)
             
-            # Run the script with real-time output
-            process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                encoding='utf-8',
-                errors='replace',
-                bufsize=1,
-                universal_newlines=True
-            )
-            
-            # Print output in real-time
-            for line in process.stdout:
-                print(line, end='', flush=True)
-            
-            process.wait()
-            
+            # Run the script with real-time output and progress
+            returncode = run_with_console_progress(cmd, spawn=grading_worker.open_terminal_process)
+
             print()
-            if process.returncode == 0:
+            if returncode == 0:
                 print("✅ Operation completed successfully!")
             else:
-                print(f"⚠️ Operation completed with exit code: {process.returncode}")
+                print(f"⚠️ Operation completed with exit code: {returncode}")
         
         except FileNotFoundError:
             print(f"❌ Error: {script_name} not found!")
@@ -425,31 +490,21 @@ def view_atm_summary():
     print()
     
     try:
-        # Read grades from individual result files
         students = []
         
-        for repo_name in os.listdir(output_dir):
-            repo_path = os.path.join(output_dir, repo_name)
-            
-            # Skip if not a directory or not an ATM repo
-            if not os.path.isdir(repo_path) or not repo_name.startswith("midterm-exam-atm-"):
-                continue
-            
-            # Look for result files
-            result_file = os.path.join(repo_path, "result.txt")
-            if not os.path.exists(result_file):
-                result_file = os.path.join(repo_path, "result.html")
+        for entry in atm_results():
+            final_score, grade = entry['score'], entry['grade']
+            github_username = entry['github_username'] or "Unknown"
             
-            if not os.path.exists(result_file):
-                continue
-            
-            # Read and parse the result file
-            try:
-                with open(result_file, 'r', encoding='utf-8', errors='replace') as f:
-                    content = f.read()
+            if final_score is None:
+                # Imported from before the results index; read the report once
+                try:
+                    with open(entry['report_path'], 'r', encoding='utf-8', errors='replace') as f:
+                        content = f.read()
+                except OSError as e:
+                    print(f"Error reading {entry['student']}: {e}")
+                    continue
                 
-                # Extract information
-                github_username = "Unknown"
                 username_match = re.search(r'GitHub Username:\s*@?([^\s\n<]+)', content)
                 if username_match:
                     github_username = username_match.group(1)
@@ -468,16 +523,15 @@ def view_atm_summary():
                 if grade_match:
                     grade = grade_match.group(1).strip()
                 
-                students.append({
-                    'repo_name': repo_name,
-                    'github_username': github_username,
-                    'final_score': final_score,
-                    'grade': grade
-                })
+                results_index.record_result('midterm', entry['student'], final_score, grade,
+                                            entry['report_path'], github_username=github_username)
             
-            except Exception as e:
-                print(f"Error reading {repo_name}: {e}")
-                continue
+            students.append({
+                'repo_name': entry['student'],
+                'github_username': github_username,
+                'final_score': final_score,
+                'grade': grade
+            })
         
         # Display summary
         if not students:
@@ -521,64 +575,32 @@ def view_laravel_summary():
     try:
         students = []
         
-        for repo_name in os.listdir(output_dir):
-            repo_path = os.path.join(output_dir, repo_name)
-            
-            # Skip if not a directory or not a Laravel repo
-            if not os.path.isdir(repo_path) or not repo_name.startswith("event-scheduler-"):
-                continue
-            
-            # Look for grading_result.json in the repo or subdirectories
-            json_found = False
-            for root, dirs, files in os.walk(repo_path):
-                if "grading_result.json" in files:
-                    json_path = os.path.join(root, "grading_result.json")
-                    html_path = os.path.join(root, "result.html")
-                    
-                    try:
-                        with open(json_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                        
-                        # Calculate total score
-                        total_score = 0
-                        for category, details in data.items():
-                            if category != "AI Review" and isinstance(details, dict):
-                                total_score += details.get('score', 0)
-                        
-                        # Determine grade
-                        if total_score >= 80:
-                            grade = "A (Excellent)"
-                        elif total_score >= 75:
-                            grade = "B+ (Very Good)"
-                        elif total_score >= 70:
-                            grade = "B (Good)"
-                        elif total_score >= 65:
-                            grade = "C+ (Satisfactory)"
-                        elif total_score >= 60:
-                            grade = "C (Passing)"
-                        else:
-                            grade = "F (Failing)"
-                        
-                        # Extract student username from repo name
-                        student_username = repo_name.replace("event-scheduler-", "")
-                        
-                        students.append({
-                            'repo_name': repo_name,
-                            'github_username': student_username,
-                            'final_score': total_score,
-                            'grade': grade,
-                            'html_report': html_path if os.path.exists(html_path) else None
-                        })
-                        
-                        json_found = True
-                        break
-                    
-                    except Exception as e:
-                        print(f"Error reading {repo_name}: {e}")
-                        continue
+        for entry in laravel_results():
+            total_score = entry['score'] or 0
+            grade = entry['grade']
+            if not grade:
+                # Imported from before the results index
+                if total_score >= 80:
+                    grade = "A (Excellent)"
+                elif total_score >= 75:
+                    grade = "B+ (Very Good)"
+                elif total_score >= 70:
+                    grade = "B (Good)"
+                elif total_score >= 65:
+                    grade = "C+ (Satisfactory)"
+                elif total_score >= 60:
+                    grade = "C (Passing)"
+                else:
+                    grade = "F (Failing)"
             
-            if not json_found:
-                print(f"⚠️  No grading results found for {repo_name}")
+            html_path = entry['report_path']
+            students.append({
+                'repo_name': entry['student'],
+                'github_username': entry['github_username'] or entry['student'].replace("event-scheduler-", ""),
+                'final_score': total_score,
+                'grade': grade,
+                'html_report': html_path if html_path and os.path.exists(html_path) else None
+            })
         
         # Display summary
         if not students:
@@ -615,6 +637,7 @@ def upload_laravel_grades_to_moodle():
     try:
         # Import from MoodleIntegration module
         import MoodleIntegration
+        import moodle_directory
         
         from config import (
             MOODLE_URL, MOODLE_TOKEN,
@@ -631,46 +654,19 @@ def upload_laravel_grades_to_moodle():
         output_dir = "cloned_repos"
         
         # Collect Laravel grades
-        print("[1/4] Collecting Laravel grades from result files...")
+        print("[1/4] Collecting Laravel grades from the results index...")
         laravel_grades = {}
         
-        for repo_name in os.listdir(output_dir):
-            repo_path = os.path.join(output_dir, repo_name)
-            
-            if not os.path.isdir(repo_path) or not repo_name.startswith("event-scheduler-"):
+        for entry in laravel_results():
+            if entry['score'] is None:
                 continue
-            
-            # Find grading_result.json
-            for root, dirs, files in os.walk(repo_path):
-                if "grading_result.json" in files:
-                    json_path = os.path.join(root, "grading_result.json")
-                    
-                    try:
-                        with open(json_path, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                        
-                        # Calculate total score
-                        total_score = 0
-                        for category, details in data.items():
-                            if category != "AI Review" and isinstance(details, dict):
-                                total_score += details.get('score', 0)
-                        
-                        # Extract student username
-                        student_username = repo_name.replace("event-scheduler-", "")
-                        
-                        laravel_grades[repo_name] = {
-                            'github_username': student_username,
-                            'final_score': total_score,
-                            'grade': 'N/A'  # We don't need grade letter for Moodle
-                        }
-                        
-                        print(f"  ✓ {student_username}: {total_score}/100")
-                        
-                        break
-                    
-                    except Exception as e:
-                        print(f"  ⚠️  Error processing {repo_name}: {e}")
-                        continue
+            student_username = entry['github_username'] or entry['student'].replace("event-scheduler-", "")
+            laravel_grades[entry['student']] = {
+                'github_username': student_username,
+                'final_score': entry['score'],
+                'grade': 'N/A'  # We don't need grade letter for Moodle
+            }
+            print(f"  ✓ {student_username}: {entry['score']}/100")
         
         if not laravel_grades:
             print("\n❌ No Laravel grades found. Please run grading first.")
@@ -680,7 +676,7 @@ def upload_laravel_grades_to_moodle():
         
         # Test Moodle connection
         print("\n[2/4] Testing Moodle connection...")
-        result = MoodleIntegration.call_moodle_api('core_webservice_get_site_info')
+        result = moodle_directory.get_site_info()
         if not result:
             print("❌ Failed to connect to Moodle. Check your credentials.")
             return
@@ -692,28 +688,30 @@ def upload_laravel_grades_to_moodle():
         # Get usernames from STUDENT_EMAILS for Laravel repos
         laravel_usernames = []
         username_to_repo = {}
+        username_to_email = {}
         
         for repo_name, email in STUDENT_EMAILS.items():
             if repo_name.startswith("event-scheduler-"):
                 moodle_username = email.split('@')[0]  # Extract username from email
                 laravel_usernames.append(moodle_username)
                 username_to_repo[moodle_username] = repo_name
+                username_to_email[moodle_username] = email
+        
+        # Resolve everyone from one enrolment-list fetch (cached on disk)
+        found = moodle_directory.find_users(
+            LARAVEL_MOODLE_COURSE_ID,
+            [(username, username_to_email[username]) for username in laravel_usernames]
+        )
         
-        # Get users from Moodle
         all_users = []
         found_count = 0
         
         for username in laravel_usernames:
-            result = MoodleIntegration.call_moodle_api('core_user_get_users', {
-                'criteria[0][key]': 'username',
-                'criteria[0][value]': username
-            })
-            
-            if result and 'users' in result and len(result['users']) > 0:
-                user = result['users'][0]
+            user = found.get(username)
+            if user:
                 all_users.append({
                     'id': user.get('id'),
-                    'username': user.get('username'),
+                    'username': user.get('username') or username,
                     'repo_name': username_to_repo.get(username)
                 })
                 found_count += 1
@@ -736,43 +734,68 @@ def upload_laravel_grades_to_moodle():
         
         success_count = 0
         failed_count = 0
+        overridden_count = 0
         
+        import grade_ledger
+        grade_item = str(LARAVEL_MOODLE_GRADE_ITEM_ID)
+        run_id = grade_ledger.new_run_id()
+        confirmed = grade_ledger.confirmed_scores(grade_item)
+        
+        to_upload = []
         for user_info in all_users:
-            user_id = user_info['id']
-            username = user_info['username']
-            repo_name = user_info['repo_name']
-            
             # Get grade for this repo
-            grade_info = laravel_grades.get(repo_name)
+            grade_info = laravel_grades.get(user_info['repo_name'])
             if not grade_info:
-                print(f"  ⚠️  {username}: No grade data found")
+                print(f"  ⚠️  {user_info['username']}: No grade data found")
                 continue
-            
-            final_score = grade_info['final_score']
-            
-            # Upload to Moodle using core_grades_update_grades
-            result = MoodleIntegration.call_moodle_api('core_grades_update_grades', {
+            # Already confirmed by an earlier upload with the same score
+            if grade_ledger.is_confirmed(user_info['username'], grade_item, grade_info['final_score'], confirmed):
+                print(f"  ✓ {user_info['username']}: {grade_info['final_score']}/100 already confirmed, skipping")
+                success_count += 1
+                continue
+            to_upload.append((user_info, grade_info['final_score']))
+        
+        dry_run = input("  Preview changes only (dry run)? (y/n): ").strip().lower() == 'y'
+        
+        # Upload changed grades using multi-student core_grades_update_grades calls
+        status = MoodleIntegration.sync_grades(
+            [(user_info['id'], final_score) for user_info, final_score in to_upload],
+            {
                 'source': 'mod/assign',
                 'courseid': LARAVEL_MOODLE_COURSE_ID,
                 'component': 'mod_assign',
                 'activityid': LARAVEL_MOODLE_ACTIVITY_ID,
-                'itemnumber': 0,
-                'grades[0][studentid]': user_id,
-                'grades[0][grade]': final_score
-            })
-            
-            if result is not None:
-                print(f"  ✅ {username}: {final_score}/100 uploaded successfully")
+                'itemnumber': 0
+            },
+            grade_item_id=LARAVEL_MOODLE_GRADE_ITEM_ID,
+            dry_run=dry_run,
+            labels={user_info['id']: user_info['username'] for user_info, _ in to_upload}
+        )
+        if dry_run:
+            return
+        
+        ledger_rows = []
+        for user_info, final_score in to_upload:
+            if status.get(user_info['id']) == MoodleIntegration.GRADE_OVERRIDDEN:
+                print(f"  ⏭️  {user_info['username']}: overridden in Moodle, left alone")
+                overridden_count += 1
+                ledger_rows.append((user_info['username'], grade_item, final_score, grade_ledger.STATUS_OVERRIDDEN, None))
+            elif status.get(user_info['id']):
+                print(f"  ✅ {user_info['username']}: {final_score}/100 uploaded successfully")
                 success_count += 1
+                ledger_rows.append((user_info['username'], grade_item, final_score, grade_ledger.STATUS_CONFIRMED, None))
             else:
-                print(f"  ❌ {username}: Failed to upload grade")
+                print(f"  ❌ {user_info['username']}: Failed to upload grade")
                 failed_count += 1
+                ledger_rows.append((user_info['username'], grade_item, final_score, grade_ledger.STATUS_FAILED, None))
+        grade_ledger.record_many(ledger_rows, run_id)
         
         # Save results
         print("\n" + "=" * 80)
         print(f"✅ Upload complete!")
         print(f"   Successfully uploaded: {success_count}/{len(all_users)}")
         print(f"   Failed: {failed_count}/{len(all_users)}")
+        print(f"   Overridden in Moodle: {overridden_count}/{len(all_users)}")
         print("=" * 80)
         
         # Save results to file
@@ -784,7 +807,8 @@ def upload_laravel_grades_to_moodle():
                 f.write("=" * 80 + "\n\n")
                 f.write(f"Total students: {len(all_users)}\n")
                 f.write(f"Successfully uploaded: {success_count}\n")
-                f.write(f"Failed: {failed_count}\n\n")
+                f.write(f"Failed: {failed_count}\n")
+                f.write(f"Overridden in Moodle: {overridden_count}\n\n")
                 f.write("=" * 80 + "\n")
                 f.write("DETAILS\n")
                 f.write("=" * 80 + "\n\n")
@@ -817,24 +841,23 @@ def send_laravel_teams_notifications():
     print()
     
     try:
-        import requests
-        import msal
-        import time
         import logging
+        from graph_auth import acquire_token
+        from graph_batch import send_messages_batched
+        from teams_html import minify_html, split_for_teams
+        from teams_report import load_teams_report
+        import notification_outbox
         
         # Import configuration
         try:
             from config import (
-                TENANT_ID,
-                CLIENT_ID,
-                CLIENT_SECRET,
                 INSTRUCTOR_EMAIL,
                 STUDENT_EMAILS,
                 LARAVEL_ASSIGNMENT_REPO_PREFIX
             )
         except ImportError as e:
             print(f"❌ Error: Missing configuration in config.py: {e}")
-            print("   Please ensure TENANT_ID, CLIENT_ID, INSTRUCTOR_EMAIL are configured.")
+            print("   Please ensure INSTRUCTOR_EMAIL, STUDENT_EMAILS and LARAVEL_ASSIGNMENT_REPO_PREFIX are configured.")
             return
         
         # Setup logging
@@ -843,20 +866,11 @@ def send_laravel_teams_notifications():
             format="%(asctime)s [%(levelname)s] %(message)s"
         )
         
-        AUTHORITY = f"https://login.microsoftonline.com/{TENANT_ID}"
         SCOPES = ["User.Read", "Chat.ReadWrite"]
-        GRAPH_URL = "https://graph.microsoft.com/v1.0"
         
-        # Get access token
+        # Get access token (silent when the shared token cache is warm)
         print("[AUTH] Acquiring access token...")
-        app = msal.PublicClientApplication(CLIENT_ID, authority=AUTHORITY)
-        accounts = app.get_accounts()
-        result = None
-        if accounts:
-            result = app.acquire_token_silent(SCOPES, account=accounts[0])
-        if not result:
-            print("[AUTH] Please sign in to your Microsoft account...")
-            result = app.acquire_token_interactive(scopes=SCOPES)
+        result = acquire_token(SCOPES)
         
         if "access_token" not in result:
             print(f"❌ Failed to acquire access token: {result.get('error_description')}")
@@ -867,24 +881,19 @@ def send_laravel_teams_notifications():
         print("✅ Access token acquired successfully")
         print()
         
-        output_dir = "cloned_repos"
         sent_count = 0
-        total_students = 0
+        unchanged = 0
+        processed = 0
         
-        # Count total students to process
-        for repo_name in os.listdir(output_dir):
-            if repo_name.startswith("event-scheduler-"):
-                total_students += 1
+        graded = laravel_results()
+        total_students = len(graded)
         
-        print(f"Found {total_students} Laravel repositories to process")
+        print(f"Found {total_students} graded Laravel repositories to process")
         print("=" * 80)
         print()
         
-        for repo_name in os.listdir(output_dir):
-            repo_path = os.path.join(output_dir, repo_name)
-            
-            if not os.path.isdir(repo_path) or not repo_name.startswith("event-scheduler-"):
-                continue
+        for entry in graded:
+            repo_name = entry['student']
             
             # Extract student username from repo name
             student_username = repo_name.replace("event-scheduler-", "")
@@ -895,14 +904,11 @@ def send_laravel_teams_notifications():
                 print(f"⚠️  [{student_username}] No email mapping found in STUDENT_EMAILS, skipping...")
                 continue
             
-            print(f"[{sent_count + 1}/{total_students}] Processing {student_username} ({student_email})...")
+            processed += 1
+            print(f"[{processed}/{total_students}] Processing {student_username} ({student_email})...")
             
-            # Find result.html
-            html_path = None
-            for root, dirs, files in os.walk(repo_path):
-                if "result.html" in files:
-                    html_path = os.path.join(root, "result.html")
-                    break
+            # Report location recorded at grading time
+            html_path = entry['report_path']
             
             if not html_path or not os.path.exists(html_path):
                 print(f"  ⚠️  No result.html found, skipping...")
@@ -917,97 +923,72 @@ def send_laravel_teams_notifications():
                     print(f"  ⚠️  Empty grade file, skipping...")
                     continue
                 
-                # Extract body content from HTML
-                import re
-                body_match = re.search(r'<body>(.*?)</body>', grade_content, re.DOTALL)
-                if body_match:
-                    grade_body = body_match.group(1).strip()
-                else:
-                    grade_body = grade_content.strip()
-                
-                # Compress HTML (remove excessive whitespace)
-                grade_body = re.sub(r'\n\s+', '\n', grade_body)
-                grade_body = re.sub(r'\s+', ' ', grade_body)
-                grade_body = re.sub(r'>\s+<', '><', grade_body)
+                # Prefer the compact rendering written at grading time; it is sent as is
+                message_html = load_teams_report(html_path)
+                if not message_html:
+                    # Extract and compress the body in one pass
+                    grade_body = minify_html(grade_content)
                 
-                # Build Teams-friendly message
-                message_html = f"""
-                <div style="font-family:'Segoe UI', 'Helvetica Neue', Arial, sans-serif; font-size:13px; line-height:1.5; color:#2b2b2b; max-width:100%; overflow-x:hidden;">
-                    <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color:white; padding:20px; border-radius:12px; margin-bottom:25px; text-align:center;">
-                        <h1 style="margin:0; font-size:24px; font-weight:600;">Laravel Event Management Project</h1>
-                        <h2 style="margin:5px 0 0 0; font-size:18px; font-weight:400; opacity:0.9;">Grade Report</h2>
-                        <p style="margin:8px 0 0; font-size:14px; opacity:0.8;">Muaklek Campus</p>
-                    </div>
+                    # Build Teams-friendly message
+                    message_html = f"""
+                    <div style="font-family:'Segoe UI', 'Helvetica Neue', Arial, sans-serif; font-size:13px; line-height:1.5; color:#2b2b2b; max-width:100%; overflow-x:hidden;">
+                        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color:white; padding:20px; border-radius:12px; margin-bottom:25px; text-align:center;">
+                            <h1 style="margin:0; font-size:24px; font-weight:600;">Laravel Event Management Project</h1>
+                            <h2 style="margin:5px 0 0 0; font-size:18px; font-weight:400; opacity:0.9;">Grade Report</h2>
+                            <p style="margin:8px 0 0; font-size:14px; opacity:0.8;">Muaklek Campus</p>
+                        </div>
 
-                    <div style="background:#ffffff; padding:25px; border-radius:12px; box-shadow:0 2px 10px rgba(0,0,0,0.1); margin-bottom:20px;">
-                        <p style="margin:0 0 15px 0; font-size:16px;"><strong>Hello {student_username},</strong></p>
-                        <p style="margin:0; color:#666; font-size:14px;">Please find your detailed Laravel project grade report below.</p>
-                    </div>
+                        <div style="background:#ffffff; padding:25px; border-radius:12px; box-shadow:0 2px 10px rgba(0,0,0,0.1); margin-bottom:20px;">
+                            <p style="margin:0 0 15px 0; font-size:16px;"><strong>Hello {student_username},</strong></p>
+                            <p style="margin:0; color:#666; font-size:14px;">Please find your detailed Laravel project grade report below.</p>
+                        </div>
 
-                    <div style="background:#ffffff; border-radius:12px; box-shadow:0 2px 10px rgba(0,0,0,0.1); overflow:hidden;">
-                        <div style="padding:25px; max-height:none; overflow-y:visible;">
-                            {grade_body}
+                        <div style="background:#ffffff; border-radius:12px; box-shadow:0 2px 10px rgba(0,0,0,0.1); overflow:hidden;">
+                            <div style="padding:25px; max-height:none; overflow-y:visible;">
+                                {grade_body}
+                            </div>
                         </div>
-                    </div>
 
-                    <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color:white; padding:20px; border-radius:12px; margin-top:25px; text-align:center;">
-                        <p style="margin:0 0 10px 0; font-size:16px; font-weight:600;">Best regards,</p>
-                        <p style="margin:0 0 15px 0; font-size:14px;">Mr. Rindra</p>
-                        <p style="margin:0; font-size:12px; opacity:0.8;">Sent automatically via Microsoft Teams</p>
+                        <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color:white; padding:20px; border-radius:12px; margin-top:25px; text-align:center;">
+                            <p style="margin:0 0 10px 0; font-size:16px; font-weight:600;">Best regards,</p>
+                            <p style="margin:0 0 15px 0; font-size:14px;">Mr. Rindra</p>
+                            <p style="margin:0; font-size:12px; opacity:0.8;">Sent automatically via Microsoft Teams</p>
+                        </div>
                     </div>
-                </div>
-                """
-                
-                # Create or get existing chat
-                chat_payload = {
-                    "chatType": "oneOnOne",
-                    "members": [
-                        {
-                            "@odata.type": "#microsoft.graph.aadUserConversationMember",
-                            "roles": ["owner"],
-                            "user@odata.bind": f"{GRAPH_URL}/users('{INSTRUCTOR_EMAIL}')"
-                        },
-                        {
-                            "@odata.type": "#microsoft.graph.aadUserConversationMember",
-                            "roles": ["owner"],
-                            "user@odata.bind": f"{GRAPH_URL}/users('{student_email}')"
-                        }
-                    ]
-                }
-                
-                chat_resp = requests.post(f"{GRAPH_URL}/chats", headers=headers, json=chat_payload)
-                if chat_resp.status_code not in [200, 201]:
-                    print(f"  ❌ Failed to create chat: {chat_resp.text}")
-                    continue
-                
-                chat_id = chat_resp.json()["id"]
-                
-                # Send message
-                msg_payload = {
-                    "body": {
-                        "contentType": "html",
-                        "content": message_html
-                    }
-                }
-                
-                msg_resp = requests.post(f"{GRAPH_URL}/chats/{chat_id}/messages", headers=headers, json=msg_payload)
+                    """
                 
-                if msg_resp.status_code in [200, 201]:
-                    print(f"  ✅ Message sent successfully")
-                    sent_count += 1
+                # Queue message; unchanged reports were already delivered
+                status = notification_outbox.enqueue('laravel', repo_name, message_html, student_email)
+                if status == notification_outbox.UNCHANGED:
+                    unchanged += 1
+                    print(f"  ⏭️  Unchanged since last delivery, skipping")
                 else:
-                    print(f"  ❌ Failed to send message: {msg_resp.status_code} - {msg_resp.text}")
-                
-                # Add delay to avoid rate limiting
-                time.sleep(2)
+                    print(f"  ✅ Message {status}")
             
             except Exception as e:
                 print(f"  ❌ Error processing {student_username}: {e}")
                 continue
         
+        def send(messages):
+            print(f"[TEAMS] Sending {len(messages)} messages via Graph batch requests...")
+            outgoing = {email: split_for_teams(content) for email, content in messages.items()}
+            return send_messages_batched(INSTRUCTOR_EMAIL, outgoing, headers)
+        
+        # Deliver everything pending, including items left over from an interrupted run
+        print()
+        outcomes = notification_outbox.drain('laravel', send, resolve_recipient=STUDENT_EMAILS.get)
+        for item, success, error in outcomes:
+            username = item['student'].replace("event-scheduler-", "")
+            if success:
+                print(f"  ✅ [{username}] Message sent successfully")
+                sent_count += 1
+            else:
+                print(f"  ❌ [{username}] Failed to send message: {error}")
+        
         print()
         print(f"{'=' * 80}")
-        print(f"✅ Notification complete! Sent {sent_count}/{total_students} messages to Teams.")
+        print(f"✅ Notification complete! Sent {sent_count}/{len(outcomes)} pending messages to Teams "
+              f"({unchanged}/{total_students} unchanged since last delivery).")
         print(f"{'=' * 80}")
     
     except ImportError as e:
@@ -1028,11 +1009,8 @@ def view_atm_reports():
         print("No reports found. Please run grading first.")
         return
     
-    # Find all result.html files
-    reports = []
-    for root, dirs, files in os.walk(OUTPUT_DIR):
-        if "result.html" in files:
-            reports.append(os.path.join(root, "result.html"))
+    # Reports registered in the results index
+    reports = [entry['report_path'] for entry in atm_results() if os.path.exists(entry['report_path'])]
     
     if not reports:
         print("No ATM project reports found.")
@@ -1070,11 +1048,12 @@ def view_laravel_reports():
         print("No reports found. Please run grading first.")
         return
     
-    # Find all grading_result.json files
+    # JSON reports registered in the results index
     reports = []
-    for root, dirs, files in os.walk(OUTPUT_DIR):
-        if "grading_result.json" in files:
-            reports.append(os.path.join(root, "grading_result.json"))
+    for entry in laravel_results():
+        json_path = (entry['details'] or {}).get('json_path')
+        if json_path and os.path.exists(json_path):
+            reports.append(json_path)
     
     if not reports:
         print("No Laravel project reports found.")
@@ -1135,50 +1114,18 @@ def view_laravel_reports():
 
 def compare_performance():
     """Compare student performance across both project types"""
-    from config import OUTPUT_DIR
-    
-    print("\n" + "=" * 70)
-    print("STUDENT PERFORMANCE COMPARISON")
-    print("=" * 70)
-    
-    # Read ATM summary
-    atm_summary_path = os.path.join(OUTPUT_DIR, "student_summary.txt")
-    atm_students = {}
-    
-    if os.path.exists(atm_summary_path):
-        try:
-            with open(atm_summary_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                # Parse student data (simplified)
-                print("\n[ATM Banking System Grades]")
-                print(content)
-        except Exception as e:
-            print(f"Error reading ATM summary: {e}")
-    else:
-        print("\n[ATM Banking System] No summary found.")
-    
-    # Read Laravel grades
-    print("\n" + "=" * 70)
-    print("[Laravel Event Management Grades]")
-    print("=" * 70)
-    laravel_found = False
+    try:
+        import cohort_analytics
+    except ImportError as e:
+        print(f"\n❌ Cohort analytics needs numpy ({e}). Install it with: pip install numpy")
+        input("\n\nPress Enter to continue...")
+        return
     
-    for root, dirs, files in os.walk(OUTPUT_DIR):
-        if "grading_result.json" in files:
-            repo_name = os.path.basename(root)
-            json_path = os.path.join(root, "grading_result.json")
-            
-            try:
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    total_score = sum(d.get('score', 0) for k, d in data.items() if k != "AI Review")
-                    print(f"\n{repo_name}: {total_score}/100")
-                    laravel_found = True
-            except Exception as e:
-                print(f"Error reading {repo_name}: {e}")
+    # Make sure results graded before the index existed are included
+    atm_results()
+    laravel_results()
     
-    if not laravel_found:
-        print("No Laravel project grades found.")
+    cohort_analytics.print_report(cohort_analytics.load_assignments())
     
     input("\n\nPress Enter to continue...")
 